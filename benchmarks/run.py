@@ -0,0 +1,214 @@
+"""
+    Benchmarks of flood simulation, run from repository root:
+
+        python -m benchmarks.run                          # run and compare with local baseline, if there is one
+        python -m benchmarks.run --save                   # run and store results as new local baseline
+        python -m benchmarks.run --sizes 25 100 --quick   # smaller run, e.g. during development
+
+    Every scenario is simulated in fresh process with `DiscreteEventEngine`, so peak RSS is measured per scenario.
+    Logging in that process is limited to warnings, so timings measure simulation and not writing logs.
+    Results are written as JSON, any metric worse than baseline by more than tolerance makes the run fail.
+
+    Baseline holds absolute timings of the machine it was saved on, so it is not part of the repository.
+    The first run without baseline stores its results as one, run it before making changes and compare
+    against it afterwards.
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Callable, Tuple
+
+import numpy as np
+
+from mesh.history import HistoryRecorder, HISTORY_DTYPE
+from mesh.network import Network, RunMode
+from mesh.node.with_cache import NodeWithPositionCache
+from utils.space import Position
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESULTS_PATH = "benchmark_results.json"
+SIZES = [25, 100, 1000, 10000]
+TOPOLOGIES = ["grid", "random", "line"]
+SEED = 1
+SIMULATION_TIME = 10
+SEND_TIMES = [1, 4, 7]
+TOLERANCE = 0.25
+# Timing of scenarios simulated faster than this is mostly noise, it is allowed to be up to twice worse
+NOISE_FLOOR = 0.05
+NOISY_TOLERANCE = 1.0
+MIN_DURATION = 2
+
+LOWER_IS_BETTER = {"wall_per_sim_second", "peak_rss_per_node", "ns_per_record", "render_time"}
+HIGHER_IS_BETTER = {"frames_per_second"}
+
+
+def grid_positions(count: int, generator: random.Random) -> List[Position]:
+    side = math.ceil(math.sqrt(count))
+    return [Position(i % side, i // side) for i in range(count)]
+
+
+def random_positions(count: int, generator: random.Random) -> List[Position]:
+    """ Square with on average ~10 nodes in range of each node """
+    side = math.sqrt(count * math.pi * 1.5 ** 2 / 10)
+    return [Position(generator.uniform(0, side), generator.uniform(0, side)) for _ in range(count)]
+
+
+def line_positions(count: int, generator: random.Random) -> List[Position]:
+    return [Position(i, 0) for i in range(count)]
+
+
+POSITIONS: Dict[str, Callable[[int, random.Random], List[Position]]] = {
+    "grid": grid_positions,
+    "random": random_positions,
+    "line": line_positions,
+}
+
+
+class BenchmarkNode(NodeWithPositionCache):
+    """ TTL high enough for floods to reach whole network """
+    INIT_TTL = 127
+
+
+def build_network(topology: str, size: int) -> Network:
+    """ Node 0 floods messages to node with highest address, range 1.5 """
+    positions = POSITIONS[topology](size, random.Random(SEED))
+    network = Network(1.5, mode=RunMode.DISCRETE)
+    schedule = [(send_time, size - 1) for send_time in SEND_TIMES]
+    for addr, position in enumerate(positions):
+        network.add_node(BenchmarkNode(position, addr=addr, send_schedule=schedule if addr == 0 else None))
+    return network
+
+
+def flood_scenario(topology: str, size: int) -> Dict[str, Any]:
+    """ Repeated for at least `MIN_DURATION` seconds, best run is taken so small scenarios are not dominated by noise """
+    wall = float("inf")
+    total = 0
+    while total < MIN_DURATION:
+        network = build_network(topology, size)
+        started = time.perf_counter()
+        network.run_for(SIMULATION_TIME)
+        elapsed = time.perf_counter() - started
+        wall = min(wall, elapsed)
+        total += elapsed
+        frames = len(network.history)
+        # Network and nodes reference each other, without collecting them peak RSS would depend on number of runs
+        del network
+        gc.collect()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {
+        "frames": int(frames),
+        "frames_per_second": frames / wall,
+        "wall_per_sim_second": wall / SIMULATION_TIME,
+        "peak_rss_per_node": peak_rss / size,
+    }
+
+
+def history_scenario(shared: bool, records: int = 100000) -> Dict[str, Any]:
+    recorder = HistoryRecorder(capacity=records)
+    buffer = recorder.open([0], shared=shared)[0]
+    record = tuple(np.zeros(1, dtype=HISTORY_DTYPE)[0].tolist())
+    started = time.perf_counter()
+    for _ in range(records):
+        buffer.append(record)
+    elapsed = time.perf_counter() - started
+    recorder.collect()
+    return {"ns_per_record": elapsed / records * 1e9}
+
+
+def render_scenario(size: int = 100, modes: Tuple[str, ...] = ("ALL_MESSAGES", "BAR_RECEIVED")) -> Dict[str, Any]:
+    """ :param modes: names of `MeshPlotMode` drawn side by side """
+    import matplotlib
+    matplotlib.use("Agg")
+    from view.plot import Plot, MeshPlotMode
+
+    network = build_network("grid", size)
+    network.run_for(SIMULATION_TIME)
+    started = time.perf_counter()
+    plot = Plot(1, len(modes))
+    for i, mode in enumerate(modes):
+        plot.draw((i,), MeshPlotMode[mode], network)
+    plot.fig.canvas.draw()
+    return {"frames": int(len(network.history)), "render_time": time.perf_counter() - started}
+
+
+def _silence_logging():
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def run_isolated(function: Callable, *args) -> Dict[str, Any]:
+    """ Run scenario in new process, so its memory usage is not affected by other scenarios """
+    with ProcessPoolExecutor(max_workers=1, initializer=_silence_logging) as pool:
+        return pool.submit(function, *args).result()
+
+
+def run_benchmarks(sizes: List[int], topologies: List[str], quick: bool) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for topology in topologies:
+        for size in sizes:
+            name = f"flood/{topology}/{size}"
+            results[name] = run_isolated(flood_scenario, topology, size)
+    results["history/chunked"] = run_isolated(history_scenario, False)
+    results["history/shared"] = run_isolated(history_scenario, True)
+    if not quick:
+        results["render/grid/100"] = run_isolated(render_scenario, 100)
+        results["render/links/1000"] = run_isolated(render_scenario, 1000, ("LINKS", "HOP_HEATMAP", "BAR_RECEIVED"))
+    for name, metrics in results.items():
+        print(f"{name}: " + ", ".join(f"{metric}={value:.4g}" for metric, value in metrics.items()), file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """ :return: description of every metric worse than in baseline by more than `tolerance` """
+    regressions = []
+    for name, metrics in results.items():
+        expected_metrics = baseline.get(name, {})
+        noisy = expected_metrics.get("wall_per_sim_second", float("inf")) * SIMULATION_TIME < NOISE_FLOOR
+        for metric, value in metrics.items():
+            expected = expected_metrics.get(metric)
+            if expected is None:
+                continue
+            allowed = max(tolerance, NOISY_TOLERANCE) if noisy and metric != "peak_rss_per_node" else tolerance
+            if metric in LOWER_IS_BETTER and value > expected * (1 + allowed):
+                regressions.append(f"{name} {metric}: {value:.4g} > baseline {expected:.4g}")
+            elif metric in HIGHER_IS_BETTER and value < expected / (1 + allowed):
+                regressions.append(f"{name} {metric}: {value:.4g} < baseline {expected:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--topologies", nargs="+", default=TOPOLOGIES, choices=TOPOLOGIES)
+    parser.add_argument("--quick", action="store_true", help="skip plot rendering")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--save", action="store_true", help="store results as new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.topologies, args.quick)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.save or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Results saved as baseline to {args.baseline}", file=sys.stderr)
+        return 0
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
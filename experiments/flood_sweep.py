@@ -0,0 +1,29 @@
+"""
+    Flood from `experiments/full_mesh_flood.py` repeated for many ranges, network sizes and seeds.
+    Runs headless in all cores, interrupted sweep can be started again and will continue where it stopped.
+
+"""
+import logging
+
+from mesh.sweep import Sweep, parameter_grid
+
+RANGES = [5, 10, 15, 20]
+NODE_COUNTS = [25, 50, 100]
+SEEDS = range(10)
+SEND_TIMES = [(3, 10)]
+SIMULATION_TIME = 20
+PROGRESS_FILE = "flood_sweep.jsonl"
+RESULTS_FILE = "flood_sweep.csv"
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    configs = parameter_grid(
+        range=RANGES,
+        node_count=NODE_COUNTS,
+        seed=SEEDS,
+        send_times=SEND_TIMES,
+        duration=[SIMULATION_TIME],
+    )
+    results = Sweep(configs, PROGRESS_FILE).run()
+    results.to_csv(RESULTS_FILE, index=False)
+    print(results.groupby(["range", "node_count"])[["delivery_ratio", "coverage", "transmissions"]].mean())
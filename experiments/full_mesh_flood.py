@@ -10,7 +10,6 @@ from datetime import datetime
 
 from mesh.network import Network
 from mesh.common import dump_history
-from mesh.node.base import MeshNodeAsync
 from mesh.node.with_cache import NodeWithPositionCache
 from utils.space import Position
 from view.plot import Plot, MeshPlotMode
@@ -19,7 +18,6 @@ from view.plot import Plot, MeshPlotMode
 RANGE = 15
 NODE_COUNT = 25
 SIMULATION_TIME = 20
-MeshNodeAsync.ADDR_MAX = NODE_COUNT+1
 SEND_SCHEDULE = [(3, NODE_COUNT), (10, NODE_COUNT), (10, NODE_COUNT)]
 SEED = datetime.now()
 
@@ -38,6 +36,6 @@ plot.draw((0, 0), MeshPlotMode.ONLY_FIRST, network)
 plot.draw((0, 1), MeshPlotMode.ALL_MESSAGES, network)
 plot.draw((1, 0), MeshPlotMode.BAR_RECEIVED, network)
 
-dump_history(network.network_history)
+dump_history(network.history)
 logging.critical(f"SEED USED to generate network: `{SEED}`")
 input("STOP")
@@ -0,0 +1,163 @@
+import enum
+import hashlib
+import heapq
+from typing import Dict, Set, List, Optional, FrozenSet
+
+UNICAST_MAX = 0x7FFF
+VIRTUAL_MIN = 0x8000
+GROUP_MIN = 0xC000
+ALL_PROXIES = 0xFFFC
+ALL_FRIENDS = 0xFFFD
+ALL_RELAYS = 0xFFFE
+ALL_NODES = 0xFFFF
+
+
+class AddressType(enum.Enum):
+    UNICAST = 1
+    """ Single node, 0x0000 - 0x7FFF (0x0000 is unassigned by the spec, in simulation it is usable) """
+    VIRTUAL = 2
+    """ Nodes subscribed to label, 0x8000 - 0xBFFF """
+    GROUP = 3
+    """ Nodes subscribed to group, 0xC000 - 0xFFFF, last four are fixed groups, e.g. `ALL_NODES` """
+
+
+def address_type(addr: int) -> AddressType:
+    if not 0 <= addr <= 0xFFFF:
+        raise ValueError(f"Address has to fit in 16 bits, got: {addr}")
+    if addr <= UNICAST_MAX:
+        return AddressType.UNICAST
+    if addr < GROUP_MIN:
+        return AddressType.VIRTUAL
+    return AddressType.GROUP
+
+
+def virtual_address(label: str) -> int:
+    """
+    Virtual address of given label, same label always gives the same address but different labels can collide
+    Hash of the label is taken with SHA-256 instead of AES-CMAC used by the spec, simulation does not use keys.
+    """
+    digest = hashlib.sha256(label.encode()).digest()
+    return VIRTUAL_MIN | (int.from_bytes(digest[-2:], "big") & 0x3FFF)
+
+
+class AddressManager:
+    """
+    Addresses used in single network
+
+    Unicast addresses are kept in a bitmap. Lowest free address is found from position below which all addresses
+    were handed out, or from heap of released addresses, so assignment is O(1) amortized instead of scanning
+    the whole address space. Group and virtual addresses map to nodes subscribed to them, so nodes to which frame
+    is addressed are resolved with single lookup, see `resolve`. Nodes themselves do not use the index,
+    each of them accepts and relays frames regardless of their destination.
+    """
+
+    def __init__(self, unicast_min: int = 0, unicast_max: int = UNICAST_MAX):
+        """
+        :param unicast_min: lowest address assigned to nodes
+        :param unicast_max: highest address assigned to nodes
+        """
+        if not 0 <= unicast_min <= unicast_max <= UNICAST_MAX:
+            raise ValueError(f"Invalid unicast range <{unicast_min};{unicast_max}>")
+        self.unicast_min = unicast_min
+        self.unicast_max = unicast_max
+        self._used = bytearray(unicast_max - unicast_min + 1)
+        self._next = 0
+        """ Offset in `_used` below which every address was assigned at some point """
+        self._released: List[int] = []
+        """ Heap of released offsets below `_next` """
+        self._assigned: Set[int] = set()
+        self._subscribers: Dict[int, Set[int]] = {}
+        self.labels: Dict[int, Set[str]] = {}
+        """ Labels of virtual addresses in use """
+
+    def assign(self, requested: Optional[int] = None) -> int:
+        """
+        :param requested: address requested for the node, lowest free one is assigned when `None`
+        :return: unicast address of the node
+        """
+        if requested is None:
+            offset = self._lowest_free()
+        elif isinstance(requested, int):
+            if not self.unicast_min <= requested <= self.unicast_max:
+                raise ValueError(f"{requested} not in allowed range <{self.unicast_min};{self.unicast_max}>")
+            offset = requested - self.unicast_min
+            if self._used[offset]:
+                raise ValueError(f"Requested address {requested} already present in the network")
+        else:
+            raise TypeError(f"Requested address of invalid type: {type(requested)}")
+
+        self._used[offset] = 1
+        addr = self.unicast_min + offset
+        self._assigned.add(addr)
+        return addr
+
+    def _lowest_free(self) -> int:
+        while self._released:
+            offset = heapq.heappop(self._released)
+            if not self._used[offset]:
+                return offset
+        while self._next < len(self._used) and self._used[self._next]:
+            self._next += 1
+        if self._next == len(self._used):
+            raise ValueError(f"No free address left in <{self.unicast_min};{self.unicast_max}>")
+        return self._next
+
+    def release(self, addr: int) -> None:
+        """ Free unicast address of node leaving the network, together with its subscriptions """
+        if addr not in self._assigned:
+            raise ValueError(f"Address {addr} is not assigned")
+        offset = addr - self.unicast_min
+        self._used[offset] = 0
+        self._assigned.discard(addr)
+        if offset < self._next:
+            heapq.heappush(self._released, offset)
+        for address in [a for a, subscribers in self._subscribers.items() if addr in subscribers]:
+            self.unsubscribe(addr, address)
+
+    def subscribe(self, addr: int, address: int, label: Optional[str] = None) -> None:
+        """
+        Make node `addr` receive frames send to group or virtual `address`
+
+        :param label: label of virtual address, see `virtual_address`
+        """
+        kind = address_type(address)
+        if kind is AddressType.UNICAST:
+            raise ValueError(f"Nodes can subscribe only to group or virtual addresses, got: {address}")
+        if addr not in self._assigned:
+            raise ValueError(f"Address {addr} is not assigned")
+        if kind is AddressType.VIRTUAL and label is not None:
+            self.labels.setdefault(address, set()).add(label)
+        self._subscribers.setdefault(address, set()).add(addr)
+
+    def subscribe_label(self, addr: int, label: str) -> int:
+        """ :return: virtual address of `label` to which node `addr` is now subscribed """
+        address = virtual_address(label)
+        self.subscribe(addr, address, label)
+        return address
+
+    def unsubscribe(self, addr: int, address: int) -> None:
+        subscribers = self._subscribers.get(address)
+        if subscribers is None:
+            return
+        subscribers.discard(addr)
+        if not subscribers:
+            del self._subscribers[address]
+            self.labels.pop(address, None)
+
+    def resolve(self, dest: int) -> FrozenSet[int]:
+        """
+        Addresses of nodes to which frame send to `dest` is addressed, used to tell whether message was delivered
+        (see `mesh.analytics.message_summary`). Every simulated node relays, proxy and friend features are not
+        simulated, so `ALL_RELAYS` resolves to all nodes and `ALL_PROXIES` with `ALL_FRIENDS` to none.
+        """
+        if dest in (ALL_NODES, ALL_RELAYS):
+            return frozenset(self._assigned)
+        if dest <= UNICAST_MAX:
+            return frozenset((dest,)) if dest in self._assigned else frozenset()
+        return frozenset(self._subscribers.get(dest, ()))
+
+    def __contains__(self, addr: int) -> bool:
+        return addr in self._assigned
+
+    def __len__(self):
+        return len(self._assigned)
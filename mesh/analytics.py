@@ -0,0 +1,145 @@
+"""
+    Flood analytics over reception records
+
+    Records of `Network.history` or of a trace written by `TraceWriter` are loaded into a `pandas.DataFrame`
+    and summarised by vectorized group-bys, one row per message (`src`, `seq`) or per node,
+    so runs with millions of receptions are summarised in seconds.
+
+    Send time of a message is not recorded, times are counted from its first reception anywhere in the network.
+    Hops are counted from TTL, first hop being the highest TTL message was heard with (see `Plot.get_arrivals`).
+"""
+from typing import Callable, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from mesh.trace import TraceReader
+
+MESSAGE = ["src", "seq"]
+COLUMNS = ["timestamp", "reporter", "source_addr", "src", "dest", "seq", "ttl", "accepted"]
+""" Columns used by the summaries, positions of nodes are not read from traces """
+
+Source = Union[str, TraceReader, np.ndarray, pd.DataFrame]
+Resolver = Callable[[int], Iterable[int]]
+""" Addresses of nodes to which message send to given destination is addressed, e.g. `AddressManager.resolve` """
+
+
+def load_history(source: Source) -> pd.DataFrame:
+    """
+    :param source: records of `Network.history`, trace reader or path of the trace
+    :return: records ordered by timestamp
+    """
+    if isinstance(source, str):
+        source = TraceReader(source)
+    if isinstance(source, TraceReader):
+        source = _read_columns(source)
+    history = source if isinstance(source, pd.DataFrame) else pd.DataFrame(np.asarray(source))
+    if not history["timestamp"].is_monotonic_increasing:
+        history = history.sort_values("timestamp", kind="stable", ignore_index=True)
+    return history
+
+
+def _read_columns(reader: TraceReader) -> pd.DataFrame:
+    """ Only `COLUMNS` of the trace, copied chunk by chunk instead of loading whole records into memory """
+    columns = {name: np.empty(len(reader), dtype=reader.dtype[name]) for name in COLUMNS}
+    start = 0
+    for chunk in reader.chunks():
+        for name, column in columns.items():
+            column[start:start + len(chunk)] = chunk[name]
+        start += len(chunk)
+    return pd.DataFrame(columns)
+
+
+def first_arrivals(history: pd.DataFrame) -> pd.DataFrame:
+    """ Accepted records, only the first one of every message at every node """
+    accepted = history[history["accepted"]]
+    return accepted.drop_duplicates(MESSAGE + ["reporter"])
+
+
+def _at_destination(arrivals: pd.DataFrame, resolve: Optional[Resolver]) -> pd.Series:
+    """ Mask of arrivals at nodes to which the message is addressed """
+    if resolve is None:
+        return arrivals["reporter"] == arrivals["dest"]
+    mask = np.zeros(len(arrivals), dtype=np.bool_)
+    dest, reporter = arrivals["dest"].to_numpy(), arrivals["reporter"].to_numpy()
+    # Destinations are few comparing to records, each of them is resolved once
+    for address in np.unique(dest):
+        members = np.fromiter(resolve(int(address)), dtype=np.int64)
+        mask |= (dest == address) & np.isin(reporter, members)
+    return pd.Series(mask, index=arrivals.index)
+
+
+def message_summary(source: Source, resolve: Optional[Resolver] = None,
+                    node_count: Optional[int] = None) -> pd.DataFrame:
+    """
+    Metrics of every flood, indexed by (`src`, `seq`):
+
+    - `receptions` - frames of the message heard by all nodes, `redundant` - those which were not its first arrival
+    - `transmissions` - nodes which send the message, source included
+    - `reached` - nodes which accepted the message, `coverage` - their fraction of other nodes (needs `node_count`)
+    - `efficiency` - nodes reached per transmission
+    - `depth` - hops in which the message reached the farthest node
+    - `delivered`, `latency` and `hops` - whether, when and in how many hops the message reached its destination
+
+    :param resolve: nodes addressed by group and virtual destinations, unicast destinations are used as they are
+    :param node_count: number of nodes in the network
+    """
+    history = load_history(source)
+    messages = history.groupby(MESSAGE, sort=True)
+    summary = messages.agg(
+        dest=("dest", "first"),
+        first_heard=("timestamp", "min"),
+        first_ttl=("ttl", "max"),
+        receptions=("timestamp", "size"),
+        transmissions=("source_addr", "nunique"),
+    )
+
+    arrivals = first_arrivals(history)
+    reached = arrivals.groupby(MESSAGE).agg(reached=("reporter", "size"), last_ttl=("ttl", "min"))
+    arrived = arrivals[_at_destination(arrivals, resolve)].groupby(MESSAGE).agg(
+        arrival=("timestamp", "min"), dest_ttl=("ttl", "max")
+    )
+    summary = summary.join(reached).join(arrived)
+    summary["reached"] = summary["reached"].fillna(0).astype(np.int64)
+
+    summary["redundant"] = summary["receptions"] - summary["reached"]
+    summary["efficiency"] = summary["reached"] / summary["transmissions"]
+    summary["depth"] = summary["first_ttl"] - summary["last_ttl"] + 1
+    summary["delivered"] = summary["arrival"].notna()
+    summary["latency"] = summary["arrival"] - summary["first_heard"]
+    summary["hops"] = summary["first_ttl"] - summary["dest_ttl"] + 1
+    if node_count is not None:
+        summary["coverage"] = summary["reached"] / max(node_count - 1, 1)
+    return summary.drop(columns=["first_ttl", "last_ttl", "dest_ttl", "arrival"])
+
+
+def node_summary(source: Source) -> pd.DataFrame:
+    """
+    Metrics of every node, indexed by its address:
+
+    - `received` - frames heard, `accepted` - frames accepted, `redundant` - frames dropped (e.g. by replay protection)
+    - `transmitted` - messages send by the node, own and relayed
+    """
+    history = load_history(source)
+    nodes = history.groupby("reporter").agg(received=("accepted", "size"), accepted=("accepted", "sum"))
+    nodes["redundant"] = nodes["received"] - nodes["accepted"]
+    transmitted = history.drop_duplicates(MESSAGE + ["source_addr"])["source_addr"].value_counts()
+    nodes = nodes.join(transmitted.rename("transmitted"), how="outer").fillna(0).astype(np.int64)
+    nodes.index.name = "addr"
+    return nodes
+
+
+def coverage_over_time(source: Source, node_count: Optional[int] = None) -> pd.DataFrame:
+    """
+    Progress of every flood, one row per node reached: `time` since the first reception of the message
+    and number of nodes `reached` by then (`coverage` - their fraction of other nodes, needs `node_count`)
+    """
+    history = load_history(source)
+    arrivals = first_arrivals(history)
+    started = history.groupby(MESSAGE)["timestamp"].transform("min")
+    progress = arrivals[MESSAGE + ["reporter"]].assign(time=arrivals["timestamp"] - started[arrivals.index])
+    progress = progress.sort_values(MESSAGE + ["time"], kind="stable", ignore_index=True)
+    progress["reached"] = progress.groupby(MESSAGE).cumcount() + 1
+    if node_count is not None:
+        progress["coverage"] = progress["reached"] / max(node_count - 1, 1)
+    return progress
@@ -0,0 +1,203 @@
+"""
+    Radio channel of discrete simulation
+
+    Without channel every frame is heard by every node in range. `Channel` makes frames take airtime
+    and compete for the medium: frames send during a slot are resolved together, every reception
+    is checked at once with array operations for loss by distance, collision with overlapping frames
+    and receiver being busy with its own transmission.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from mesh.message import GenericMessageEvent
+from mesh.topology import Topology
+
+ADV_OVERHEAD = 17
+""" Bytes of BLE advertising packet around mesh PDU: preamble, access address, header, AdvA, AD length and type, CRC """
+
+
+class Channel:
+    """
+    Single shared advertising channel
+
+    Each frame starts after random advertising delay and lasts for its airtime. Reception margin (dB above
+    sensitivity) falls with distance as log-distance path loss, so with no shadowing frame is received exactly
+    up to the range of the network. Frames overlapping at a receiver collide, unless one is stronger
+    by `capture` dB, and node does not hear anything while it is transmitting.
+
+    Frame is resolved only once every frame which could overlap it is known, receptions are delivered
+    at the first slot boundary after the frame ends.
+    """
+
+    def __init__(self, slot: float = 0.001, adv_delay: float = 0.01, bitrate: float = 1e6,
+                 path_loss_exponent: float = 3.0, shadowing: float = 0.0, capture: float = 6.0,
+                 seed: Optional[int] = None):
+        """
+        :param slot: frames send within this many seconds are resolved together
+        :param adv_delay: max random delay before frame is put on air, as advDelay of BLE advertising (0 - 10 ms)
+        :param bitrate: bits per second, 1 Mbps of BLE 1M PHY by default
+        :param path_loss_exponent: how fast signal weakens with distance, 2 in free space, 3 - 4 indoors
+        :param shadowing: standard deviation of random fading, in dB
+        :param capture: frame stronger than every overlapping one by this many dB is still received,
+            `float("inf")` makes every overlap a collision
+        """
+        if slot <= 0:
+            raise ValueError(f"Slot has to be positive, got: {slot}")
+        self.slot = slot
+        self.adv_delay = adv_delay
+        self.bitrate = bitrate
+        self.path_loss_exponent = path_loss_exponent
+        self.shadowing = shadowing
+        self.capture = capture
+        self.rng = np.random.default_rng(seed)
+
+        self._sent: List[Tuple[float, GenericMessageEvent]] = []
+        """ Frames send since last `resolve`, with time they were send """
+        self._frames: List[GenericMessageEvent] = []
+        """ Frames on air or still overlapping some frame on air, arrays below are indexed by them """
+        self._start = np.empty(0)
+        self._end = np.empty(0)
+        self._resolved = np.empty(0, dtype=np.bool_)
+        # Receptions of every frame: (frame, receiving node, margin), own frame of receiver has infinite margin
+        self._pair_frame = np.empty(0, dtype=np.int64)
+        self._pair_node = np.empty(0, dtype=np.int64)
+        self._pair_margin = np.empty(0)
+        self._pair_own = np.empty(0, dtype=np.bool_)
+
+        self.delivered = 0
+        self.faded = 0
+        """ Receptions lost because signal was too weak """
+        self.collided = 0
+        """ Receptions lost because of overlapping frames """
+        self.deaf = 0
+        """ Receptions lost because receiver was transmitting """
+        self.airtime_used = 0.0
+        """ Total time frames were on air, divided by simulated time gives channel occupancy """
+
+    def airtime(self, frame: GenericMessageEvent) -> float:
+        return (ADV_OVERHEAD + len(frame.data)) * 8 / self.bitrate
+
+    def transmit(self, now: float, frame: GenericMessageEvent) -> None:
+        self._sent.append((now, frame))
+
+    @property
+    def idle(self) -> bool:
+        return not self._sent and self._resolved.all()
+
+    def next_resolution(self, now: float) -> float:
+        """ Clock time at which `resolve` should be called next, if channel is not `idle` """
+        if self._sent:
+            return now + self.slot
+        return max(now + self.slot, float(self._end[~self._resolved].min()))
+
+    def resolve(self, now: float, topology: Topology) -> List[Tuple[GenericMessageEvent, np.ndarray]]:
+        """
+        Frames which ended by `now`
+
+        :param topology: positions and neighbors of nodes
+        :return: resolved frames heard by any node, in order in which they started, with addresses of those nodes
+        """
+        self._put_on_air(topology)
+        if not len(self._frames):
+            return []
+        lost_to = self._strongest_interference()
+
+        done = ~self._resolved & (self._end <= now)
+        pairs = done[self._pair_frame] & ~self._pair_own
+        margin = self._pair_margin[pairs]
+        interference = lost_to[pairs]
+        faded = margin < 0
+        deaf = ~faded & (interference == np.inf)
+        with np.errstate(invalid="ignore"):
+            collided = ~faded & ~deaf & (margin - interference < self.capture)
+        received = ~(faded | deaf | collided)
+        self.faded += int(faded.sum())
+        self.deaf += int(deaf.sum())
+        self.collided += int(collided.sum())
+        self.delivered += int(received.sum())
+
+        frame_of, node_of = self._pair_frame[pairs][received], self._pair_node[pairs][received]
+        order = np.lexsort((node_of, frame_of, self._start[frame_of]))
+        frame_of, node_of = frame_of[order], node_of[order]
+        firsts = np.flatnonzero(np.diff(frame_of, prepend=-1))
+        heard = zip(frame_of[firsts].tolist(), np.split(node_of, firsts[1:]))
+        results = [(self._frames[frame], nodes) for frame, nodes in heard]
+
+        self._resolved |= done
+        self._forget_past()
+        return results
+
+    def _put_on_air(self, topology: Topology) -> None:
+        """ Give frames send since last resolution their start, end and receptions, all at once """
+        sent, self._sent = self._sent, []
+        sent = [(when, frame) for when, frame in sent if frame.source_addr in topology.index]
+        if not sent:
+            return
+        senders = np.array([topology.index[frame.source_addr] for _, frame in sent], dtype=np.int64)
+        airtime = np.array([self.airtime(frame) for _, frame in sent])
+        start = np.array([when for when, _ in sent]) + self.rng.uniform(0, self.adv_delay, len(sent))
+        self.airtime_used += float(airtime.sum())
+
+        first = len(self._frames)
+        frames = np.arange(first, first + len(sent))
+        neighbors = [topology.rows[sender] for sender in senders.tolist()]
+        counts = np.fromiter((len(row) for row in neighbors), dtype=np.int64, count=len(neighbors))
+        receivers = np.concatenate(neighbors).astype(np.int64) if neighbors else np.empty(0, dtype=np.int64)
+        pair_frame = np.repeat(frames, counts)
+        delta = topology.coords[receivers] - topology.coords[np.repeat(senders, counts)]
+        with np.errstate(divide="ignore"):
+            margin = 10 * self.path_loss_exponent * np.log10(topology.range / np.hypot(delta[:, 0], delta[:, 1]))
+        if self.shadowing:
+            margin += self.rng.normal(0, self.shadowing, len(margin))
+
+        self._frames.extend(frame for _, frame in sent)
+        self._start = np.concatenate((self._start, start))
+        self._end = np.concatenate((self._end, start + airtime))
+        self._resolved = np.concatenate((self._resolved, np.zeros(len(sent), dtype=np.bool_)))
+        self._pair_frame = np.concatenate((self._pair_frame, pair_frame, frames))
+        self._pair_node = np.concatenate((self._pair_node, topology.addrs[receivers], topology.addrs[senders]))
+        self._pair_margin = np.concatenate((self._pair_margin, margin, np.full(len(sent), np.inf)))
+        self._pair_own = np.concatenate((
+            self._pair_own, np.zeros(len(receivers), dtype=np.bool_), np.ones(len(sent), dtype=np.bool_)
+        ))
+
+    def _strongest_interference(self) -> np.ndarray:
+        """
+        Margin of the strongest frame overlapping every reception at the same node, `-inf` if there is none
+        Receptions are sorted by node and start, so frames overlapping one are next to it. Each pass compares
+        receptions `offset` places apart, passes stop when no pair that far apart overlaps.
+        """
+        order = np.lexsort((self._start[self._pair_frame], self._pair_node))
+        node = self._pair_node[order]
+        start = self._start[self._pair_frame][order]
+        end = self._end[self._pair_frame][order]
+        margin = self._pair_margin[order]
+        strongest = np.full(len(order), -np.inf)
+        for offset in range(1, len(order)):
+            overlap = (node[offset:] == node[:-offset]) & (start[offset:] < end[:-offset])
+            if not overlap.any():
+                break
+            earlier = np.flatnonzero(overlap)
+            later = earlier + offset
+            np.maximum.at(strongest, earlier, margin[later])
+            np.maximum.at(strongest, later, margin[earlier])
+        lost_to = np.empty_like(strongest)
+        lost_to[order] = strongest
+        return lost_to
+
+    def _forget_past(self) -> None:
+        """ Drop resolved frames which cannot overlap any frame still on air """
+        pending = ~self._resolved
+        horizon = self._start[pending].min() if pending.any() else np.inf
+        keep = pending | (self._end > horizon)
+        if keep.all():
+            return
+        index = np.cumsum(keep) - 1
+        pairs = keep[self._pair_frame]
+        self._frames = [frame for frame, kept in zip(self._frames, keep.tolist()) if kept]
+        self._start, self._end, self._resolved = self._start[keep], self._end[keep], self._resolved[keep]
+        self._pair_frame = index[self._pair_frame[pairs]]
+        self._pair_node = self._pair_node[pairs]
+        self._pair_margin = self._pair_margin[pairs]
+        self._pair_own = self._pair_own[pairs]
@@ -1,8 +1,9 @@
-from typing import Optional, List
+from typing import Optional
 
+import numpy as np
 from lahja import EndpointAPI
 
-from mesh.message import GenericMessageReceivedReport
+from mesh.trace import TraceWriter
 
 
 class BusConnected:
@@ -20,24 +21,7 @@ class BusConnected:
         self._network_bus = value
 
 
-def dump_history(history: List[GenericMessageReceivedReport]):
-    import csv
-    with open('history.csv', 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            "timestamp",
-            "Source_x",
-            "Source_y",
-            "target_x",
-            "target_y",
-            "data"
-        ])
-        for entry in history:
-            writer.writerow([
-                entry.timestamp,
-                entry.source_position.x,
-                entry.source_position.y,
-                entry.target_position.x,
-                entry.target_position.y,
-                entry.data
-            ])
\ No newline at end of file
+def dump_history(history: np.ndarray, path: str = "history.trace"):
+    """ Write `Network.history` records into binary trace, read it back with `TraceReader` """
+    with TraceWriter(path) as writer:
+        writer.write(history)
@@ -0,0 +1,158 @@
+import asyncio
+from typing import Callable, List, Dict, Awaitable, Optional, Iterable
+
+from mesh.channel import Channel
+from mesh.history import HistoryRecorder
+from mesh.message import GenericMessageEvent
+from mesh.node.base import MeshNodeAsync
+from mesh.scheduler import EventQueue, Scheduler
+from utils.log import Loggable
+
+
+class LocalBus:
+    """
+    In-process replacement of lahja endpoint used by nodes driven by `DiscreteEventEngine`
+    Only `broadcast` is used by nodes, so only `broadcast` is provided
+    """
+
+    def __init__(self, engine: "DiscreteEventEngine"):
+        self.engine = engine
+
+    async def broadcast(self, message: GenericMessageEvent, config=None) -> None:
+        self.engine.transmit(message)
+
+
+class DiscreteEventEngine(Scheduler, Loggable):
+    """
+    Single process simulation of `Network` driven by virtual clock
+
+    Nodes are not started as separate processes, instead their hooks are called directly from the queue of events.
+    Simulated time advances from one event to another, so run takes as long as CPU needs to process all the events.
+
+    Engine can be run many times, each run continues from the state in which the previous one stopped.
+    Between runs nodes can be added to or removed from the network, and engine together with its nodes
+    and events in flight can be pickled, see `Network.checkpoint`.
+    """
+
+    def __init__(self, network, transmission_delay: float = 0.001):
+        """
+        :param network: network which nodes will be simulated
+        :param transmission_delay: virtual time between frame being send and being heard by other nodes
+        """
+        super().__init__()
+        self.network = network
+        self.transmission_delay = transmission_delay
+        self.queue = EventQueue()
+        self.now: float = 0.0
+        self.bus = LocalBus(self)
+        self.nodes: List[MeshNodeAsync] = []
+        self.receivers: Dict[int, List[MeshNodeAsync]] = {}
+        self._node_of: Dict[int, MeshNodeAsync] = {}
+        self.processed_events = 0
+        self.transmissions = 0
+        self.channel: Optional[Channel] = network.channel
+        self._resolving = False
+        self.monitor: Optional[Callable[[], None]] = None
+        self._monitor_generation = 0
+
+    def __getstate__(self):
+        """ Monitor is usually a closure which cannot be pickled, it is left out and its pending calls cancelled """
+        state = self.__dict__.copy()
+        state.update(monitor=None, _monitor_generation=self._monitor_generation + 1)
+        return state
+
+    def clock(self) -> float:
+        return self.now
+
+    def call_at(self, when: float, callback: Callable[..., Awaitable], *args) -> None:
+        self.queue.push(max(when, self.now), callback, *args)
+
+    def setup(self, recorder: HistoryRecorder) -> None:
+        """ Attach network nodes to engine, first tick is scheduled for nodes which are new to the engine """
+        removed = {id(node) for node in self.nodes if node.network is not self.network}
+        if removed:
+            self.queue.remove_if(lambda callback, args: id(getattr(callback, "__self__", None)) in removed)
+            for node in self.nodes:
+                if id(node) in removed:
+                    node.scheduler = None
+        self.nodes = sorted(self.network.nodes, key=lambda n: n.addr)
+        self._node_of = {node.addr: node for node in self.nodes}
+        self.receivers = {}
+        self.update_receivers(self._node_of)
+        buffers = recorder.open(node.addr for node in self.nodes)
+        for node in self.nodes:
+            node.attach_history(buffers[node.addr])
+            if node.scheduler is not self:
+                node.network_bus = self.bus
+                node.clock = self.clock
+                node.scheduler = self
+                node.start_time = self.now
+                self.call_at(self.now, node.tick)
+
+    def update_receivers(self, addrs: Iterable[int]) -> None:
+        """ Neighbors of given nodes changed, e.g. because nodes moved """
+        node_of, topology = self._node_of, self.network.topology
+        for addr in addrs:
+            self.receivers[addr] = [node_of[neighbor] for neighbor in topology.neighbors(addr).tolist()]
+
+    def watch(self, monitor: Optional[Callable[[], None]], interval: float) -> None:
+        """ Call `monitor` every `interval` seconds of virtual time from now on, replaces previous monitor """
+        self._monitor_generation += 1
+        self.monitor = monitor
+        if monitor is not None:
+            self.call_at(self.now + interval, self._watch, self._monitor_generation, interval)
+
+    async def _watch(self, generation: int, interval: float) -> None:
+        if generation == self._monitor_generation:
+            self.monitor()
+            self.call_at(self.now + interval, self._watch, generation, interval)
+
+    def run_for(self, duration: float, recorder: HistoryRecorder) -> None:
+        """ Simulate `duration` seconds of virtual time, receptions are stored in `recorder` """
+        self.setup(recorder)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.run_until(self.now + duration))
+        finally:
+            loop.close()
+
+    async def run_until(self, until: float) -> None:
+        while self.queue.peek_time() <= until:
+            self.now, callback, args = self.queue.pop()
+            await callback(*args)
+            self.processed_events += 1
+        self.now = until
+        self.logger.info(f"Simulation finished at [{self.now}] after [{self.processed_events}] events")
+
+    def transmit(self, message: GenericMessageEvent) -> None:
+        """ Frame send by a node will be heard after `transmission_delay`, or as decided by the channel if set """
+        frame = message.copy(new_message_type=GenericMessageEvent)
+        frame.data = message.data.copy()
+        self.transmissions += 1
+        if self.channel is None:
+            self.queue.push(self.now + self.transmission_delay, self._deliver, frame)
+            return
+        self.channel.transmit(self.now, frame)
+        if not self._resolving:
+            self._resolving = True
+            self.queue.push(self.channel.next_resolution(self.now), self._resolve)
+
+    async def _resolve(self) -> None:
+        """ Deliver frames which ended since previous slot, to nodes which received them """
+        for frame, receivers in self.channel.resolve(self.now, self.network.topology):
+            # Receivers were in range when the frame was put on air, nodes which moved since still hear it
+            for addr in receivers.tolist():
+                message = frame.copy()
+                message.data = frame.data.copy()
+                await self._node_of[addr]._receive(message)
+        if self.channel.idle:
+            self._resolving = False
+        else:
+            self.queue.push(self.channel.next_resolution(self.now), self._resolve)
+
+    async def _deliver(self, frame: GenericMessageEvent) -> None:
+        # Frames send by node removed from the network are not heard
+        for node in self.receivers.get(frame.source_addr, ()):
+            message = frame.copy()
+            message.data = frame.data.copy()
+            await node._handle_received_message(message)
@@ -0,0 +1,280 @@
+from abc import ABCMeta, abstractmethod
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, List, Tuple, Callable, Optional
+
+import numpy as np
+
+from mesh.message import GenericMessageEvent, GenericMessageReceivedReport, NetworkPDU
+from utils.log import Loggable
+from utils.space import Position
+
+HISTORY_DTYPE = np.dtype([
+    ("timestamp", np.float64),
+    ("reporter", np.int32),
+    ("source_addr", np.int32),
+    ("source_x", np.float64),
+    ("source_y", np.float64),
+    ("target_x", np.float64),
+    ("target_y", np.float64),
+    ("src", np.int32),
+    ("dest", np.int32),
+    ("seq", np.int32),
+    ("ttl", np.int16),
+    ("accepted", np.bool_),
+])
+""" Fixed width record of single message reception, fields in order expected by `HistoryBuffer.append` """
+
+UNDEFINED = -1
+""" Stored in integer fields which value was `None` """
+
+
+class HistoryBuffer(metaclass=ABCMeta):
+    """ Append-only storage of reception records of single node """
+    flushed: int = 0
+    """ Number of oldest records already passed to the sink """
+
+    @abstractmethod
+    def append(self, record: Tuple) -> None:
+        """ Store record with fields ordered as in `HISTORY_DTYPE` """
+        raise NotImplementedError
+
+    @abstractmethod
+    def to_array(self) -> np.ndarray:
+        """ Copy of stored records, from oldest to newest """
+        raise NotImplementedError
+
+    def read(self, offset: int) -> Tuple[np.ndarray, int]:
+        """
+        :param offset: number of records appended before the ones wanted
+        :return: records appended after `offset` ones, and number of records appended so far
+        """
+        records = self.to_array()[offset:]
+        return records, offset + len(records)
+
+    def close(self) -> None:
+        """ Release resources held by the buffer """
+
+
+class ChunkedHistoryBuffer(HistoryBuffer):
+    """
+    In-process buffer, records are written into preallocated chunks, so appending never copies stored records
+    Chunks start small and double up to `CHUNK_SIZE`, so networks of many quiet nodes do not reserve much memory.
+    Each filled chunk is passed to `sink` right away, so it can be streamed while simulation is running
+    """
+    FIRST_CHUNK_SIZE = 64
+    CHUNK_SIZE = 4096
+
+    def __init__(self, sink: Optional[Callable[[np.ndarray], None]] = None):
+        self.chunks: List[np.ndarray] = []
+        self.count = 0
+        self.sink = sink
+        self._position = 0
+
+    def append(self, record: Tuple) -> None:
+        if not self.chunks or self._position == len(self.chunks[-1]):
+            size = min(self.FIRST_CHUNK_SIZE << len(self.chunks), self.CHUNK_SIZE)
+            self.chunks.append(np.empty(size, dtype=HISTORY_DTYPE))
+            self._position = 0
+        self.chunks[-1][self._position] = record
+        self._position += 1
+        self.count += 1
+        if self.sink is not None and self._position == len(self.chunks[-1]):
+            self.sink(self.chunks[-1])
+            self.flushed = self.count
+
+    def to_array(self) -> np.ndarray:
+        if not self.chunks:
+            return np.empty(0, dtype=HISTORY_DTYPE)
+        return np.concatenate(self.chunks[:-1] + [self.chunks[-1][:self._position]])
+
+
+class SharedHistoryRing(HistoryBuffer):
+    """
+    Ring of records in shared memory segment, written by node process and read by network process
+    Segment starts with header holding number of records ever appended. When ring is full oldest records are overwritten.
+    Ring send to process started by spawn or forkserver is pickled as name of the segment and attached to it again.
+    """
+    HEADER_SIZE = 64
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._attach(SharedMemory(create=True, size=self.HEADER_SIZE + capacity * HISTORY_DTYPE.itemsize))
+        self._header[0] = 0
+
+    def _attach(self, shm: SharedMemory):
+        self.shm = shm
+        self._header = np.ndarray((1,), dtype=np.int64, buffer=shm.buf)
+        self._records = np.ndarray((self.capacity,), dtype=HISTORY_DTYPE, buffer=shm.buf, offset=self.HEADER_SIZE)
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "name": self.shm.name}
+
+    def __setstate__(self, state):
+        self.capacity = state["capacity"]
+        self._attach(SharedMemory(state["name"]))
+
+    @property
+    def count(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self.count - self.capacity)
+
+    def append(self, record: Tuple) -> None:
+        count = int(self._header[0])
+        self._records[count % self.capacity] = record
+        self._header[0] = count + 1
+
+    def to_array(self) -> np.ndarray:
+        count = self.count
+        if count <= self.capacity:
+            return self._records[:count].copy()
+        start = count % self.capacity
+        return np.concatenate((self._records[start:], self._records[:start]))
+
+    def read(self, offset: int) -> Tuple[np.ndarray, int]:
+        """ Safe while node is appending, records are counted in header only after they are written """
+        count = self.count
+        first = max(offset, count - self.capacity)
+        start, end = first % self.capacity, count % self.capacity
+        if first == count:
+            return self._records[:0].copy(), count
+        if start < end:
+            return self._records[start:end].copy(), count
+        return np.concatenate((self._records[start:], self._records[:end])), count
+
+    def close(self) -> None:
+        del self._header, self._records
+        self.shm.close()
+        self.shm.unlink()
+
+
+class HistoryRecorder(Loggable):
+    """
+    Owner of history buffers of all nodes in the network
+
+    Opened as shared, each node gets its own `SharedHistoryRing`, so nodes running in separate processes
+    record receptions without any IPC and network can read them after nodes are stopped.
+    """
+
+    def __init__(self, capacity: int = 2 ** 16, sink: Optional[Callable[[np.ndarray], None]] = None):
+        """
+        :param capacity: max number of records kept per node, used only by shared buffers
+        :param sink: receiver of every recorded record, e.g. `TraceWriter.write`
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.sink = sink
+        self.buffers: Dict[int, HistoryBuffer] = {}
+        self._polled: Dict[int, int] = {}
+        """ Number of records of every buffer already returned by `poll` """
+
+    def open(self, addrs: Iterable[int], shared: bool = False) -> Dict[int, HistoryBuffer]:
+        """
+        :param addrs: addresses of nodes which will record history
+        :param shared: place buffers in shared memory, required when nodes run in separate processes
+        """
+        for addr in addrs:
+            self.buffers[addr] = SharedHistoryRing(self.capacity) if shared else ChunkedHistoryBuffer(self.sink)
+        self._polled = {}
+        return self.buffers
+
+    def poll(self) -> np.ndarray:
+        """ Records appended since previous poll, sorted by timestamp, can be called while nodes are running """
+        parts = []
+        for addr, buffer in self.buffers.items():
+            offset = self._polled.get(addr, 0)
+            records, self._polled[addr] = buffer.read(offset)
+            lost = self._polled[addr] - offset - len(records)
+            if lost:
+                self.logger.warning(f"Node_{addr} history overflowed before it was polled, {lost} records lost")
+            parts.append(records)
+        return _sorted(parts)
+
+    def flush(self) -> None:
+        """ Pass records appended since previous flush to the sink, can be called while nodes are running """
+        if self.sink is None:
+            return
+        for addr, buffer in sorted(self.buffers.items()):
+            self._flush(addr, buffer)
+
+    def _flush(self, addr: int, buffer: HistoryBuffer) -> None:
+        records, count = buffer.read(buffer.flushed)
+        lost = count - buffer.flushed - len(records)
+        if lost:
+            self.logger.warning(f"Node_{addr} history overflowed before it was flushed, {lost} records lost")
+        if len(records):
+            self.sink(records)
+        buffer.flushed = count
+
+    def collect(self) -> np.ndarray:
+        """ Records of all nodes sorted by timestamp, shared memory is released afterwards """
+        parts = []
+        for addr, buffer in sorted(self.buffers.items()):
+            if isinstance(buffer, SharedHistoryRing) and buffer.dropped:
+                self.logger.warning(f"Node_{addr} history overflowed, {buffer.dropped} oldest records lost")
+            if self.sink is not None:
+                self._flush(addr, buffer)
+            parts.append(buffer.to_array())
+            buffer.close()
+        self.buffers = {}
+        self._polled = {}
+        return _sorted(parts)
+
+
+def _sorted(parts: List[np.ndarray]) -> np.ndarray:
+    """ Records of all parts in one array, sorted by timestamp """
+    if not parts:
+        return np.empty(0, dtype=HISTORY_DTYPE)
+    history = np.concatenate(parts)
+    return history[np.argsort(history["timestamp"], kind="stable")]
+
+
+def _int_or_undefined(value) -> int:
+    return UNDEFINED if value is None else value
+
+
+def report_record(timestamp: float, reporter: int, message: GenericMessageEvent, target_position: Position,
+                  accepted: bool) -> Tuple:
+    """ Record describing reception of `message` by node `reporter` """
+    pdu = message.data
+    return (
+        timestamp,
+        reporter,
+        _int_or_undefined(message.source_addr),
+        message.source_position.x,
+        message.source_position.y,
+        target_position.x,
+        target_position.y,
+        pdu.src,
+        pdu.dest,
+        pdu.seq,
+        pdu.ttl,
+        accepted,
+    )
+
+
+def _int_or_none(value) -> int:
+    return None if value == UNDEFINED else int(value)
+
+
+def history_to_reports(history: np.ndarray) -> List[GenericMessageReceivedReport]:
+    """ Rebuild report objects out of history records, slow - use only for small histories """
+    reports = []
+    for entry in history.tolist():
+        timestamp, reporter, source_addr, source_x, source_y, target_x, target_y, src, dest, seq, ttl, accepted = entry
+        pdu = NetworkPDU()
+        pdu.src = src
+        pdu.dest = dest
+        pdu.seq = seq
+        pdu.ttl = ttl
+        report = GenericMessageReceivedReport(pdu)
+        report.timestamp = timestamp
+        report.reporter = reporter
+        report.accepted = accepted
+        report.source_addr = _int_or_none(source_addr)
+        report.source_position = Position(source_x, source_y)
+        report.target_position = Position(target_x, target_y)
+        reports.append(report)
+    return reports
@@ -1,3 +1,5 @@
+from typing import Optional, List, Tuple, Iterator, Iterable
+
 from lahja import BaseEvent
 
 from utils.space import Position
@@ -10,7 +12,8 @@ class GenericMessageEvent(BaseEvent):
     """
 
     source_position: Position = None
-    attrs_to_copy = ["source_position"]
+    source_addr: int = None
+    attrs_to_copy = ["source_position", "source_addr"]
 
     def __init__(self, data):
         super().__init__()
@@ -53,32 +56,186 @@ class GenericMessageReceivedReport(GenericMessageEvent):
         return super().__eq__(other) and self.target_position == other.target_position
 
 
+class GenericMessageBatchEvent(BaseEvent):
+    """
+    Many messages send through the bus as single event
+    Each message is kept as a plain tuple (packed PDU, source address, source x, source y)
+    """
+    message_type = GenericMessageEvent
+
+    def __init__(self, frames: List[Tuple[bytes, int, float, float]] = None):
+        super().__init__()
+        self.frames = [] if frames is None else frames
+
+    @staticmethod
+    def frame_of(message: GenericMessageEvent) -> Tuple[bytes, int, float, float]:
+        return message.data.to_bytes(), message.source_addr, message.source_position.x, message.source_position.y
+
+    def extend(self, messages: Iterable[GenericMessageEvent]) -> None:
+        self.frames.extend(self.frame_of(m) for m in messages)
+
+    def messages(self) -> Iterator[GenericMessageEvent]:
+        for pdu, source_addr, x, y in self.frames:
+            message = self.message_type(NetworkPDU(pdu))
+            message.source_addr = source_addr
+            message.source_position = Position(x, y)
+            yield message
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __str__(self):
+        return f"{self.__class__.__name__}[{len(self)} messages]"
+
+
+class GenericMessageOutgoingBatchEvent(GenericMessageBatchEvent):
+    message_type = GenericMessageOutgoingEvent
+
+
 class NetworkPDU:
+    """
+    Network PDU packed into its wire layout
+
+    IVI           1 Least significant bit of IV Index
+    NID           7 Value derived from the NetKey used to identify the Encryption Key and Privacy Key used to secure this PDU
+    CTL           1 Network Control
+    TTL           7 Time To Live
+    SEQ           24 Sequence Number
+    SRC           16 Source Address
+    DST           16 Destination Address
+    TransportPDU  8 to 128 Transport Protocol Data Unit
+    NetMIC        32 or 64 Message Integrity Check for Network
+
+    Fields are read from and written to single `bytearray`, so copy of PDU or TTL decrement touches only
+    few bytes and PDU is send through the bus as plain bytes.
+    """
+    __slots__ = ("_buffer",)
+
+    HEADER_SIZE = 9
 
-    def __init__(self):
+    def __init__(self, buffer: Optional[bytes] = None):
         """
-        IVI           1 Least significant bit of IV Index
-        NID           7 Value derived from the NetKey used to identify the Encryption Key and Privacy Key used to secure this PDU
-        CTL           1 Network Control
-        TTL           7 Time To Live
-        SEQ           24 Sequence Number
-        SRC           16 Source Address
-        DST           16 Destination Address
-        TransportPDU  8 to 128 Transport Protocol Data Unit
-        NetMIC        32 or 64 Message Integrity Check for Network
+        :param buffer: packed PDU, empty PDU with all fields set to 0 is created if not given
         """
-        self.ivi = None
-        self.nid = None
-        self.ctl = None
-        self.ttl = None
-        self.seq = None
-        self.src = None
-        self.dest = None
-        self.transport_pdu = None
-        self.net_mic = None
+        self._buffer = bytearray(buffer) if buffer is not None else bytearray(self.HEADER_SIZE + 4)
+        if len(self._buffer) < self.HEADER_SIZE + self._mic_size:
+            raise ValueError(f"Network PDU too short: {len(self._buffer)} bytes")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "NetworkPDU":
+        return cls(data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._buffer)
+
+    def __bytes__(self):
+        return self.to_bytes()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __reduce__(self):
+        return self.__class__, (bytes(self._buffer),)
+
+    def __eq__(self, other):
+        return isinstance(other, NetworkPDU) and self._buffer == other._buffer
+
+    def __hash__(self):
+        return hash(bytes(self._buffer))
+
+    def copy(self) -> "NetworkPDU":
+        return self.__class__(self._buffer)
+
+    @staticmethod
+    def _checked(value: int, bits: int, name: str) -> int:
+        if not 0 <= value < (1 << bits):
+            raise ValueError(f"{name} has to fit in {bits} bits, got: {value}")
+        return value
+
+    @property
+    def _mic_size(self) -> int:
+        return 8 if self._buffer[1] & 0x80 else 4
+
+    @property
+    def ivi(self) -> int:
+        return self._buffer[0] >> 7
+
+    @ivi.setter
+    def ivi(self, value: int):
+        self._buffer[0] = (self._checked(value, 1, "IVI") << 7) | (self._buffer[0] & 0x7F)
+
+    @property
+    def nid(self) -> int:
+        return self._buffer[0] & 0x7F
+
+    @nid.setter
+    def nid(self, value: int):
+        self._buffer[0] = (self._buffer[0] & 0x80) | self._checked(value, 7, "NID")
+
+    @property
+    def ctl(self) -> int:
+        return self._buffer[1] >> 7
+
+    @ctl.setter
+    def ctl(self, value: int):
+        """ NetMIC size depends on CTL, so NetMIC is resized keeping its least significant bytes """
+        net_mic = self.net_mic
+        del self._buffer[len(self._buffer) - self._mic_size:]
+        self._buffer[1] = (self._checked(value, 1, "CTL") << 7) | (self._buffer[1] & 0x7F)
+        self._buffer += bytes(self._mic_size)
+        self.net_mic = net_mic
+
+    @property
+    def ttl(self) -> int:
+        return self._buffer[1] & 0x7F
+
+    @ttl.setter
+    def ttl(self, value: int):
+        self._buffer[1] = (self._buffer[1] & 0x80) | self._checked(value, 7, "TTL")
+
+    @property
+    def seq(self) -> int:
+        return int.from_bytes(self._buffer[2:5], "big")
+
+    @seq.setter
+    def seq(self, value: int):
+        self._buffer[2:5] = self._checked(value, 24, "SEQ").to_bytes(3, "big")
+
+    @property
+    def src(self) -> int:
+        return int.from_bytes(self._buffer[5:7], "big")
+
+    @src.setter
+    def src(self, value: int):
+        self._buffer[5:7] = self._checked(value, 16, "SRC").to_bytes(2, "big")
+
+    @property
+    def dest(self) -> int:
+        return int.from_bytes(self._buffer[7:9], "big")
+
+    @dest.setter
+    def dest(self, value: int):
+        self._buffer[7:9] = self._checked(value, 16, "DST").to_bytes(2, "big")
+
+    @property
+    def transport_pdu(self) -> bytes:
+        return bytes(self._buffer[self.HEADER_SIZE:len(self._buffer) - self._mic_size])
+
+    @transport_pdu.setter
+    def transport_pdu(self, value: Optional[bytes]):
+        self._buffer[self.HEADER_SIZE:len(self._buffer) - self._mic_size] = b"" if value is None else value
+
+    @property
+    def net_mic(self) -> bytes:
+        return bytes(self._buffer[len(self._buffer) - self._mic_size:])
+
+    @net_mic.setter
+    def net_mic(self, value: bytes):
+        size = self._mic_size
+        self._buffer[len(self._buffer) - size:] = bytes(value).rjust(size, b"\x00")[-size:]
 
     def __str__(self):
-        return f"NetPDU[{self.src}->{self.dest}][SEQ:{self.seq}][TTL:{self.ttl}][Data:{self.transport_pdu}]"
+        return f"NetPDU[{self.src}->{self.dest}][SEQ:{self.seq}][TTL:{self.ttl}][Data:{self.transport_pdu.hex()}]"
 
     def __repr__(self):
         return self.__str__()
@@ -0,0 +1,160 @@
+import enum
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+class Metric(enum.IntEnum):
+    """ Counters kept for every node """
+    FRAMES_HEARD = 0
+    """ Frames delivered to the node, including ones from nodes out of its range """
+    OUT_OF_RANGE = 1
+    """ Frames dropped because sender is not in range of the node """
+    RPL_DROPPED = 2
+    """ Frames dropped by replay protection """
+    TTL_EXPIRED = 3
+    """ Accepted frames not relayed because their TTL run out """
+    SENT = 4
+    """ Frames send by the node, both own and relayed """
+    RELAYED = 5
+    """ Frames send while handling received one """
+    SUPPRESSED = 6
+    """ Relays given up by relay policy of the node """
+
+
+class Histogram(enum.IntEnum):
+    """ Histograms kept for every node, see `bucket_bounds` """
+    RELAY_LATENCY = 0
+    """
+    Time between node starting to handle received frame and passing its relay to the bus, backoff included
+    Measured with clock of the node, so in discrete simulation it is virtual time
+    """
+    LOOP_LAG = 1
+    """ How late node tick was called comparing to time it was scheduled for """
+
+
+BUCKETS = 32
+""" Bucket `i` of histogram counts values in range <2^(i-1); 2^i) microseconds, bucket 0 counts values below 1 us """
+
+_COLUMNS = len(Metric) + len(Histogram) * BUCKETS
+
+METRICS_DTYPE = np.dtype(
+    [(metric.name.lower(), np.int64) for metric in Metric]
+    + [(histogram.name.lower(), np.int64, (BUCKETS,)) for histogram in Histogram]
+)
+""" Single node row of `MetricsRegistry.sample`, layout matches row of the underlying table """
+
+
+def bucket_bounds() -> np.ndarray:
+    """ Upper bound, in seconds, of every histogram bucket """
+    return np.ldexp(1.0, np.arange(BUCKETS)) / 1e6
+
+
+class NodeMetrics:
+    """
+    Counters of single node, view on its row of `MetricsRegistry` table
+    Row is written only by process hosting the node, so no locking is needed. Row of shared table send
+    to process started by spawn or forkserver is pickled as name of the segment and index of the row.
+    """
+    __slots__ = ("_row", "received_at", "_shm", "_index")
+
+    def __init__(self, row: np.ndarray, shm: Optional[SharedMemory] = None, index: int = 0):
+        """
+        :param shm: shared segment holding the table, `None` when table is in process memory
+        :param index: row of the node in the table
+        """
+        self._row = row
+        self._shm = shm
+        self._index = index
+        self.received_at: Optional[float] = None
+        """ Clock time of reception currently handled by the node, used to measure relay latency """
+
+    def __reduce__(self):
+        if self._shm is None:
+            return NodeMetrics, (self._row.copy(),)
+        return _attach_row, (self._shm.name, self._index)
+
+    def count(self, metric: Metric, value: int = 1) -> None:
+        self._row[metric] += value
+
+    def observe(self, histogram: Histogram, seconds: float) -> None:
+        bucket = min(int(seconds * 1e6).bit_length(), BUCKETS - 1) if seconds > 0 else 0
+        self._row[len(Metric) + histogram * BUCKETS + bucket] += 1
+
+    def frame_sent(self, now: float) -> None:
+        """
+        Frame passed to the bus, it is a relay if node is handling received frame at the moment
+
+        :param now: clock time of the node, wall time in realtime and virtual time in discrete simulation
+        """
+        self._row[Metric.SENT] += 1
+        if self.received_at is not None:
+            self._row[Metric.RELAYED] += 1
+            self.observe(Histogram.RELAY_LATENCY, now - self.received_at)
+
+    def __getitem__(self, metric: Metric) -> int:
+        return int(self._row[metric])
+
+
+def _attach_row(name: str, index: int) -> NodeMetrics:
+    shm = SharedMemory(name)
+    row = np.ndarray((_COLUMNS,), dtype=np.int64, buffer=shm.buf, offset=index * _COLUMNS * 8)
+    return NodeMetrics(row, shm, index)
+
+
+class MetricsRegistry:
+    """
+    Table of counters of all nodes in the network, one row per node ordered by address
+
+    Opened as shared, table is placed in shared memory, so network process can sample counters of nodes running
+    in separate processes while they are working.
+    """
+
+    def __init__(self):
+        self.addrs = np.empty(0, dtype=np.int64)
+        self._table = np.zeros((0, _COLUMNS), dtype=np.int64)
+        self._shm: Optional[SharedMemory] = None
+
+    def open(self, addrs: Iterable[int], shared: bool = False) -> Dict[int, NodeMetrics]:
+        """
+        Start counting from zero for given nodes
+
+        :param addrs: addresses of nodes which will be measured
+        :param shared: place table in shared memory, required when nodes run in separate processes
+        """
+        self.close()
+        self.addrs = np.array(sorted(addrs), dtype=np.int64)
+        shape = (len(self.addrs), _COLUMNS)
+        if shared:
+            self._shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+            self._table = np.ndarray(shape, dtype=np.int64, buffer=self._shm.buf)
+            self._table[:] = 0
+        else:
+            self._table = np.zeros(shape, dtype=np.int64)
+        return {int(addr): NodeMetrics(self._table[i], self._shm, i) for i, addr in enumerate(self.addrs)}
+
+    def sample(self) -> np.ndarray:
+        """ Copy of current counters, see `METRICS_DTYPE`, rows match `addrs` """
+        return self._table.copy().view(METRICS_DTYPE).reshape(-1)
+
+    def totals(self) -> np.ndarray:
+        """ Counters summed over all nodes """
+        return self._table.sum(axis=0).view(METRICS_DTYPE)[0]
+
+    def collect(self) -> None:
+        """ Keep final values in process memory and release shared memory """
+        if self._shm is not None:
+            self._table = self._table.copy()
+            self._release()
+
+    def close(self) -> None:
+        self._table = np.zeros((0, _COLUMNS), dtype=np.int64)
+        self.addrs = np.empty(0, dtype=np.int64)
+        if self._shm is not None:
+            self._release()
+
+    def _release(self):
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
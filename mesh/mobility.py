@@ -0,0 +1,139 @@
+"""
+    Movement of nodes in discrete simulation
+
+    `Mobility` asks its model for new positions every `interval` seconds of virtual time and passes them
+    to `Network.move_nodes`, which updates reachability only around nodes that moved (see `Topology.move`).
+"""
+from abc import ABCMeta, abstractmethod
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class MobilityModel(metaclass=ABCMeta):
+    """ Decides where nodes are at given time """
+
+    def start(self, addrs: np.ndarray, coords: np.ndarray, now: float) -> None:
+        """
+        Called once, before the first `move`
+
+        :param addrs: addresses of all nodes in the network
+        :param coords: array of shape (n, 2) with current coordinates of the nodes
+        """
+
+    @abstractmethod
+    def move(self, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        """ :return: addresses of nodes that moved since previous call and their new coordinates """
+        raise NotImplementedError
+
+
+class RandomWaypoint(MobilityModel):
+    """
+    Each node goes straight to random point of the area with random speed, waits there for random time
+    and picks next point
+    """
+
+    def __init__(self, area: Tuple[float, float], speed: Tuple[float, float] = (1.0, 2.0),
+                 pause: Tuple[float, float] = (0.0, 0.0), addrs: Optional[Iterable[int]] = None,
+                 seed: Optional[int] = None):
+        """
+        :param area: width and height of the area, waypoints are drawn from <0; width> x <0; height>
+        :param speed: min and max speed, distance per second of virtual time
+        :param pause: min and max time spend in every waypoint
+        :param addrs: addresses of moving nodes, all nodes move by default
+        """
+        if min(area) <= 0 or min(speed) <= 0:
+            raise ValueError(f"Area and speed have to be positive, got: {area}, {speed}")
+        self.area = area
+        self.speed = speed
+        self.pause = pause
+        self.only = None if addrs is None else list(addrs)
+        self.rng = np.random.default_rng(seed)
+
+    def start(self, addrs: np.ndarray, coords: np.ndarray, now: float) -> None:
+        if self.only is not None:
+            moving = np.isin(addrs, self.only)
+            addrs, coords = addrs[moving], coords[moving]
+        self.addrs = addrs
+        # Given as integers, times and positions would be truncated
+        self.current = coords.astype(np.float64)
+        self.origin = self.current.copy()
+        self.target = self.current.copy()
+        self.departure = np.full(len(addrs), now, dtype=np.float64)
+        self.arrival = self.departure.copy()
+        self.leave = self.departure.copy()
+        """ Time at which node leaves its current target, after pause """
+
+    def move(self, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Node can pass more than one waypoint between calls
+        due = np.flatnonzero(self.leave <= now)
+        while len(due):
+            self.origin[due] = self.target[due]
+            self.target[due] = self.rng.uniform((0, 0), self.area, size=(len(due), 2))
+            distance = np.hypot(*(self.target[due] - self.origin[due]).T)
+            self.departure[due] = self.leave[due]
+            self.arrival[due] = self.departure[due] + distance / self.rng.uniform(*self.speed, size=len(due))
+            self.leave[due] = self.arrival[due] + self.rng.uniform(*self.pause, size=len(due))
+            due = due[self.leave[due] <= now]
+
+        duration = self.arrival - self.departure
+        progress = np.clip(np.divide(now - self.departure, duration, out=np.ones_like(duration), where=duration > 0),
+                           0, 1)
+        position = self.origin + (self.target - self.origin) * progress[:, None]
+        moved = np.flatnonzero(np.any(position != self.current, axis=1))
+        self.current[moved] = position[moved]
+        return self.addrs[moved], position[moved]
+
+
+class TraceMobility(MobilityModel):
+    """
+    Positions read from text file, one line per position: `time addr x y` (lines starting with `#` are skipped)
+    Node is moved to recorded position once simulation reaches its time, positions are not interpolated.
+    """
+
+    def __init__(self, path: str):
+        trace = np.loadtxt(path, ndmin=2, comments="#")
+        trace = trace[np.argsort(trace[:, 0], kind="stable")]
+        self.times = trace[:, 0]
+        self.addrs = trace[:, 1].astype(np.int64)
+        self.coords = trace[:, 2:4]
+        self._next = 0
+        """ Index of first position not applied yet """
+
+    def start(self, addrs: np.ndarray, coords: np.ndarray, now: float) -> None:
+        known = np.isin(self.addrs, addrs)
+        self.times, self.addrs, self.coords = self.times[known], self.addrs[known], self.coords[known]
+
+    def move(self, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        end = int(np.searchsorted(self.times, now, side="right"))
+        addrs, coords = self.addrs[self._next:end], self.coords[self._next:end]
+        self._next = end
+        # Only the latest position of every node counts
+        _, last = np.unique(addrs[::-1], return_index=True)
+        last = len(addrs) - 1 - last
+        return addrs[last], coords[last]
+
+
+class Mobility:
+    """ Moves nodes of the network with `model` every `interval` seconds of virtual time """
+
+    def __init__(self, network, model: MobilityModel, interval: float = 1.0):
+        if interval <= 0:
+            raise ValueError(f"Interval has to be positive, got: {interval}")
+        self.network = network
+        self.model = model
+        self.interval = interval
+        self.engine = None
+
+    def start(self, engine) -> None:
+        """ :param engine: `DiscreteEventEngine` which clock drives the movement """
+        self.engine = engine
+        topology = self.network.build_topology()
+        self.model.start(topology.addrs.copy(), topology.coords.copy(), engine.now)
+        engine.call_at(engine.now, self.step)
+
+    async def step(self) -> None:
+        addrs, coords = self.model.move(self.engine.now)
+        if len(addrs):
+            self.network.move_nodes(addrs, coords)
+        self.engine.call_at(self.engine.now + self.interval, self.step)
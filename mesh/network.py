@@ -1,56 +1,205 @@
 import asyncio
+import enum
 import multiprocessing
+import multiprocessing.synchronize
+import os
+import pickle
+import threading
+from collections import defaultdict
 import time
-from multiprocessing.context import Process
-from typing import Set, List, Dict
+from multiprocessing.context import Process, BaseContext
+from typing import Set, List, Optional, Dict, Iterable, Callable, Any, Iterator
 
-from lahja import AsyncioEndpoint, ConnectionConfig
+import numpy as np
+from lahja import AsyncioEndpoint, ConnectionConfig, BroadcastConfig
 
+from mesh.address import AddressManager
+from mesh.channel import Channel
 from mesh.common import BusConnected
-from mesh.message import GenericMessageEvent, GenericMessageOutgoingEvent, GenericMessageReceivedReport
+from mesh.engine import DiscreteEventEngine
+from mesh.history import HistoryRecorder, HISTORY_DTYPE, history_to_reports
+from mesh.message import GenericMessageEvent, GenericMessageOutgoingEvent, GenericMessageReceivedReport, \
+    GenericMessageBatchEvent, GenericMessageOutgoingBatchEvent
+from mesh.metrics import MetricsRegistry
+from mesh.mobility import Mobility, MobilityModel
 from mesh.node.base import MeshNodeAsync
+from mesh.scheduler import wait_for_event
+from mesh.shard import Shard
+from mesh.topology import Topology
+from mesh.traffic import TrafficDriver, TrafficSource
+from mesh.trace import TraceWriter
 from utils.log import Loggable
 from utils.space import Position
 
 
+class RunMode(enum.Enum):
+    REALTIME = 1
+    """ Every node in separate process, connected by lahja bus, time flows as wall clock """
+    DISCRETE = 2
+    """ All nodes in single process driven by `DiscreteEventEngine`, time is virtual """
+    SHARDED = 3
+    """ Nodes split between few processes, each hosting many nodes (see `Shard`), time flows as wall clock """
+
+
 class Network(BusConnected, Loggable):
     """
     Holder for mesh network
     """
-    network_history: List[GenericMessageReceivedReport]
-    nodes_history: Dict[int, List[GenericMessageEvent]]
+    TRACE_INTERVAL = 1.0
+    """ Seconds between writes to trace file while nodes run in separate processes, see `trace_to` """
 
-    def __init__(self, node_range):
+    def __init__(self, node_range, mode: RunMode = RunMode.REALTIME, history_capacity: int = 2 ** 16,
+                 batch_window: Optional[float] = None, shards: Optional[int] = None, metrics: bool = False,
+                 channel: Optional[Channel] = None, context: Optional[BaseContext] = None):
+        """
+        :param node_range: nodes closer than this can hear each other
+        :param mode: how nodes will be run, see `RunMode`
+        :param history_capacity: max number of receptions recorded per node in realtime mode
+        :param batch_window: in realtime mode messages send within this many seconds are passed through the bus
+            as single event, both by nodes and by the network. Batching is disabled by default.
+        :param shards: number of worker processes in sharded mode, number of CPU cores by default
+        :param metrics: count what every node is doing, see `sample_metrics`. Disabled by default.
+        :param channel: radio channel deciding which frames are received, only in discrete mode. By default
+            every frame is received by all nodes in range.
+        :param context: multiprocessing context starting processes of realtime and sharded modes, default one
+            by default, e.g. `multiprocessing.get_context("spawn")`
+        """
+        if channel is not None and mode is not RunMode.DISCRETE:
+            raise ValueError(f"Channel model is supported only in discrete mode, network runs in {mode}")
         self.nodes: Set[MeshNodeAsync] = set()
+        self._node_of: Dict[int, MeshNodeAsync] = {}
         self.processes: List[Process] = []
+        self.context = context or multiprocessing.get_context()
 
-        self.kill_switch: multiprocessing.Value[int] = multiprocessing.Value("i", 0)
+        # Created by `start`, simulation in single process does not need them
+        self.kill_switch: Optional[multiprocessing.synchronize.Event] = None
+        self.network_ready: Optional[multiprocessing.synchronize.Event] = None
         self.network_process = None
         self.range = node_range
+        self.addresses = AddressManager()
+        self.topology: Optional[Topology] = None
+        self.mode = mode
+        self.batch_window = batch_window
+        self._pending_batches: Dict[int, GenericMessageBatchEvent] = {}
+        self.shard_count = shards or os.cpu_count()
+        self.shards: List[Shard] = []
+        self.shard_of: Dict[int, int] = {}
+        self.engine: Optional[DiscreteEventEngine] = None
+        self.mobility: Optional[Mobility] = None
+        self.traffic: Optional[TrafficDriver] = None
+        self.channel = channel
 
-        manager = multiprocessing.Manager()
-        self.network_history = []
-        self.nodes_history = manager.dict()
+        self.recorder = HistoryRecorder(capacity=history_capacity)
+        self._history: List[np.ndarray] = []
+        """ Parts of `history`, joined on first access """
+        self.keep_history = True
+        """ Gather records of every run in `history`, see `stream` """
+        self._network_history: Optional[List[GenericMessageReceivedReport]] = None
+        self.trace_writer: Optional[TraceWriter] = None
+        self._trace_thread: Optional[threading.Thread] = None
+        self._trace_stop: Optional[threading.Event] = None
+        self.metrics: Optional[MetricsRegistry] = MetricsRegistry() if metrics else None
 
         super().__init__()
 
+    def __getstate__(self):
+        """
+        Network is send to every process hosting nodes, only topology and settings are needed there
+        Other nodes, processes and collected history stay in the parent process
+        """
+        state = self.__dict__.copy()
+        state.update(
+            nodes=set(),
+            _node_of={},
+            processes=[],
+            network_process=None,
+            engine=None,
+            shards=[],
+            recorder=HistoryRecorder(self.recorder.capacity),
+            _history=[],
+            _network_history=None,
+            trace_writer=None,
+            _trace_thread=None,
+            _trace_stop=None,
+            _pending_batches={},
+            metrics=None,
+        )
+        return state
+
     def add_node(self, node: MeshNodeAsync) -> None:
-        assert node not in self.nodes, f"[{self}] Node already added to Network"
+        """ Node gets address it requested or lowest free one """
+        assert node.network is None, f"[{self}] Node already added to Network"
+        node.addr = self.addresses.assign(node.addr)
         node.network = self
         self.nodes.add(node)
+        self._node_of[node.addr] = node
+        self.topology = None
+
+    def get_node(self, addr: int) -> Optional[MeshNodeAsync]:
+        return self._node_of.get(addr)
+
+    def remove_node(self, node: MeshNodeAsync) -> None:
+        self.nodes.remove(node)
+        del self._node_of[node.addr]
+        self.addresses.release(node.addr)
+        node.network = None
+        self.topology = None
 
     async def run_network(self):
         async with AsyncioEndpoint.serve(ConnectionConfig.from_name("network")) as self.network_bus:
             self.logger.info("Network started")
             self.network_bus.subscribe(GenericMessageOutgoingEvent, self.send_to_all_nodes)
+            self.network_bus.subscribe(GenericMessageOutgoingBatchEvent, self.send_batch_to_nodes)
             self.logger.info("Network subscribed to all messages")
-            while not self.kill_switch.value:
-                await asyncio.sleep(0)
+            self.network_ready.set()
+            await wait_for_event(self.kill_switch)
             self.logger.info("Network turned off")
 
     async def send_to_all_nodes(self, message: GenericMessageEvent):
-        self.logger.info(f"Network received : {message}")
-        await self.network_bus.broadcast(message.copy(new_message_type=GenericMessageEvent))
+        """ Pass message only to nodes in range of its physical sender """
+        self.trace("network_received", "Network received : %s", message)
+        if self.mode is RunMode.SHARDED:
+            await self.send_to_shards(message)
+            return
+        if self.batch_window is not None:
+            self._add_to_pending_batches([message])
+            return
+        for addr in self.topology.neighbors(message.source_addr):
+            await self.network_bus.broadcast(
+                message.copy(new_message_type=GenericMessageEvent),
+                BroadcastConfig(filter_endpoint=MeshNodeAsync.endpoint_name(addr))
+            )
+
+    async def send_to_shards(self, message: GenericMessageEvent):
+        """ Pass message to every shard, other than sender one, hosting some node in range of the sender """
+        shards = {self.shard_of[addr] for addr in self.topology.neighbors(message.source_addr).tolist()}
+        shards.discard(self.shard_of[message.source_addr])
+        for index in sorted(shards):
+            await self.network_bus.broadcast(
+                message.copy(new_message_type=GenericMessageEvent),
+                BroadcastConfig(filter_endpoint=Shard.endpoint_name(index))
+            )
+
+    async def send_batch_to_nodes(self, batch: GenericMessageOutgoingBatchEvent):
+        self.trace("network_received", "Network received : %s", batch)
+        self._add_to_pending_batches(batch.messages())
+
+    def _add_to_pending_batches(self, messages: Iterable[GenericMessageEvent]):
+        """ Group messages by receiving node, each node gets single batch per `batch_window` """
+        if not self._pending_batches:
+            loop = asyncio.get_event_loop()
+            loop.call_later(self.batch_window, lambda: asyncio.ensure_future(self._flush_pending_batches()))
+        for message in messages:
+            frame = GenericMessageBatchEvent.frame_of(message)
+            for addr in self.topology.neighbors(message.source_addr).tolist():
+                if addr not in self._pending_batches:
+                    self._pending_batches[addr] = GenericMessageBatchEvent()
+                self._pending_batches[addr].frames.append(frame)
+
+    async def _flush_pending_batches(self):
+        pending, self._pending_batches = self._pending_batches, {}
+        for addr, batch in pending.items():
+            await self.network_bus.broadcast(batch, BroadcastConfig(filter_endpoint=MeshNodeAsync.endpoint_name(addr)))
 
     def start_bare_network(self):
         loop = asyncio.get_event_loop()
@@ -59,51 +208,327 @@ class Network(BusConnected, Loggable):
     def __str__(self):
         return f"{self.__class__.__name__}"
 
-    def did_i_hear_this_message(self, origin_node: Position, destination_node: Position) -> bool:
+    def build_topology(self) -> Topology:
+        """ Compute reachability between all nodes, has to be called after last node is added """
+        if self.topology is None:
+            self.topology = Topology.from_nodes(self.nodes, self.range)
+        return self.topology
+
+    def are_neighbors(self, origin_addr: int, destination_addr: int) -> bool:
         """
-        :param origin_node: ADDR of node that 'physically' send message
-        :param destination_node: ADDR of node that 'physically' recived message
-        :return:
+        :param origin_addr: ADDR of node that 'physically' send message
+        :param destination_addr: ADDR of node that 'physically' received message
         """
-        is_reachable = abs(origin_node - destination_node) < self.range
-        self.logger.debug(f"Message reached [{origin_node}]->[{destination_node}]? [{is_reachable}]")
-        return is_reachable
+        return self.topology.is_reachable(origin_addr, destination_addr)
+
+    def set_mobility(self, model: MobilityModel, interval: float = 1.0) -> None:
+        """ Move nodes with `model` every `interval` seconds of virtual time, only in discrete mode """
+        if self.mode is not RunMode.DISCRETE:
+            raise ValueError(f"Nodes can move only in discrete mode, network runs in {self.mode}")
+        self.mobility = Mobility(self, model, interval)
+        if self.engine is not None:
+            self.mobility.start(self.engine)
+
+    def add_traffic(self, source: TrafficSource) -> None:
+        """
+        Make nodes send messages of `source` (each send naming its `src`), only in discrete mode
+        Times of sends are counted from start of the simulation, all sources are merged into one heap.
+        """
+        if self.mode is not RunMode.DISCRETE:
+            raise ValueError(f"Network-wide traffic is supported only in discrete mode, network runs in {self.mode}")
+        if self.traffic is None:
+            self.traffic = TrafficDriver(self)
+            if self.engine is not None:
+                self.traffic.start(self.engine)
+        self.traffic.add(source)
+
+    def move_nodes(self, addrs: np.ndarray, coords: np.ndarray) -> None:
+        """
+        Place nodes at new positions
+
+        :param addrs: addresses of nodes that moved
+        :param coords: array of shape (n, 2) with new coordinates of the nodes
+        """
+        for addr, (x, y) in zip(addrs.tolist(), coords.tolist()):
+            self._node_of[addr].position = Position(x, y)
+        if self.topology is not None:
+            changed = self.topology.move(addrs.tolist(), coords)
+            if self.engine is not None:
+                self.engine.update_receivers(changed.tolist())
 
     def get_nodes_map(self):
-        x = []
-        y = []
-        names = []
-        for n in self.nodes:
-            x.append(n.position.x)
-            y.append(n.position.y)
-            names.append(n.addr)
-        return x, y, names
+        """ :return: views on x and y coordinates of nodes and their addresses """
+        return self.build_topology().nodes_map()
+
+    def _attach_metrics(self, shared: bool):
+        if self.metrics is None:
+            return
+        rows = self.metrics.open((node.addr for node in self.nodes), shared=shared)
+        for node in self.nodes:
+            node.metrics = rows[node.addr]
+
+    def sample_metrics(self) -> np.ndarray:
+        """ Current counters of all nodes, can be called while network is running, see `METRICS_DTYPE` """
+        if self.metrics is None:
+            raise ValueError("Metrics are disabled, create Network with `metrics=True`")
+        return self.metrics.sample()
 
     def start(self):
-        p_net = multiprocessing.Process(target=self.start_bare_network)
+        self.build_topology()
+        self.kill_switch = self.context.Event()
+        self.network_ready = self.context.Event()
+        buffers = self.recorder.open((node.addr for node in self.nodes), shared=True)
+        self._attach_metrics(shared=True)
+        if self.mode is RunMode.SHARDED:
+            self.shard_of = self.topology.partition(self.shard_count)
+            hosted = defaultdict(list)
+            for node in self.nodes:
+                hosted[self.shard_of[node.addr]].append(node)
+            self.shards = [Shard(index, nodes, self) for index, nodes in sorted(hosted.items())]
+
+        p_net = self.context.Process(target=self.start_bare_network)
         p_net.daemon = False
         self.network_process = p_net
 
-        for node in self.nodes:
-            _p_node = multiprocessing.Process(target=node.start_single, args=(self.nodes_history,))
-            self.processes.append(_p_node)
+        if self.mode is RunMode.SHARDED:
+            for shard in self.shards:
+                shard_buffers = {addr: buffers[addr] for addr in shard.nodes}
+                self.processes.append(self.context.Process(target=shard.start_single, args=(shard_buffers,)))
+        else:
+            for node in self.nodes:
+                node.kill_switch = self.context.Event()
+                _p_node = self.context.Process(target=node.start_single, args=(buffers[node.addr],))
+                self.processes.append(_p_node)
 
         self.network_process.start()
+        self.network_ready.wait()
         for p in self.processes:
             p.start()
+        if self.trace_writer is not None:
+            self._trace_stop = threading.Event()
+            self._trace_thread = threading.Thread(target=self._write_trace, daemon=True)
+            self._trace_thread.start()
+        # Counters are updated by node processes, views held here would keep shared memory from being released
+        for node in self.nodes:
+            node.metrics = None
 
     def stop(self):
+        self._halt()
+        self._collect_run()
+
+    def _collect_run(self):
+        self.collect_history()
+        if self.metrics is not None:
+            self.metrics.collect()
+
+    def _halt(self):
+        """ Stop processes, history stays in shared memory until it is collected """
         for n in self.nodes:
-            n.kill_switch.value = 1
+            if n.kill_switch is not None:
+                n.kill_switch.set()
+        for shard in self.shards:
+            shard.kill_switch.set()
         for p in self.processes:
             p.join()
 
-        self.kill_switch.value = 1
+        self.kill_switch.set()
         self.network_process.join()
-        for _, node_history in self.nodes_history.items():
-            self.network_history += node_history
+        # Processes cannot be started again, next run creates new ones
+        self.processes = []
+        self.shards = []
+        self.network_process = None
+        if self._trace_thread is not None:
+            self._trace_stop.set()
+            self._trace_thread.join()
+            self._trace_thread = None
+
+    def _write_trace(self):
+        """ Move records from node buffers to trace file while nodes are running, before buffers overflow """
+        while not self._trace_stop.wait(self.TRACE_INTERVAL):
+            self.recorder.flush()
 
-    def run_for(self, timeout):
+    def trace_to(self, path: str, chunk_size: int = 2 ** 16) -> TraceWriter:
+        """
+        Stream reception records of the next run into binary trace file, see `TraceReader`
+        When nodes run in separate processes records are written every `TRACE_INTERVAL` seconds,
+        so history buffer of each node (`history_capacity`) has to hold only records of that period.
+        """
+        self.trace_writer = TraceWriter(path, chunk_size)
+        self.recorder.sink = self.trace_writer.write
+        return self.trace_writer
+
+    @property
+    def history(self) -> np.ndarray:
+        """ Reception records of all nodes, see `HISTORY_DTYPE` for available columns """
+        if len(self._history) != 1:
+            self._history = [np.concatenate(self._history) if self._history else np.empty(0, dtype=HISTORY_DTYPE)]
+        return self._history[0]
+
+    @history.setter
+    def history(self, records: np.ndarray):
+        self._history = [records]
+        self._network_history = None
+
+    def collect_history(self) -> np.ndarray:
+        """ Gather records of finished run and close trace file, :return: records of the run """
+        records = self._collect_records()
+        self._close_trace()
+        return records
+
+    def _collect_records(self) -> np.ndarray:
+        records = self.recorder.collect()
+        if self.keep_history and len(records):
+            self._history.append(records)
+            self._network_history = None
+        return records
+
+    def _close_trace(self):
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+            self.recorder.sink = None
+
+    @property
+    def network_history(self) -> List[GenericMessageReceivedReport]:
+        """ History as report objects, built on first access - prefer `history` columns for large runs """
+        if self._network_history is None:
+            self._network_history = history_to_reports(self.history)
+        return self._network_history
+
+    def simulate(self, duration, monitor: Optional[Callable[[np.ndarray], None]] = None, monitor_interval: float = 1.0,
+                 **engine_kwargs) -> np.ndarray:
+        """
+        Run network in single process with virtual time, see `DiscreteEventEngine`
+        Consecutive calls continue the same simulation, counters of `sample_metrics` start from zero in every call.
+
+        :param monitor: called with `sample_metrics` every `monitor_interval` seconds of virtual time
+        :param engine_kwargs: settings of the engine, used only by the first call
+        :return: records of this run
+        """
+        records = self._simulate(duration, monitor, monitor_interval, **engine_kwargs)
+        self._close_trace()
+        return records
+
+    def _simulate(self, duration, monitor: Optional[Callable[[np.ndarray], None]] = None,
+                  monitor_interval: float = 1.0, **engine_kwargs) -> np.ndarray:
+        self.build_topology()
+        self._attach_metrics(shared=False)
+        if self.engine is None:
+            self.engine = DiscreteEventEngine(self, **engine_kwargs)
+            if self.mobility is not None:
+                self.mobility.start(self.engine)
+            if self.traffic is not None:
+                self.traffic.start(self.engine)
+        self.engine.watch(None if monitor is None else lambda: monitor(self.sample_metrics()), monitor_interval)
+        self.engine.run_for(duration, self.recorder)
+        return self._collect_records()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        if self.engine is None:
+            raise ValueError("Only simulation run with `simulate` can be saved")
+        # Pickled network keeps only settings, see `__getstate__`, so its nodes are saved next to it.
+        # Engine knows only nodes of its last run, nodes added or removed since then are handled by its `setup`
+        return {"network": self, "nodes": list(self.nodes), "engine": self.engine, "history": self.history,
+                "metrics": self.metrics is not None}
+
+    @staticmethod
+    def _from_snapshot(snapshot: Dict[str, Any]) -> "Network":
+        network, engine = snapshot["network"], snapshot["engine"]
+        network.engine = engine
+        network.nodes = set(snapshot["nodes"])
+        network._node_of = {node.addr: node for node in network.nodes}
+        network.history = snapshot["history"]
+        network.metrics = MetricsRegistry() if snapshot["metrics"] else None
+        return network
+
+    def checkpoint(self, path: str) -> None:
+        """
+        Save state of simulation stopped by `simulate` to file, see `restore`
+        Saved are nodes (with replay caches, sequence numbers and pending send schedules), frames in flight,
+        virtual clock and history recorded so far. Monitor and trace file are not saved.
+        """
+        with open(path, "wb") as file:
+            pickle.dump(self._snapshot(), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def restore(cls, path: str) -> "Network":
+        """ Network saved by `checkpoint`, next `simulate` continues from the moment it was saved """
+        with open(path, "rb") as file:
+            return cls._from_snapshot(pickle.load(file))
+
+    def fork(self) -> "Network":
+        """
+        Independent copy of stopped simulation, so many variants can be continued from one warmed up state,
+        e.g. with node removed or configured differently
+        """
+        return self._from_snapshot(pickle.loads(pickle.dumps(self._snapshot(), protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def stream(self, duration: float, interval: float = 1.0, keep_history: bool = True) -> Iterator[np.ndarray]:
+        """
+        Run network for `duration` seconds, yielding new reception records every `interval` seconds
+        (of virtual time in discrete mode), sorted by timestamp. Run ends early when iteration is stopped,
+        e.g. with `break` once coverage target is reached:
+
+            for records in network.stream(60):
+                writer.write(records)
+                reached.update(records["reporter"][records["accepted"]].tolist())
+                if len(reached) >= target:
+                    break
+
+        :param keep_history: gather records in `history` as well, disable to keep memory bounded in long runs
+        """
+        kept, self.keep_history = self.keep_history, keep_history
+        try:
+            if self.mode is RunMode.DISCRETE:
+                yield from self._stream_simulation(duration, interval)
+            else:
+                yield from self._stream_processes(duration, interval)
+        finally:
+            self.keep_history = kept
+
+    def _stream_simulation(self, duration: float, interval: float) -> Iterator[np.ndarray]:
+        try:
+            elapsed = 0.0
+            while elapsed < duration:
+                step = min(interval, duration - elapsed)
+                records = self._simulate(step)
+                elapsed += step
+                if len(records):
+                    yield records
+        finally:
+            self._close_trace()
+
+    def _stream_processes(self, duration: float, interval: float) -> Iterator[np.ndarray]:
+        self.start()
+        deadline = time.time() + duration
+        try:
+            while time.time() < deadline:
+                time.sleep(max(min(interval, deadline - time.time()), 0))
+                records = self.recorder.poll()
+                if len(records):
+                    yield records
+        except BaseException:
+            # Iteration stopped early (`GeneratorExit`) or failed
+            self.stop()
+            raise
+        self._halt()
+        records = self.recorder.poll()
+        self._collect_run()
+        if len(records):
+            yield records
+
+    def run_for(self, timeout, monitor: Optional[Callable[[np.ndarray], None]] = None, monitor_interval: float = 1.0):
+        """
+        :param timeout: how long network is run, in seconds
+        :param monitor: called with `sample_metrics` every `monitor_interval` seconds while network is running
+        """
+        if self.mode is RunMode.DISCRETE:
+            self.simulate(timeout, monitor, monitor_interval)
+            return
         self.start()
-        time.sleep(timeout)
+        deadline = time.time() + timeout
+        while monitor is not None and time.time() + monitor_interval < deadline:
+            time.sleep(monitor_interval)
+            monitor(self.sample_metrics())
+        time.sleep(max(deadline - time.time(), 0))
         self.stop()
@@ -1,40 +1,56 @@
 import asyncio
 import time
 from abc import ABCMeta, abstractmethod
-from multiprocessing import Value
-from typing import Set, Optional, Dict, List
+from multiprocessing import Event
+from typing import Optional, Callable
 
 from lahja import ConnectionConfig, AsyncioEndpoint, EndpointAPI
 
 from mesh.common import BusConnected
-from mesh.message import GenericMessageEvent, GenericMessageReceivedReport, GenericMessageOutgoingEvent
+from mesh.history import HistoryBuffer, report_record
+from mesh.message import GenericMessageEvent, GenericMessageOutgoingEvent, GenericMessageBatchEvent, \
+    GenericMessageOutgoingBatchEvent
+from mesh.metrics import NodeMetrics, Metric, Histogram
+from mesh.scheduler import Scheduler, TimerScheduler, wait_for_event
 from utils.log import Loggable
 from utils.space import Position
 
 
 class MeshNodeAsync(BusConnected, Loggable, metaclass=ABCMeta):
-    ASSIGNED_ADDRESSES: Set[int] = set()
     INITIAL_ENDPOINT: ConnectionConfig = None
-    ADDR_MIN = 0
-    ADDR_MAX = 1000
-
-    nodes_history: Dict[int, List[GenericMessageEvent]]
 
     def __init__(self, position: Position, addr=None):
         """
         :param position:
-        :param addr: requested address for the node
+        :param addr: requested address for the node, assigned by `Network.add_node` (lowest free one if `None`)
         """
         super().__init__()
 
         self.start_time = 0
+        self.clock: Callable[[], float] = time.time
         self.network = None
         self.position = position
-        self.addr = self._get_free_address(addr)
+        self.addr: Optional[int] = addr
         self.bus_config = ConnectionConfig.from_name("network")
 
-        self.kill_switch: Value = Value("i", 0)
-        self.nodes_history = {}
+        self.scheduler: Optional[Scheduler] = None
+        self.batch_window: Optional[float] = None
+        self._outbox = GenericMessageOutgoingBatchEvent()
+        # Created only when node runs in its own process, it holds OS semaphores
+        self.kill_switch: Optional[Event] = None
+        self.history: Optional[HistoryBuffer] = None
+        self.metrics: Optional[NodeMetrics] = None
+        """ Counters of the node, `None` when network is not measured """
+        self._tick_due: Optional[float] = None
+
+    def __getstate__(self):
+        """
+        History buffer is owned by the network, node gets it again when it is run
+        Counters are kept, so node started in new process by spawn or forkserver still counts into shared table
+        """
+        state = self.__dict__.copy()
+        state.update(history=None)
+        return state
 
     @abstractmethod
     def prepare_message_to_be_send(self, message: GenericMessageEvent) -> GenericMessageEvent:
@@ -57,7 +73,7 @@ class MeshNodeAsync(BusConnected, Loggable, metaclass=ABCMeta):
 
     @abstractmethod
     async def main_message_tick(self) -> None:
-        """ Main loop of the node operations """
+        """ Node operations due at current clock time, called again at `next_tick_time` """
         raise NotImplementedError
 
     @abstractmethod
@@ -65,42 +81,76 @@ class MeshNodeAsync(BusConnected, Loggable, metaclass=ABCMeta):
         """ Check message if it should be processed or dropped"""
         raise NotImplementedError
 
-    async def run(self, nodes_history):
-        self.nodes_history = nodes_history
-        self.nodes_history[self.addr] = []
-        async with AsyncioEndpoint(f"node_{self.addr}").run() as self.network_bus:
+    @property
+    def logger_name(self) -> str:
+        return f"mesh.node.{self.addr}"
+
+    def next_tick_time(self) -> Optional[float]:
+        """
+        Clock time at which `main_message_tick` should be called next
+        `None` means that node has nothing more to do on its own, it will only react to received messages
+        """
+        return None
+
+    async def tick(self):
+        if self.metrics is not None and self._tick_due is not None:
+            self.metrics.observe(Histogram.LOOP_LAG, self.clock() - self._tick_due)
+        await self.main_message_tick()
+        wake_up = self._tick_due = self.next_tick_time()
+        if wake_up is not None:
+            self.scheduler.call_at(wake_up, self.tick)
+
+    def attach_history(self, history: HistoryBuffer):
+        self.history = history
+
+    async def run(self, history: HistoryBuffer):
+        self.attach_history(history)
+        self.batch_window = self.network.batch_window
+        async with AsyncioEndpoint(self.endpoint_name(self.addr)).run() as self.network_bus:
             await self.connect_to_network()
-            self.start_time = time.time()
-            while not self.kill_switch.value:
-                # self.logger.debug(f"[{self}] Kill_switch state: {self.kill_switch.value}")
-                await self.main_message_tick()
+            self.start_time = self.clock()
+            self.scheduler = TimerScheduler(self.clock)
+            self.scheduler.call_at(self.start_time, self.tick)
+            await self.scheduler.run_until(wait_for_event(self.kill_switch))
             self.logger.info(f"Node_{self.addr} killed")
         self.network_bus = None
 
     async def save_event(self, message: GenericMessageEvent, accepted: bool):
-        _message: GenericMessageReceivedReport = message.copy(new_message_type=GenericMessageReceivedReport)
-        _message.target_position = self.position
-        _message.accepted = accepted
-        _message.timestamp = time.time()
-        _message.reporter = self.addr
-        self.logger.debug(f" Node_{self.addr} is saving event to node history: {_message}")
-        node_history = list(self.nodes_history[self.addr])
-        node_history.append(_message)
-        self.nodes_history[self.addr] = node_history
+        self.trace("history_saved", "Node_%s is saving event to node history: %s", self.addr, message)
+        self.history.append(report_record(self.clock(), self.addr, message, self.position, accepted))
 
     async def _handle_received_message(self, message: GenericMessageEvent):
-        if self.network.did_i_hear_this_message(message.source_position, self.position):
-            message = self.preprocess_received_message(message)
-            message_accepted = self.should_process_message(message)
-            self.logger.debug(f"Node_{self.addr} received: {message}, "
-                              f"{'was accepted' if message_accepted else 'DROPPED'}")
-            await self.save_event(message, message_accepted)
-            if message_accepted:
-                await self.handle_received_message(message)
+        if self.network.are_neighbors(message.source_addr, self.addr):
+            await self._receive(message)
+        elif self.metrics is not None:
+            self.metrics.count(Metric.FRAMES_HEARD)
+            self.metrics.count(Metric.OUT_OF_RANGE)
+
+    async def _receive(self, message: GenericMessageEvent):
+        """ Frame which reached the node, range was already checked by the caller (e.g. by `Channel`) """
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.count(Metric.FRAMES_HEARD)
+        message = self.preprocess_received_message(message)
+        message_accepted = self.should_process_message(message)
+        self.trace("frame_received", "Node_%s received: %s, %s", self.addr, message,
+                   "was accepted" if message_accepted else "DROPPED")
+        await self.save_event(message, message_accepted)
+        if message_accepted:
+            if metrics is not None:
+                metrics.received_at = self.clock()
+            await self.handle_received_message(message)
+            if metrics is not None:
+                metrics.received_at = None
+
+    async def _handle_received_batch(self, batch: GenericMessageBatchEvent):
+        for message in batch.messages():
+            await self._handle_received_message(message)
 
     async def connect_to_network(self):
         await self.network_bus.connect_to_endpoints(self.bus_config)
         self.network_bus.subscribe(GenericMessageEvent, self._handle_received_message)
+        self.network_bus.subscribe(GenericMessageBatchEvent, self._handle_received_batch)
         await self.network_bus.wait_until_any_endpoint_subscribed_to(GenericMessageOutgoingEvent)
         self.logger.info(f"Node_{self.addr} connected to network!")
 
@@ -113,42 +163,47 @@ class MeshNodeAsync(BusConnected, Loggable, metaclass=ABCMeta):
         message = self.set_phy_origin_position(message)
         message = self.prepare_message_to_be_send(message)
         if self.can_send_message_to_network(message):
-            self.logger.debug(f"Sending message [{message}] to Network")
-            await client.broadcast(message)
+            self.trace("frame_sent", "Sending message [%s] to Network", message)
+            if self.batch_window is None:
+                await client.broadcast(message)
+            else:
+                self._add_to_outbox(message)
+            if self.metrics is not None:
+                self.metrics.frame_sent(self.clock())
         else:
-            self.logger.debug(f" ...but sending is turned off")
+            self.trace("frame_blocked", " ...but sending is turned off")
+
+    def _add_to_outbox(self, message: GenericMessageOutgoingEvent):
+        """ Messages send within `batch_window` are send to the network together """
+        if not self._outbox.frames:
+            self.scheduler.call_at(self.clock() + self.batch_window, self._flush_outbox)
+        self._outbox.extend([message])
+
+    async def _flush_outbox(self):
+        batch, self._outbox = self._outbox, GenericMessageOutgoingBatchEvent()
+        if batch.frames:
+            await self.network_bus.broadcast(batch)
 
     def set_phy_origin_position(self, message: GenericMessageEvent):
         message.source_position = self.position
+        message.source_addr = self.addr
         message.target_position = None
         return message
 
     @staticmethod
     def preprocess_received_message(message: GenericMessageEvent) -> GenericMessageEvent:
-        message.data.ttl -= 1
+        # Frame send with TTL 0 is heard only by neighbors of the sender, its TTL cannot go lower
+        if message.data.ttl > 0:
+            message.data.ttl -= 1
         return message
 
-    def start_single(self, nodes_history):
+    def start_single(self, history: HistoryBuffer):
         loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self.run(nodes_history=nodes_history))
-
-    @classmethod
-    def _get_free_address(cls, requested_addr: Optional[int] = None):
-        """ Generate Unique ID to identify Node [to be treated as Node network address]"""
-        if isinstance(requested_addr, int):
-            if requested_addr < cls.ADDR_MIN or requested_addr > cls.ADDR_MAX:
-                raise ValueError(f"{requested_addr} not in allowed range <{cls.ADDR_MIN};{cls.ADDR_MAX}>")
-            if requested_addr in cls.ASSIGNED_ADDRESSES:
-                raise ValueError(f"Requested address {requested_addr} already present in the network")
-            chosen_address = requested_addr
-        elif requested_addr is None:
-            available_address = set(range(cls.ADDR_MIN, cls.ADDR_MAX+1)) - cls.ASSIGNED_ADDRESSES
-            chosen_address = min(available_address)
-        else:
-            raise TypeError(f"Requested address of invalid type: {type(requested_addr)}")
+        return loop.run_until_complete(self.run(history=history))
 
-        cls.ASSIGNED_ADDRESSES.add(chosen_address)
-        return chosen_address
+    @staticmethod
+    def endpoint_name(addr: int) -> str:
+        return f"node_{addr}"
 
     def __str__(self):
         return f"{self.__class__.__name__}:{self.addr}_at:{self.position}"
@@ -157,7 +212,8 @@ class MeshNodeAsync(BusConnected, Loggable, metaclass=ABCMeta):
         return self.__str__()
 
     def __hash__(self):
-        return abs(hash(str(self)+str(id(self)))) % (10 ** 8)
+        # Position of moving node changes, so it cannot be part of the hash
+        return hash(id(self))
 
     def __eq__(self, other):
         if hasattr(other, "id"):
@@ -0,0 +1,136 @@
+import random
+from abc import ABCMeta, abstractmethod
+from typing import Dict, Tuple
+
+from mesh.message import GenericMessageEvent
+
+
+class RelayPolicy(metaclass=ABCMeta):
+    """
+    Decides whether node relays frame it accepted, see `NodeWithPositionCache`
+
+    Single instance serves single node. Decision can be postponed by `backoff`, copies of the frame heard
+    in the meantime are passed to `duplicate`, so node can give up relaying frame its neighbors already relayed.
+    """
+
+    def __init__(self, seed=None):
+        """ :param seed: seed of random decisions of the policy """
+        self.rng = random.Random(seed)
+        self.relayed = 0
+        self.suppressed = 0
+        """ Relays given up, each is one transmission saved """
+
+    def backoff(self, node, message: GenericMessageEvent) -> float:
+        """ :return: seconds to wait before relay decision, 0 to decide right away """
+        return 0.0
+
+    def duplicate(self, node, message: GenericMessageEvent) -> None:
+        """ Node heard again frame it already accepted """
+
+    @abstractmethod
+    def should_relay(self, node, message: GenericMessageEvent) -> bool:
+        raise NotImplementedError
+
+    def decide(self, node, message: GenericMessageEvent) -> bool:
+        if self.should_relay(node, message):
+            self.relayed += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    @staticmethod
+    def key(message: GenericMessageEvent) -> Tuple[int, int]:
+        return message.data.src, message.data.seq
+
+
+class Flooding(RelayPolicy):
+    """ Every accepted frame is relayed """
+
+    def should_relay(self, node, message: GenericMessageEvent) -> bool:
+        return True
+
+
+class Gossip(RelayPolicy):
+    """ Frame is relayed with given probability, nodes close to the source relay always so flood does not die out """
+
+    def __init__(self, probability: float, first_hops: int = 1, seed=None):
+        """
+        :param probability: chance of relaying frame
+        :param first_hops: frames which made at most this many hops are always relayed
+        """
+        super().__init__(seed)
+        self.probability = probability
+        self.first_hops = first_hops
+
+    def should_relay(self, node, message: GenericMessageEvent) -> bool:
+        hops = node.INIT_TTL - message.data.ttl
+        return hops <= self.first_hops or self.rng.random() < self.probability
+
+
+class CounterBased(RelayPolicy):
+    """ Frame is relayed after random delay, unless it was heard `threshold` times by then (first copy included) """
+
+    def __init__(self, threshold: int = 3, max_delay: float = 0.02, seed=None):
+        """
+        :param threshold: copies of frame after which node gives up relaying it
+        :param max_delay: delay before decision is drawn from <0; max_delay> seconds
+        """
+        super().__init__(seed)
+        self.threshold = threshold
+        self.max_delay = max_delay
+        self._copies: Dict[Tuple[int, int], int] = {}
+        """ Copies heard of frames waiting for decision """
+
+    def backoff(self, node, message: GenericMessageEvent) -> float:
+        self._copies[self.key(message)] = 1
+        return self.rng.uniform(0, self.max_delay)
+
+    def duplicate(self, node, message: GenericMessageEvent) -> None:
+        key = self.key(message)
+        if key in self._copies:
+            self._copies[key] += 1
+
+    def should_relay(self, node, message: GenericMessageEvent) -> bool:
+        return self._copies.pop(self.key(message), 1) < self.threshold
+
+
+class RandomBackoff(CounterBased):
+    """ Frame is relayed after random delay, unless any neighbor relayed it first """
+
+    def __init__(self, max_delay: float = 0.02, seed=None):
+        super().__init__(2, max_delay, seed)
+
+
+class DistanceBased(RelayPolicy):
+    """
+    Frame is relayed after random delay only if every copy heard came from far enough, that is when relay
+    would still cover enough area not covered by the senders
+    """
+
+    def __init__(self, min_distance: float = 0.5, max_delay: float = 0.02, seed=None):
+        """
+        :param min_distance: fraction of network range, node closer to any sender of the frame does not relay it
+        :param max_delay: delay before decision is drawn from <0; max_delay> seconds
+        """
+        super().__init__(seed)
+        self.min_distance = min_distance
+        self.max_delay = max_delay
+        self._nearest: Dict[Tuple[int, int], float] = {}
+        """ Distance to the nearest sender of frames waiting for decision """
+
+    def backoff(self, node, message: GenericMessageEvent) -> float:
+        self._nearest[self.key(message)] = self._distance(node, message)
+        return self.rng.uniform(0, self.max_delay)
+
+    def duplicate(self, node, message: GenericMessageEvent) -> None:
+        key = self.key(message)
+        if key in self._nearest:
+            self._nearest[key] = min(self._nearest[key], self._distance(node, message))
+
+    def should_relay(self, node, message: GenericMessageEvent) -> bool:
+        # Distance is known only for frames which went through `backoff`, message here is already the relayed one
+        return self._nearest.pop(self.key(message), 0.0) >= self.min_distance * node.network.range
+
+    @staticmethod
+    def _distance(node, message: GenericMessageEvent) -> float:
+        return node.position - message.source_position
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+
+class ReplayProtectionList:
+    """
+    Replay protection of received Network PDUs
+
+    For every source highest SEQ seen is kept, together with bitmap of `window` SEQs just below it.
+    SEQ older than the window is treated as replayed. When more than `max_sources` sources are tracked,
+    least recently heard one is forgotten, so memory used by the list is bounded.
+    """
+
+    def __init__(self, window: int = 64, max_sources: int = 1024):
+        """
+        :param window: number of SEQs below the highest one that are still accepted if not seen before
+        :param max_sources: number of sources remembered at once
+        """
+        if window < 1 or max_sources < 1:
+            raise ValueError(f"Window and max number of sources has to be positive, got: {window}, {max_sources}")
+        self.window = window
+        self.max_sources = max_sources
+        self._mask = (1 << window) - 1
+        self._sources: OrderedDict = OrderedDict()
+
+    def check_and_update(self, src: int, seq: int) -> bool:
+        """
+        Register SEQ received from `src`
+
+        :return: True if message was not seen before and should be processed
+        """
+        entry = self._sources.get(src)
+        if entry is None:
+            self._sources[src] = [seq, 1]
+            if len(self._sources) > self.max_sources:
+                self._sources.popitem(last=False)
+            return True
+
+        self._sources.move_to_end(src)
+        highest, seen = entry
+        if seq > highest:
+            shift = seq - highest
+            entry[0] = seq
+            entry[1] = ((seen << shift) | 1) & self._mask if shift < self.window else 1
+            return True
+
+        offset = highest - seq
+        if offset >= self.window or (seen >> offset) & 1:
+            return False
+        entry[1] = seen | (1 << offset)
+        return True
+
+    def __contains__(self, src: int) -> bool:
+        return src in self._sources
+
+    def __len__(self):
+        return len(self._sources)
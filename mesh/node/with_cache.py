@@ -1,10 +1,11 @@
-import asyncio
-from collections import defaultdict
-from time import time
-from typing import List, Tuple, Optional
+from typing import Iterable, Iterator, Tuple, Optional
 
 from mesh.message import GenericMessageEvent, GenericMessageOutgoingEvent, NetworkPDU
+from mesh.metrics import Metric
 from mesh.node.base import MeshNodeAsync
+from mesh.node.relay import RelayPolicy, Flooding
+from mesh.node.replay import ReplayProtectionList
+from mesh.traffic import as_schedule
 from utils.space import Position
 
 
@@ -13,18 +14,25 @@ class NodeWithPositionCache(MeshNodeAsync):
         Repeated messages from same source will be dropped by this Node
     """
     INIT_TTL = 14
+    RPL_WINDOW = 64
+    RPL_MAX_SOURCES = 1024
 
-    def __init__(self, position: Position, addr=None,  send_schedule: List[Tuple[float, int]] = None):
+    def __init__(self, position: Position, addr=None,  send_schedule: Iterable[Tuple[float, int]] = None,
+                 replay_protection: ReplayProtectionList = None, relay_policy: RelayPolicy = None):
         """
         :param position:
         :param addr: requested address for the node
-        :param send_schedule: list of tuples (time of message send, requested target)
+        :param send_schedule: tuples (time of message send, requested target), relative to start of the node.
+            List is sorted by time, any other iterable (e.g. `mesh.traffic.Poisson`) is read lazily in given order
+        :param replay_protection: cache of seen messages, by default sized by `RPL_WINDOW` and `RPL_MAX_SOURCES`
+        :param relay_policy: decides which accepted messages are relayed, all of them by default (`Flooding`)
         """
         super().__init__(position, addr)
-        self.send_schedule = [] if send_schedule is None else send_schedule
+        self.send_schedule: Iterator[Tuple[float, int]] = as_schedule(send_schedule)
         self.next_message: Optional[Tuple[float, int]] = None
         self._seq: int = 1
-        self._cache = defaultdict(list)
+        self._cache = replay_protection or ReplayProtectionList(self.RPL_WINDOW, self.RPL_MAX_SOURCES)
+        self.relay_policy = relay_policy or Flooding()
 
     @property
     def next_seq(self):
@@ -34,22 +42,43 @@ class NodeWithPositionCache(MeshNodeAsync):
     async def handle_received_message(self, message: GenericMessageEvent) -> None:
         if message.data.ttl >= 2:
             out = message.copy(GenericMessageOutgoingEvent)
-            await self.send_to_network(self.network_bus, out)
+            delay = self.relay_policy.backoff(self, message)
+            if delay > 0:
+                received_at = self.metrics.received_at if self.metrics is not None else None
+                self.scheduler.call_at(self.clock() + delay, self._relay_later, out, received_at)
+            else:
+                await self.send_to_network(self.network_bus, out)
+        elif self.metrics is not None:
+            self.metrics.count(Metric.TTL_EXPIRED)
+
+    async def _relay_later(self, message: GenericMessageOutgoingEvent, received_at: Optional[float]) -> None:
+        """ :param received_at: when handling of the received frame started, so relay latency includes backoff """
+        # Metrics recognise relay by received frame being handled at the moment
+        if self.metrics is not None:
+            self.metrics.received_at = received_at
+        await self.send_to_network(self.network_bus, message)
+        if self.metrics is not None:
+            self.metrics.received_at = None
 
     def should_process_message(self, message: GenericMessageEvent) -> bool:
         if message.data.src == self.addr:
             return False
-        self.logger.debug(f"[{self}] Message received: {message}")
-        if message.data.src in self._cache:
-            if message.data.seq in self._cache[message.data.src]:
-                self.logger.debug(f"[{self}] RPL triggered - Message will be DROPPED: {message}")
-                return False
-        self._cache[message.data.src].append(message.data.seq)
-        self.logger.info(f"[{self}]Message will be processed: {message}")
+        self.trace("frame_checked", "[%s] Message received: %s", self, message)
+        if not self._cache.check_and_update(message.data.src, message.data.seq):
+            self.trace("rpl_dropped", "[%s] RPL triggered - Message will be DROPPED: %s", self, message)
+            if self.metrics is not None:
+                self.metrics.count(Metric.RPL_DROPPED)
+            self.relay_policy.duplicate(self, message)
+            return False
+        self.trace("frame_processed", "[%s]Message will be processed: %s", self, message)
         return True
 
     def can_send_message_to_network(self, message: GenericMessageEvent) -> bool:
-        return True
+        if message.data.src == self.addr or self.relay_policy.decide(self, message):
+            return True
+        if self.metrics is not None:
+            self.metrics.count(Metric.SUPPRESSED)
+        return False
 
     def prepare_message_to_be_send(self, message: GenericMessageEvent) -> GenericMessageEvent:
         return message
@@ -62,21 +91,29 @@ class NodeWithPositionCache(MeshNodeAsync):
         net_pdu.transport_pdu = transport_pdu
         return net_pdu
 
-    async def main_message_tick(self):
+    def _load_next_message(self):
         if self.next_message is None:
-            try:
-                self.next_message = self.send_schedule.pop()
-            except IndexError:
-                self.next_message = float("inf"), None
-
-        if time() - self.start_time >= self.next_message[0]:
-            net_pdu = self.generate_new_message()
-            if self.next_message[1] is None:
-                raise ValueError(f"Target of the message cannot be `None`")
-            net_pdu.dest = self.next_message[1]
-            self.logger.debug(f"Message is being send from {self.addr} to {net_pdu.dest}")
-
-            out = GenericMessageOutgoingEvent(net_pdu)
-            await self.send_to_network(self.network_bus, out)
+            self.next_message = next(self.send_schedule, (float("inf"), None))
+
+    def next_tick_time(self) -> Optional[float]:
+        self._load_next_message()
+        if self.next_message[0] == float("inf"):
+            return None
+        return self.start_time + self.next_message[0]
+
+    async def main_message_tick(self):
+        self._load_next_message()
+
+        if self.clock() - self.start_time >= self.next_message[0]:
+            await self.send_new_message(self.next_message[1])
             self.next_message = None
-        await asyncio.sleep(0)
+
+    async def send_new_message(self, dest: int) -> None:
+        if dest is None:
+            raise ValueError(f"Target of the message cannot be `None`")
+        net_pdu = self.generate_new_message()
+        net_pdu.dest = dest
+        self.trace("message_generated", "Message is being send from %s to %s", self.addr, net_pdu.dest)
+
+        out = GenericMessageOutgoingEvent(net_pdu)
+        await self.send_to_network(self.network_bus, out)
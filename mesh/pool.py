@@ -0,0 +1,90 @@
+"""
+    Pool of worker processes shared by all simulations run from this process
+
+    Workers are forked from forkserver process which already imported simulation modules, so new worker is ready
+    in milliseconds and does not inherit threads or state of the parent. Pool is created on first use and reused
+    by every following run, e.g. by consecutive sweeps, until `shutdown_worker_pool` or exit of the process.
+    Tasks are given to the pool with `submit`, which keeps track of unfinished ones.
+"""
+import atexit
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Set
+
+PRELOAD = ["numpy", "mesh.network", "mesh.engine", "mesh.node.with_cache", "mesh.sweep"]
+""" Modules imported by forkserver once, instead of by every worker """
+
+_pool: Optional[ProcessPoolExecutor] = None
+_workers = 0
+_broken = False
+""" Task of the pool failed because its worker died, such pool would fail every task and is replaced """
+_unfinished: Set[Future] = set()
+
+
+def _configure_worker(log_level: int):
+    """ Workers are not forked from the parent, logging level set there has to be repeated """
+    logging.getLogger().setLevel(log_level)
+
+
+def _context():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD)
+    return context
+
+
+def worker_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """ :param workers: number of worker processes, all cores by default """
+    global _pool, _workers, _broken
+    workers = workers or os.cpu_count()
+    # Broken pool (e.g. worker killed by OOM) is replaced as well
+    if _pool is not None and (_workers != workers or _broken):
+        shutdown_worker_pool()
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=_context(),
+            initializer=_configure_worker, initargs=(logging.getLogger().level,)
+        )
+        _workers = workers
+        _broken = False
+    return _pool
+
+
+def submit(function: Callable, *args, workers: Optional[int] = None) -> Future:
+    """ Run `function` in worker of the shared pool, see `worker_pool` """
+    global _broken
+    pool = worker_pool(workers)
+    try:
+        future = pool.submit(function, *args)
+    except BrokenProcessPool:
+        _broken = True
+        pool = worker_pool(workers)
+        future = pool.submit(function, *args)
+    _unfinished.add(future)
+    future.add_done_callback(functools.partial(_task_done, pool))
+    return future
+
+
+def _task_done(pool: ProcessPoolExecutor, future: Future) -> None:
+    global _broken
+    _unfinished.discard(future)
+    if pool is _pool and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _broken = True
+
+
+def shutdown_worker_pool() -> None:
+    """ Cancel tasks which did not start yet and wait for the running ones """
+    global _pool
+    if _pool is not None:
+        for future in list(_unfinished):
+            future.cancel()
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+atexit.register(shutdown_worker_pool)
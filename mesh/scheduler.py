@@ -0,0 +1,100 @@
+import asyncio
+import heapq
+import itertools
+from abc import ABCMeta, abstractmethod
+from multiprocessing.synchronize import Event
+from typing import Callable, List, Tuple, Any, Awaitable
+
+
+class EventQueue:
+    """
+    Min-heap of timed callbacks. Events scheduled for the same time are popped in insertion order,
+    which keeps runs reproducible
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Callable, Tuple[Any, ...]]] = []
+        self._counter = itertools.count()
+
+    def push(self, when: float, callback: Callable, *args) -> None:
+        heapq.heappush(self._heap, (when, next(self._counter), callback, args))
+
+    def pop(self) -> Tuple[float, Callable, Tuple[Any, ...]]:
+        when, _, callback, args = heapq.heappop(self._heap)
+        return when, callback, args
+
+    def peek_time(self) -> float:
+        return self._heap[0][0] if self._heap else float("inf")
+
+    def remove_if(self, predicate: Callable[[Callable, Tuple[Any, ...]], bool]) -> int:
+        """
+        Drop events for which `predicate(callback, args)` is true, order of the remaining ones is kept
+
+        :return: number of dropped events
+        """
+        kept = [event for event in self._heap if not predicate(event[2], event[3])]
+        removed = len(self._heap) - len(kept)
+        if removed:
+            heapq.heapify(kept)
+            self._heap = kept
+        return removed
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __getstate__(self):
+        # `itertools.count` is not picklable in newer Python, only its next value is saved
+        state = self.__dict__.copy()
+        state["_counter"] = next(self._counter)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._counter = itertools.count(state["_counter"])
+
+
+class Scheduler(metaclass=ABCMeta):
+    """ Interface used by nodes to request their coroutines to be called at given clock time """
+
+    @abstractmethod
+    def call_at(self, when: float, callback: Callable[..., Awaitable], *args) -> None:
+        raise NotImplementedError
+
+
+class TimerScheduler(Scheduler):
+    """
+    Realtime scheduler of single node process
+    Between timers event loop is left idle, so node wakes up only for next timer or incoming frame
+    """
+
+    def __init__(self, clock: Callable[[], float]):
+        self.clock = clock
+        self.queue = EventQueue()
+        self._changed = asyncio.Event()
+
+    def call_at(self, when: float, callback: Callable[..., Awaitable], *args) -> None:
+        self.queue.push(when, callback, *args)
+        self._changed.set()
+
+    async def run_until(self, stopped: Awaitable) -> None:
+        """ Fire timers as they become due, until `stopped` completes """
+        stopped = asyncio.ensure_future(stopped)
+        while not stopped.done():
+            delay = self.queue.peek_time() - self.clock()
+            if delay > 0:
+                self._changed.clear()
+                changed = asyncio.ensure_future(self._changed.wait())
+                await asyncio.wait(
+                    {stopped, changed},
+                    timeout=None if delay == float("inf") else delay,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                changed.cancel()
+                continue
+            _, callback, args = self.queue.pop()
+            await callback(*args)
+
+
+def wait_for_event(event: Event) -> Awaitable:
+    """ Await multiprocessing event without polling, waiting happens in executor thread """
+    return asyncio.get_event_loop().run_in_executor(None, event.wait)
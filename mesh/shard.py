@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+from lahja import AsyncioEndpoint, ConnectionConfig
+
+from mesh.common import BusConnected
+from mesh.history import HistoryBuffer
+from mesh.message import GenericMessageEvent, GenericMessageOutgoingEvent
+from mesh.node.base import MeshNodeAsync
+from mesh.scheduler import TimerScheduler, wait_for_event
+from utils.log import Loggable
+
+
+class ShardBus:
+    """ Replacement of node endpoint for nodes hosted by `Shard`, frames are passed to the shard """
+
+    def __init__(self, shard: "Shard"):
+        self.shard = shard
+
+    async def broadcast(self, message: GenericMessageEvent, config=None) -> None:
+        await self.shard.transmit(message)
+
+
+class Shard(BusConnected, Loggable):
+    """
+    Many nodes hosted in single process and event loop
+
+    Frames are delivered directly to neighbors hosted by the same shard.
+    Only when sender has neighbors in other shards the frame is send through the bus, network passes it
+    to shards hosting them.
+    """
+
+    def __init__(self, index: int, nodes: Iterable[MeshNodeAsync], network):
+        super().__init__()
+        self.index = index
+        self.nodes: Dict[int, MeshNodeAsync] = {node.addr: node for node in nodes}
+        self.network = network
+        self.kill_switch = network.context.Event()
+        self.scheduler: Optional[TimerScheduler] = None
+        self.bus_config = ConnectionConfig.from_name("network")
+
+    @property
+    def logger_name(self) -> str:
+        return f"mesh.shard.{self.index}"
+
+    @staticmethod
+    def endpoint_name(index: int) -> str:
+        return f"shard_{index}"
+
+    def start_single(self, buffers: Dict[int, HistoryBuffer]):
+        loop = asyncio.get_event_loop()
+        return loop.run_until_complete(self.run(buffers))
+
+    async def run(self, buffers: Dict[int, HistoryBuffer]):
+        async with AsyncioEndpoint(self.endpoint_name(self.index)).run() as self.network_bus:
+            await self.network_bus.connect_to_endpoints(self.bus_config)
+            self.network_bus.subscribe(GenericMessageEvent, self.deliver)
+            await self.network_bus.wait_until_any_endpoint_subscribed_to(GenericMessageOutgoingEvent)
+            self.logger.info(f"Shard_{self.index} with {len(self.nodes)} nodes connected to network!")
+
+            self.scheduler = TimerScheduler(time.time)
+            bus = ShardBus(self)
+            for node in self.nodes.values():
+                node.attach_history(buffers[node.addr])
+                node.network_bus = bus
+                node.scheduler = self.scheduler
+                node.start_time = node.clock()
+                self.scheduler.call_at(node.start_time, node.tick)
+            await self.scheduler.run_until(wait_for_event(self.kill_switch))
+            self.logger.info(f"Shard_{self.index} killed")
+        self.network_bus = None
+
+    async def transmit(self, message: GenericMessageOutgoingEvent) -> None:
+        """ Frame send by one of hosted nodes """
+        has_remote_neighbors = self._deliver_locally(message.copy(new_message_type=GenericMessageEvent))
+        if has_remote_neighbors:
+            await self.network_bus.broadcast(message.copy())
+
+    async def deliver(self, frame: GenericMessageEvent) -> None:
+        """ Frame send by node from other shard """
+        self._deliver_locally(frame)
+
+    def _deliver_locally(self, frame: GenericMessageEvent) -> bool:
+        """ :return: True if some of sender neighbors are not hosted by this shard """
+        has_remote_neighbors = False
+        now = time.time()
+        for addr in self.network.topology.neighbors(frame.source_addr).tolist():
+            node = self.nodes.get(addr)
+            if node is None:
+                has_remote_neighbors = True
+                continue
+            message = frame.copy(new_message_type=GenericMessageEvent)
+            message.data = frame.data.copy()
+            self.scheduler.call_at(now, node._handle_received_message, message)
+        return has_remote_neighbors
@@ -0,0 +1,154 @@
+"""
+    Headless runner of many flood simulations with different parameters
+
+    Every configuration is simulated with `DiscreteEventEngine` in worker process of the shared pool (see `mesh.pool`),
+    only the configuration is send to the worker, which builds the network itself.
+    Summary of each finished configuration is appended to progress file right away,
+    so interrupted sweep started again skips configurations which are already done.
+"""
+import importlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import as_completed
+from typing import Dict, Iterable, List, Any, Optional
+
+import numpy as np
+
+from mesh.analytics import message_summary
+from mesh.network import Network, RunMode
+from mesh.pool import submit
+from utils.log import Loggable
+from utils.space import Position
+
+DEFAULT_NODE_CLASS = "mesh.node.with_cache:NodeWithPositionCache"
+
+
+def parameter_grid(**values: Iterable) -> List[Dict[str, Any]]:
+    """ All combinations of given parameter values, e.g. `parameter_grid(range=[10, 15], seed=[1, 2])` """
+    names = sorted(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[n] for n in names))]
+
+
+def config_key(config: Dict[str, Any]) -> str:
+    return json.dumps(config, sort_keys=True)
+
+
+def load_node_class(path: str) -> type:
+    """ :param path: node class given as `module:ClassName` """
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def build_flood_network(node_range: float, node_count: int, seed: int, send_times: Iterable[float] = (3,),
+                        node_class: str = DEFAULT_NODE_CLASS, relay_policy: Optional[str] = None,
+                        relay_args: Optional[Dict[str, Any]] = None) -> Network:
+    """
+    Same topology as in `experiments/full_mesh_flood.py`: source in (0, 0), destination in (node_count, node_count)
+    and random nodes in between, one per column. Source sends message to destination at every of `send_times`.
+
+    :param relay_policy: relay policy of every node given as `module:ClassName`, see `mesh.node.relay`
+    :param relay_args: arguments of the relay policy, each node gets its own seed derived from `seed`
+    """
+    cls = load_node_class(node_class)
+    generator = random.Random(seed)
+    network = Network(node_range, mode=RunMode.DISCRETE)
+
+    def node(position: Position, addr: int, **kwargs):
+        if relay_policy is not None:
+            kwargs["relay_policy"] = load_node_class(relay_policy)(**(relay_args or {}), seed=f"{seed}/{addr}")
+        return cls(position, addr=addr, **kwargs)
+
+    schedule = [(send_time, node_count) for send_time in sorted(send_times)]
+    network.add_node(node(Position(0, 0), 0, send_schedule=schedule))
+    network.add_node(node(Position(node_count, node_count), node_count))
+    for i in range(1, node_count):
+        network.add_node(node(Position(i, generator.randint(1, node_count - 1)), i))
+    return network
+
+
+def flood_metrics(network: Network) -> Dict[str, Any]:
+    """ Summary of run, group message is delivered once any member of the group accepts it """
+    history = network.history
+    accepted = history[history["accepted"]]
+    messages = message_summary(history, network.addresses.resolve)
+    latencies = messages["latency"].dropna()
+
+    return {
+        "receptions": int(len(history)),
+        "transmissions": int(network.engine.transmissions),
+        "messages": int(len(messages)),
+        "delivery_ratio": float(messages["delivered"].mean()) if len(messages) else 0.0,
+        "coverage": float(len(np.unique(accepted["reporter"])) / max(len(network.nodes) - 1, 1)),
+        "mean_latency": float(latencies.mean()) if len(latencies) else None,
+        "suppressed": sum(node.relay_policy.suppressed for node in network.nodes if hasattr(node, "relay_policy")),
+        "events": int(network.engine.processed_events),
+    }
+
+
+def run_configuration(config: Dict[str, Any]) -> Dict[str, Any]:
+    """ Simulate single configuration, run in worker process """
+    started = time.perf_counter()
+    network = build_flood_network(
+        config["range"], config["node_count"], config["seed"],
+        send_times=config.get("send_times", (3,)),
+        node_class=config.get("node_class", DEFAULT_NODE_CLASS),
+        relay_policy=config.get("relay_policy"),
+        relay_args=config.get("relay_args")
+    )
+    network.run_for(config.get("duration", 20))
+    result = dict(config)
+    result.update(flood_metrics(network))
+    result["wall_time"] = time.perf_counter() - started
+    return result
+
+
+class Sweep(Loggable):
+    """
+    Run all configurations in a pool of processes, results are collected in `progress_path` (JSON lines)
+    """
+
+    def __init__(self, configs: List[Dict[str, Any]], progress_path: str, workers: Optional[int] = None):
+        """
+        :param configs: parameters of `run_configuration`, see `parameter_grid`
+        :param progress_path: file with results of finished configurations, reused when sweep is resumed
+        :param workers: number of worker processes, all cores by default
+        """
+        super().__init__()
+        self.configs = configs
+        self.progress_path = progress_path
+        self.workers = workers or os.cpu_count()
+
+    def finished(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.progress_path):
+            return []
+        with open(self.progress_path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def pending(self) -> List[Dict[str, Any]]:
+        done = {result["key"] for result in self.finished()}
+        return [config for config in self.configs if config_key(config) not in done]
+
+    def run(self):
+        """ Run remaining configurations and return table with results of all finished ones """
+        pending = self.pending()
+        self.logger.info(f"Sweep: {len(self.configs) - len(pending)} configurations done, {len(pending)} to go")
+        with open(self.progress_path, "a") as progress:
+            futures = {submit(run_configuration, config, workers=self.workers): config for config in pending}
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.logger.error(f"Configuration {config} failed: {e!r}")
+                    continue
+                result["key"] = config_key(config)
+                progress.write(json.dumps(result) + "\n")
+                progress.flush()
+        return self.results()
+
+    def results(self):
+        import pandas as pd
+        return pd.DataFrame(self.finished())
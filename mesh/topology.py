@@ -0,0 +1,178 @@
+import itertools
+from typing import Iterable, List, Dict, Optional, Tuple, Set
+
+import numpy as np
+
+from utils.space import Position
+
+
+class Topology:
+    """
+    Positions of all network nodes kept in one contiguous array, with reachability between them
+
+    Rows are ordered by node address. For small networks full boolean reachability matrix is kept,
+    for large ones only list of neighbors of each node (computed from uniform grid of cells of size `range`).
+    When nodes move (see `move`) only their neighbors are computed again, so step of few moving nodes
+    does not cost O(N^2).
+    """
+    DENSE_LIMIT = 2048
+    _CELL_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+    def __init__(self, addrs: Iterable[int], positions: Iterable[Position], node_range: float):
+        """
+        :param addrs: addresses of nodes, order has to match `positions`
+        :param positions: physical position of each node
+        :param node_range: nodes closer than this can hear each other
+        """
+        addrs = np.fromiter(addrs, dtype=np.int64)
+        coords = np.array([(p.x, p.y) for p in positions], dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(addrs, kind="stable")
+
+        self.range = node_range
+        self.addrs: np.ndarray = addrs[order]
+        self.coords: np.ndarray = np.ascontiguousarray(coords[order])
+        self.index: Dict[int, int] = {int(addr): i for i, addr in enumerate(self.addrs)}
+
+        self.reachable: Optional[np.ndarray] = None
+        self.rows: List[np.ndarray] = []
+        self._cell_size = self.range if self.range > 0 else 1
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        """ Rows of nodes in every occupied cell of the grid, kept only for sparse reachability """
+        self._cell_of: Optional[np.ndarray] = None
+        if len(self) <= self.DENSE_LIMIT:
+            self._build_dense()
+        else:
+            self._build_sparse()
+
+    @classmethod
+    def from_nodes(cls, nodes, node_range: float) -> "Topology":
+        nodes = list(nodes)
+        return cls((n.addr for n in nodes), (n.position for n in nodes), node_range)
+
+    def __len__(self):
+        return len(self.addrs)
+
+    def _build_dense(self):
+        x = self.coords[:, 0]
+        y = self.coords[:, 1]
+        distance = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+        self.reachable = distance < self.range
+        np.fill_diagonal(self.reachable, False)
+        self.rows = [np.flatnonzero(row) for row in self.reachable]
+
+    def _build_sparse(self):
+        """ Compare each node only with nodes from the same and adjacent grid cells """
+        cells = np.floor(self.coords / self._cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        occupied, starts, counts = np.unique(cells[order], axis=0, return_index=True, return_counts=True)
+        members_of = {
+            (cx, cy): order[start:start + count]
+            for (cx, cy), start, count in zip(occupied.tolist(), starts, counts)
+        }
+
+        self.rows = [np.empty(0, dtype=np.int64)] * len(self)
+        for (cx, cy), members in members_of.items():
+            candidates = np.sort(np.concatenate([
+                members_of[(cx + dx, cy + dy)] for dx, dy in self._CELL_OFFSETS if (cx + dx, cy + dy) in members_of
+            ]))
+            delta = self.coords[members, None, :] - self.coords[None, candidates, :]
+            in_range = np.hypot(delta[..., 0], delta[..., 1]) < self.range
+            for member, row in zip(members, in_range):
+                self.rows[member] = candidates[row & (candidates != member)]
+        self._cells = {cell: set(members.tolist()) for cell, members in members_of.items()}
+        self._cell_of = cells
+
+    def _rebin(self, row: int) -> None:
+        """ Move node to cell of its current position """
+        cell = np.floor(self.coords[row] / self._cell_size).astype(np.int64)
+        old, new = tuple(self._cell_of[row].tolist()), tuple(cell.tolist())
+        if old == new:
+            return
+        self._cells[old].discard(row)
+        if not self._cells[old]:
+            del self._cells[old]
+        self._cells.setdefault(new, set()).add(row)
+        self._cell_of[row] = cell
+
+    def _find_neighbors(self, row: int) -> np.ndarray:
+        """ Rows of nodes in range of node `row`, computed from positions """
+        if self._cell_of is None:
+            candidates = np.arange(len(self))
+        else:
+            cx, cy = self._cell_of[row].tolist()
+            candidates = np.fromiter(itertools.chain.from_iterable(
+                self._cells.get((cx + dx, cy + dy), ()) for dx, dy in self._CELL_OFFSETS
+            ), dtype=np.int64)
+            candidates.sort()
+        delta = self.coords[candidates] - self.coords[row]
+        return candidates[(np.hypot(delta[:, 0], delta[:, 1]) < self.range) & (candidates != row)]
+
+    def move(self, addrs: Iterable[int], coords: np.ndarray) -> np.ndarray:
+        """
+        Change positions of some nodes, reachability is updated only for them and nodes around them
+
+        :param addrs: addresses of nodes that moved
+        :param coords: array of shape (n, 2) with new coordinates of the nodes
+        :return: addresses of nodes which neighbors changed
+        """
+        moved = [self.index[addr] for addr in addrs]
+        self.coords[moved] = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if self._cell_of is not None:
+            for row in moved:
+                self._rebin(row)
+
+        changed = set()
+        for row in moved:
+            old, new = self.rows[row], self._find_neighbors(row)
+            if np.array_equal(old, new):
+                continue
+            lost = np.setdiff1d(old, new, assume_unique=True).tolist()
+            gained = np.setdiff1d(new, old, assume_unique=True).tolist()
+            # Rows are kept sorted, see `is_reachable`
+            for other in lost:
+                self.rows[other] = np.delete(self.rows[other], np.searchsorted(self.rows[other], row))
+            for other in gained:
+                self.rows[other] = np.insert(self.rows[other], np.searchsorted(self.rows[other], row), row)
+            self.rows[row] = new
+            if self.reachable is not None:
+                self.reachable[row, :] = False
+                self.reachable[row, new] = True
+                self.reachable[:, row] = self.reachable[row, :]
+            changed.add(row)
+            changed.update(lost)
+            changed.update(gained)
+        return self.addrs[sorted(changed)]
+
+    def neighbors(self, addr: int) -> np.ndarray:
+        """ Addresses of nodes that can hear node `addr` """
+        return self.addrs[self.rows[self.index[addr]]]
+
+    def is_reachable(self, origin_addr: int, destination_addr: int) -> bool:
+        origin = self.index.get(origin_addr)
+        destination = self.index.get(destination_addr)
+        if origin is None or destination is None:
+            return False
+        if self.reachable is not None:
+            return bool(self.reachable[origin, destination])
+        row = self.rows[origin]
+        at = np.searchsorted(row, destination)
+        return bool(at < len(row) and row[at] == destination)
+
+    def partition(self, parts: int) -> Dict[int, int]:
+        """
+        Split nodes into `parts` groups of equal size, each group being a strip of space along longer axis,
+        so most neighbors end up in the same group
+
+        :return: mapping of node address to number of its group
+        """
+        spread = np.ptp(self.coords, axis=0) if len(self) else np.zeros(2)
+        axis = int(np.argmax(spread))
+        order = np.argsort(self.coords[:, axis], kind="stable")
+        groups = {}
+        for part, rows in enumerate(np.array_split(order, min(parts, max(len(self), 1)))):
+            groups.update((int(addr), part) for addr in self.addrs[rows])
+        return groups
+
+    def nodes_map(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Views on x and y coordinates and addresses of nodes """
+        return self.coords[:, 0], self.coords[:, 1], self.addrs
@@ -0,0 +1,110 @@
+import json
+import os
+import struct
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from mesh.history import HISTORY_DTYPE
+
+
+MAGIC = b"MESHTRC1"
+ALIGNMENT = 64
+
+
+class TraceWriter:
+    """
+    Streaming writer of reception records into binary trace file
+
+    Layout: `MAGIC`, 4 byte little endian length of JSON header, JSON header describing record dtype,
+    padding to `ALIGNMENT` bytes and then raw fixed width records. Records are buffered and written
+    in chunks of `chunk_size`, so file grows while simulation is running.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 2 ** 16, dtype: np.dtype = HISTORY_DTYPE):
+        self.path = path
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.written = 0
+        self._pending: List[np.ndarray] = []
+        self._pending_count = 0
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        header = json.dumps({"descr": self.dtype.descr, "chunk_size": self.chunk_size}).encode()
+        size = len(MAGIC) + 4 + len(header)
+        padding = b" " * (-size % ALIGNMENT)
+        self._file.write(MAGIC + struct.pack("<I", len(header) + len(padding)) + header + padding)
+
+    def write(self, records: np.ndarray) -> None:
+        """ Queue records to be written, full chunks are flushed to the file immediately """
+        if records.dtype != self.dtype:
+            raise TypeError(f"Expected records of dtype {self.dtype}, got {records.dtype}")
+        self._pending.append(records.copy())
+        self._pending_count += len(records)
+        if self._pending_count >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            data = np.concatenate(self._pending)
+            self._file.write(data.tobytes())
+            self.written += len(data)
+            self._pending = []
+            self._pending_count = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TraceReader:
+    """
+    Memory mapped view on trace written by `TraceWriter`
+    Records are read from disk only when accessed, so traces larger than RAM can be processed chunk by chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a mesh trace file")
+            header_size, = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_size))
+        self.dtype = np.dtype([tuple(field) for field in header["descr"]])
+        self.chunk_size: int = header["chunk_size"]
+        self.offset = len(MAGIC) + 4 + header_size
+
+        count = (os.path.getsize(path) - self.offset) // self.dtype.itemsize
+        self._records: Optional[np.ndarray] = None
+        if count:
+            self._records = np.memmap(path, dtype=self.dtype, mode="r", offset=self.offset, shape=(count,))
+
+    @property
+    def history(self) -> np.ndarray:
+        """ All records, same columns as `Network.history` """
+        if self._records is None:
+            return np.empty(0, dtype=self.dtype)
+        return self._records
+
+    def __len__(self):
+        return len(self.history)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.history[name]
+
+    def chunks(self, chunk_size: Optional[int] = None) -> Iterator[np.ndarray]:
+        """ Consecutive views on records, each at most `chunk_size` long """
+        chunk_size = chunk_size or self.chunk_size
+        history = self.history
+        for start in range(0, len(history), chunk_size):
+            yield history[start:start + chunk_size]
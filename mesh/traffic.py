@@ -0,0 +1,251 @@
+"""
+    Traffic of the simulation
+
+    Sends are produced lazily by sources, one at a time and ordered by time, so schedules of long runs
+    are never held in memory. Sources are iterators of `Send` and can be given to a node as its `send_schedule`
+    (times relative to start of the node) or to the network with `Network.add_traffic` (times relative to start
+    of the simulation, `src` has to be set). All sources of the network are merged with single heap, see `Merge`.
+
+    Sources keep their whole state in attributes, so simulation with traffic still can be pickled
+    (see `Network.checkpoint`).
+"""
+import heapq
+import random
+from abc import ABCMeta, abstractmethod
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+class Send(NamedTuple):
+    time: float
+    dest: int
+    src: Optional[int] = None
+    """ Node sending the message, `None` for sources of single node """
+
+
+class TrafficSource(metaclass=ABCMeta):
+    """ Sends ordered by time, computed only when asked for """
+
+    def __iter__(self):
+        return self
+
+    @abstractmethod
+    def __next__(self) -> Send:
+        raise NotImplementedError
+
+
+class Periodic(TrafficSource):
+    """ Message every `interval` seconds """
+
+    def __init__(self, dest: int, interval: float, start: float = 0.0, count: Optional[int] = None,
+                 src: Optional[int] = None):
+        """
+        :param start: time of the first message
+        :param count: number of messages, unlimited by default
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval has to be positive, got: {interval}")
+        self.dest = dest
+        self.interval = interval
+        self.start = start
+        self.count = count
+        self.src = src
+        self._sent = 0
+
+    def __next__(self) -> Send:
+        if self.count is not None and self._sent >= self.count:
+            raise StopIteration
+        # Multiplied instead of summed, so times do not drift in long runs
+        time = self.start + self._sent * self.interval
+        self._sent += 1
+        return Send(time, self.dest, self.src)
+
+
+class Poisson(TrafficSource):
+    """ Messages at random times, `rate` of them per second on average """
+
+    def __init__(self, dest: int, rate: float, start: float = 0.0, count: Optional[int] = None,
+                 src: Optional[int] = None, seed=None):
+        if rate <= 0:
+            raise ValueError(f"Rate has to be positive, got: {rate}")
+        self.dest = dest
+        self.rate = rate
+        self.count = count
+        self.src = src
+        self.rng = random.Random(seed)
+        self._time = start
+        self._sent = 0
+
+    def __next__(self) -> Send:
+        if self.count is not None and self._sent >= self.count:
+            raise StopIteration
+        self._time += self.rng.expovariate(self.rate)
+        self._sent += 1
+        return Send(self._time, self.dest, self.src)
+
+
+class Bursty(TrafficSource):
+    """ Bursts of `size` messages `spacing` seconds apart, separated by random idle time of `idle` seconds on average """
+
+    def __init__(self, dest: int, size: int, idle: float, spacing: float = 0.01, start: float = 0.0,
+                 bursts: Optional[int] = None, src: Optional[int] = None, seed=None):
+        """
+        :param start: time of the first burst
+        :param bursts: number of bursts, unlimited by default
+        """
+        if size < 1 or idle <= 0:
+            raise ValueError(f"Burst size and idle time have to be positive, got: {size}, {idle}")
+        self.dest = dest
+        self.size = size
+        self.idle = idle
+        self.spacing = spacing
+        self.bursts = bursts
+        self.src = src
+        self.rng = random.Random(seed)
+        self._burst_start = start
+        self._burst = 0
+        self._in_burst = 0
+
+    def __next__(self) -> Send:
+        if self._in_burst == self.size:
+            last = self._burst_start + (self.size - 1) * self.spacing
+            self._burst_start = last + self.spacing + self.rng.expovariate(1 / self.idle)
+            self._burst += 1
+            self._in_burst = 0
+        if self.bursts is not None and self._burst >= self.bursts:
+            raise StopIteration
+        time = self._burst_start + self._in_burst * self.spacing
+        self._in_burst += 1
+        return Send(time, self.dest, self.src)
+
+
+class Replay(TrafficSource):
+    """
+    Sends read from text file, one per line: `time src dest` (lines starting with `#` are skipped)
+    File has to be sorted by time, it is read line by line as sends are needed.
+    """
+
+    def __init__(self, path: str, src: Optional[int] = None):
+        """ :param src: replay only sends of this node, as source of single node """
+        self.path = path
+        self.only = src
+        self._offset = 0
+        """ Position in the file of the first line not read yet """
+        self._file = None
+        self._last = float("-inf")
+        self._exhausted = False
+        """ End of the file was reached, it is not opened again """
+
+    def __getstate__(self):
+        # Open file cannot be pickled, it is opened again at saved position
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+    def __next__(self) -> Send:
+        if self._exhausted:
+            raise StopIteration
+        if self._file is None:
+            self._file = open(self.path)
+            self._file.seek(self._offset)
+        while True:
+            line = self._file.readline()
+            if not line:
+                self._file.close()
+                self._file = None
+                self._exhausted = True
+                raise StopIteration
+            self._offset = self._file.tell()
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            time, src, dest = line.split()
+            time, src, dest = float(time), int(src), int(dest)
+            if time < self._last:
+                raise ValueError(f"Traffic trace {self.path} is not sorted by time: {time} after {self._last}")
+            self._last = time
+            if self.only is None:
+                return Send(time, dest, src)
+            if src == self.only:
+                return Send(time, dest)
+
+
+class Merge(TrafficSource):
+    """ Sends of many sources in order of time, next send of each source is kept in min-heap """
+
+    def __init__(self, sources: Iterable[Iterable[Tuple]] = ()):
+        self._heap: List[Tuple[float, int, Tuple, Iterator]] = []
+        self._added = 0
+        """ Number of sources added so far, orders sends of the same time """
+        for source in sources:
+            self.add(source)
+
+    def add(self, source: Iterable[Tuple]) -> None:
+        source = iter(source)
+        self._push(source, self._added)
+        self._added += 1
+
+    def _push(self, source: Iterator[Tuple], index: int) -> None:
+        send = next(source, None)
+        if send is not None:
+            heapq.heappush(self._heap, (send[0], index, send, source))
+
+    def peek_time(self) -> float:
+        """ Time of the next send, `inf` when all sources are exhausted """
+        return self._heap[0][0] if self._heap else float("inf")
+
+    def __next__(self) -> Tuple:
+        if not self._heap:
+            raise StopIteration
+        _, index, send, source = heapq.heappop(self._heap)
+        self._push(source, index)
+        return send
+
+
+def as_schedule(sends: Union[None, List[Tuple[float, int]], Iterable[Tuple[float, int]]]) -> Iterator[Tuple]:
+    """ Lists of (time, dest) are sorted by time, sources and other iterables are used lazily as they are """
+    if sends is None:
+        return iter(())
+    if isinstance(sends, (list, tuple)):
+        return iter(sorted(sends, key=lambda send: send[0]))
+    return iter(sends)
+
+
+class TrafficDriver:
+    """ Sends of network-wide sources, merged into one heap, made by nodes on clock of discrete simulation """
+
+    def __init__(self, network):
+        self.network = network
+        self.sends = Merge()
+        self.engine = None
+        self.start_time = 0.0
+        self._generation = 0
+        """ Only the latest scheduled wake up sends, earlier ones are outdated by sources added afterwards """
+
+    def add(self, source: Iterable[Send]) -> None:
+        self.sends.add(source)
+        if self.engine is not None:
+            self._schedule()
+
+    def start(self, engine) -> None:
+        """ :param engine: `DiscreteEventEngine` which clock drives the traffic """
+        self.engine = engine
+        self.start_time = engine.now
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self._generation += 1
+        when = self.sends.peek_time()
+        if when != float("inf"):
+            self.engine.call_at(self.start_time + when, self._send_due, self._generation)
+
+    async def _send_due(self, generation: int) -> None:
+        if generation != self._generation:
+            return
+        while self.start_time + self.sends.peek_time() <= self.engine.now:
+            send = next(self.sends)
+            node = self.network.get_node(send.src)
+            if node is None:
+                self.network.logger.warning(f"Send from {send.src}, which is not in the network, skipped")
+                continue
+            await node.send_new_message(send.dest)
+        self._schedule()
@@ -0,0 +1,29 @@
+import asyncio
+import logging
+
+from mesh.network import Network, RunMode
+from mesh.node.with_cache import NodeWithPositionCache
+from utils.space import Position
+
+# Per-frame traces are not needed by tests and only slow them down
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def line_network(count: int, node_range: float = 1.5, send_times=(1, 2), mode: RunMode = RunMode.DISCRETE,
+                 **kwargs) -> Network:
+    """ Nodes one unit apart on x axis, each hears only its direct neighbors, node 0 sends to the last one """
+    network = Network(node_range, mode=mode, **kwargs)
+    schedule = [(send_time, count - 1) for send_time in send_times]
+    network.add_node(NodeWithPositionCache(Position(0, 0), addr=0, send_schedule=schedule))
+    for addr in range(1, count):
+        network.add_node(NodeWithPositionCache(Position(addr, 0), addr=addr))
+    return network
+
+
+def run_async(coroutine):
+    """ Run coroutine in its own event loop, `asyncio.run` would leave no current loop for realtime runs """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
@@ -0,0 +1,99 @@
+import pytest
+from hamcrest import assert_that, equal_to, has_length, empty
+
+from mesh.address import AddressManager, AddressType, address_type, virtual_address, ALL_NODES, ALL_RELAYS, \
+    ALL_PROXIES, ALL_FRIENDS, GROUP_MIN
+
+
+def test_lowest_free_address_is_assigned():
+    addresses = AddressManager()
+
+    assert_that([addresses.assign() for _ in range(3)], equal_to([0, 1, 2]))
+    assert_that(addresses.assign(5), equal_to(5))
+    assert_that(addresses.assign(), equal_to(3))
+    assert_that(addresses.assign(), equal_to(4))
+    assert_that(addresses.assign(), equal_to(6))
+
+
+def test_released_address_is_reused_lowest_first():
+    addresses = AddressManager()
+    for _ in range(5):
+        addresses.assign()
+    addresses.release(3)
+    addresses.release(1)
+
+    assert_that(addresses, has_length(3))
+    assert_that(addresses.assign(), equal_to(1))
+    assert_that(addresses.assign(), equal_to(3))
+    assert_that(addresses.assign(), equal_to(5))
+
+
+def test_released_address_requested_again():
+    addresses = AddressManager()
+    for _ in range(3):
+        addresses.assign()
+    addresses.release(1)
+    addresses.assign(1)
+
+    assert_that(addresses.assign(), equal_to(3))
+
+
+def test_unicast_range():
+    addresses = AddressManager(unicast_min=10, unicast_max=11)
+
+    assert_that(addresses.assign(), equal_to(10))
+    assert_that(addresses.assign(), equal_to(11))
+    with pytest.raises(ValueError):
+        addresses.assign()
+    with pytest.raises(ValueError):
+        addresses.assign(12)
+
+
+def test_invalid_requests():
+    addresses = AddressManager()
+    addresses.assign(1)
+
+    with pytest.raises(ValueError):
+        addresses.assign(1)
+    with pytest.raises(ValueError):
+        addresses.release(2)
+    with pytest.raises(TypeError):
+        addresses.assign("1")
+
+
+def test_group_and_virtual_subscriptions():
+    addresses = AddressManager()
+    for _ in range(3):
+        addresses.assign()
+    addresses.subscribe(0, GROUP_MIN)
+    addresses.subscribe(2, GROUP_MIN)
+    label = addresses.subscribe_label(1, "lights")
+
+    assert_that(addresses.resolve(GROUP_MIN), equal_to({0, 2}))
+    assert_that(addresses.resolve(label), equal_to({1}))
+    assert_that(addresses.resolve(ALL_NODES), equal_to({0, 1, 2}))
+    assert_that(addresses.resolve(1), equal_to({1}))
+    assert_that(addresses.resolve(7), empty())
+
+    addresses.release(2)
+    assert_that(addresses.resolve(GROUP_MIN), equal_to({0}))
+    with pytest.raises(ValueError):
+        addresses.subscribe(0, 5)
+
+
+def test_fixed_groups():
+    addresses = AddressManager()
+    for _ in range(3):
+        addresses.assign()
+
+    assert_that(addresses.resolve(ALL_RELAYS), equal_to({0, 1, 2}))
+    assert_that(addresses.resolve(ALL_PROXIES), empty())
+    assert_that(addresses.resolve(ALL_FRIENDS), empty())
+
+
+def test_address_types():
+    assert_that(address_type(0x7FFF), equal_to(AddressType.UNICAST))
+    assert_that(address_type(virtual_address("lights")), equal_to(AddressType.VIRTUAL))
+    assert_that(address_type(ALL_NODES), equal_to(AddressType.GROUP))
+    with pytest.raises(ValueError):
+        address_type(0x10000)
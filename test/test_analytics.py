@@ -0,0 +1,63 @@
+import pytest
+from hamcrest import assert_that, equal_to
+
+from mesh.analytics import message_summary, node_summary, coverage_over_time, load_history, COLUMNS
+from mesh.trace import TraceWriter, TraceReader
+from test.common import line_network
+
+
+@pytest.fixture(scope="module")
+def history():
+    return line_network(4).simulate(5)
+
+
+def test_message_summary(history):
+    summary = message_summary(history, node_count=4)
+
+    assert_that(summary.index.tolist(), equal_to([(0, 2), (0, 3)]))
+    assert_that(summary["receptions"].tolist(), equal_to([6, 6]))
+    assert_that(summary["transmissions"].tolist(), equal_to([4, 4]))
+    assert_that(summary["reached"].tolist(), equal_to([3, 3]))
+    assert_that(summary["redundant"].tolist(), equal_to([3, 3]))
+    assert_that(summary["depth"].tolist(), equal_to([3, 3]))
+    assert_that(summary["hops"].tolist(), equal_to([3, 3]))
+    assert_that(summary["delivered"].all(), equal_to(True))
+    assert_that(summary["latency"].tolist(), equal_to(pytest.approx([0.002, 0.002])))
+    assert_that(summary["coverage"].tolist(), equal_to([1.0, 1.0]))
+
+
+def test_message_summary_of_group_destination(history):
+    summary = message_summary(history, resolve=lambda address: {1} if address == 3 else set())
+    nobody = message_summary(history, resolve=lambda address: ())
+
+    assert_that(summary["hops"].tolist(), equal_to([1, 1]))
+    assert_that(nobody["delivered"].any(), equal_to(False))
+
+
+def test_node_summary(history):
+    nodes = node_summary(history)
+
+    assert_that(nodes.index.tolist(), equal_to([0, 1, 2, 3]))
+    assert_that(nodes["received"].tolist(), equal_to([2, 4, 4, 2]))
+    assert_that(nodes["accepted"].tolist(), equal_to([0, 2, 2, 2]))
+    assert_that(nodes["redundant"].tolist(), equal_to([2, 2, 2, 0]))
+    assert_that(nodes["transmitted"].tolist(), equal_to([2, 2, 2, 2]))
+
+
+def test_coverage_over_time(history):
+    progress = coverage_over_time(history, node_count=4)
+
+    assert_that(progress["reporter"].tolist(), equal_to([1, 2, 3, 1, 2, 3]))
+    assert_that(progress["reached"].tolist(), equal_to([1, 2, 3, 1, 2, 3]))
+    assert_that(progress["coverage"].iloc[-1], equal_to(1.0))
+
+
+def test_trace_is_read_in_chunks(history, tmp_path):
+    path = str(tmp_path / "run.trace")
+    with TraceWriter(path, chunk_size=5) as writer:
+        writer.write(history)
+
+    loaded = load_history(TraceReader(path))
+    assert_that(loaded.columns.tolist(), equal_to(COLUMNS))
+    assert_that(loaded.equals(load_history(history)[COLUMNS]), equal_to(True))
+    assert_that(message_summary(path).equals(message_summary(history)), equal_to(True))
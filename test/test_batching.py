@@ -0,0 +1,97 @@
+import asyncio
+
+from hamcrest import assert_that, equal_to
+
+from mesh.message import GenericMessageEvent, GenericMessageOutgoingBatchEvent, GenericMessageOutgoingEvent, NetworkPDU
+from mesh.network import RunMode
+from mesh.node.base import MeshNodeAsync
+from test.common import line_network, run_async
+from utils.space import Position
+
+
+class RecordingBus:
+    def __init__(self):
+        self.sent = []
+
+    async def broadcast(self, event, config=None):
+        self.sent.append((event, config))
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.calls = []
+
+    def call_at(self, when, callback, *args):
+        self.calls.append((when, callback, args))
+
+
+def message(src: int, seq: int, source_addr: int = None) -> GenericMessageOutgoingEvent:
+    pdu = NetworkPDU()
+    pdu.src = src
+    pdu.seq = seq
+    result = GenericMessageOutgoingEvent(pdu)
+    result.source_addr = src if source_addr is None else source_addr
+    result.source_position = Position(src, 0)
+    return result
+
+
+def test_batch_keeps_messages():
+    batch = GenericMessageOutgoingBatchEvent()
+    batch.extend([message(1, 5), message(2, 6)])
+    messages = list(batch.messages())
+
+    assert_that([type(m) for m in messages], equal_to([GenericMessageOutgoingEvent] * 2))
+    assert_that([(m.data.src, m.data.seq, m.source_addr, m.source_position) for m in messages],
+                equal_to([(1, 5, 1, Position(1, 0)), (2, 6, 2, Position(2, 0))]))
+
+
+def test_node_sends_messages_of_window_as_one_batch():
+    network = line_network(2)
+    node = network.get_node(0)
+    node.batch_window = 0.05
+    node.clock = lambda: 10
+    node.scheduler = RecordingScheduler()
+    node.network_bus = RecordingBus()
+
+    async def send():
+        for seq in (1, 2):
+            await node.send_to_network(None, message(0, seq))
+        (when, flush, args), = node.scheduler.calls
+        assert_that(when, equal_to(10.05))
+        await flush(*args)
+        await flush(*args)
+
+    run_async(send())
+    (batch, _), = node.network_bus.sent
+    assert_that([m.data.seq for m in batch.messages()], equal_to([1, 2]))
+
+
+def test_network_sends_each_neighbor_one_batch_per_window():
+    network = line_network(3)
+    network.batch_window = 0.01
+    network.network_bus = RecordingBus()
+    network.build_topology()
+
+    async def deliver():
+        batch = GenericMessageOutgoingBatchEvent()
+        batch.extend([message(1, 1), message(0, 1)])
+        await network.send_batch_to_nodes(batch)
+        await network.send_to_all_nodes(message(1, 2).copy(new_message_type=GenericMessageEvent))
+        assert_that(network.network_bus.sent, equal_to([]))
+        await asyncio.sleep(0.05)
+
+    run_async(deliver())
+    received = {config.filter_endpoint: [(m.data.src, m.data.seq) for m in batch.messages()]
+                for batch, config in network.network_bus.sent}
+    assert_that(received, equal_to({
+        MeshNodeAsync.endpoint_name(0): [(1, 1), (1, 2)],
+        MeshNodeAsync.endpoint_name(1): [(0, 1)],
+        MeshNodeAsync.endpoint_name(2): [(1, 1), (1, 2)],
+    }))
+
+
+def test_realtime_run_with_batching_hears_the_same():
+    network = line_network(3, send_times=(1,), mode=RunMode.REALTIME, batch_window=0.02)
+    network.run_for(3)
+
+    assert_that(sorted(network.history["reporter"].tolist()), equal_to([0, 1, 1, 2]))
@@ -0,0 +1,71 @@
+from hamcrest import assert_that, equal_to, greater_than
+
+from mesh.channel import Channel
+from mesh.message import GenericMessageEvent, NetworkPDU
+from mesh.mobility import RandomWaypoint
+from mesh.network import Network, RunMode
+from mesh.node.with_cache import NodeWithPositionCache
+from mesh.topology import Topology
+from utils.space import Position
+
+
+def frame(src: int) -> GenericMessageEvent:
+    pdu = NetworkPDU()
+    pdu.src = src
+    pdu.seq = 1
+    message = GenericMessageEvent(pdu)
+    message.source_addr = src
+    return message
+
+
+def resolve(positions, senders, times=None, capture: float = 6.0):
+    """ Frames of `senders` send at `times` (all at once by default) and resolved after they ended """
+    topology = Topology(range(len(positions)), [Position(x, y) for x, y in positions], 1.5)
+    channel = Channel(adv_delay=0, capture=capture)
+    for src, when in zip(senders, times or [0] * len(senders)):
+        channel.transmit(when, frame(src))
+    heard = {frame.source_addr: nodes.tolist() for frame, nodes in channel.resolve(1, topology)}
+    return channel, heard
+
+
+def test_frames_after_each_other_are_received():
+    channel, heard = resolve([(0, 0), (1, 0), (2, 0)], [0, 2], times=[0, 0.01])
+
+    assert_that(heard, equal_to({0: [1], 2: [1]}))
+    assert_that((channel.delivered, channel.collided, channel.deaf), equal_to((2, 0, 0)))
+
+
+def test_overlapping_frames_collide():
+    channel, heard = resolve([(0, 0), (1, 0), (2, 0)], [0, 2])
+
+    assert_that(heard, equal_to({}))
+    assert_that((channel.delivered, channel.collided), equal_to((0, 2)))
+
+
+def test_much_stronger_frame_is_captured():
+    channel, heard = resolve([(0.1, 0), (0, 0), (-1.3, 0)], [0, 2])
+
+    assert_that(heard, equal_to({0: [1]}))
+    assert_that((channel.delivered, channel.collided), equal_to((1, 1)))
+    _, heard = resolve([(0.1, 0), (0, 0), (-1.3, 0)], [0, 2], capture=float("inf"))
+    assert_that(heard, equal_to({}))
+
+
+def test_transmitting_node_does_not_hear():
+    channel, heard = resolve([(0, 0), (1, 0)], [0, 1])
+
+    assert_that(heard, equal_to({}))
+    assert_that((channel.delivered, channel.deaf), equal_to((0, 2)))
+
+
+def test_moving_nodes_get_every_frame_channel_received():
+    network = Network(4, mode=RunMode.DISCRETE, channel=Channel(seed=2))
+    network.add_node(NodeWithPositionCache(Position(0, 0), addr=0, send_schedule=[(t / 4, 1) for t in range(1, 12)]))
+    for addr in range(1, 20):
+        network.add_node(NodeWithPositionCache(Position(addr % 5 * 2, addr // 5 * 2), addr=addr))
+    # Nodes move often and fast, some leave range of the sender while its frame is on air
+    network.set_mobility(RandomWaypoint((10, 10), speed=(20, 40), seed=2), interval=0.001)
+    history = network.simulate(5)
+
+    assert_that(len(history), greater_than(0))
+    assert_that(len(history), equal_to(network.channel.delivered))
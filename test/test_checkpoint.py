@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from hamcrest import assert_that, equal_to, greater_than, only_contains, has_item
+
+from mesh.network import Network
+from mesh.node.with_cache import NodeWithPositionCache
+from test.common import line_network
+from utils.space import Position
+
+
+def straight_run(duration: float) -> np.ndarray:
+    return line_network(6, send_times=(1, 3, 5)).simulate(duration)
+
+
+def test_fork_continues_like_straight_run():
+    network = line_network(6, send_times=(1, 3, 5))
+    network.simulate(2)
+    fork = network.fork()
+    fork.simulate(4)
+
+    assert_that(fork.history.tobytes(), equal_to(straight_run(6).tobytes()))
+
+
+def test_fork_is_independent():
+    network = line_network(6, send_times=(1, 3, 5))
+    network.simulate(2)
+    before = len(network.history)
+    fork = network.fork()
+    fork.simulate(4)
+
+    assert_that(len(fork.history), greater_than(before))
+    assert_that(len(network.history), equal_to(before))
+    network.simulate(4)
+    assert_that(network.history.tobytes(), equal_to(fork.history.tobytes()))
+
+
+def test_checkpoint_and_restore(tmp_path):
+    path = str(tmp_path / "network.ckpt")
+    network = line_network(6, send_times=(1, 3, 5))
+    network.simulate(2)
+    network.checkpoint(path)
+
+    restored = Network.restore(path)
+    restored.simulate(4)
+    assert_that(restored.history.tobytes(), equal_to(straight_run(6).tobytes()))
+
+
+def test_only_simulated_network_can_be_saved():
+    with pytest.raises(ValueError):
+        line_network(3).fork()
+
+
+def test_fork_after_node_removed():
+    network = line_network(6, send_times=(1, 3, 5))
+    network.simulate(2)
+    network.remove_node(network.get_node(2))
+    fork = network.fork()
+
+    assert_that(sorted(node.addr for node in fork.nodes), equal_to([0, 1, 3, 4, 5]))
+    records = fork.simulate(4)
+    # Line is cut at the removed node, so later floods do not get past it
+    assert_that(records["reporter"].tolist(), only_contains(0, 1))
+
+
+def test_fork_after_node_added(tmp_path):
+    network = line_network(3, send_times=(1, 3))
+    network.simulate(2)
+    network.add_node(NodeWithPositionCache(Position(3, 0)))
+    path = str(tmp_path / "network.ckpt")
+    network.checkpoint(path)
+
+    for copy in (network.fork(), Network.restore(path)):
+        assert_that(sorted(node.addr for node in copy.nodes), equal_to([0, 1, 2, 3]))
+        assert_that(copy.get_node(3).position, equal_to(Position(3, 0)))
+        records = copy.simulate(2)
+        assert_that(records["reporter"][records["accepted"]].tolist(), has_item(3))
+        with pytest.raises(ValueError):
+            copy.add_node(NodeWithPositionCache(Position(4, 0), addr=3))
@@ -0,0 +1,77 @@
+import numpy as np
+from hamcrest import assert_that, equal_to, has_length, greater_than, contains_exactly, only_contains
+
+from mesh.sweep import build_flood_network
+from mesh.topology import Topology
+from test.common import line_network
+from utils.space import Position
+
+
+def test_discrete_runs_are_deterministic():
+    first = build_flood_network(4, 10, seed=1, send_times=(1, 3)).simulate(10)
+    second = build_flood_network(4, 10, seed=1, send_times=(1, 3)).simulate(10)
+
+    assert_that(len(first), greater_than(0))
+    assert_that(first.tobytes(), equal_to(second.tobytes()))
+
+
+def test_consecutive_runs_continue_simulation():
+    whole = line_network(5).simulate(6)
+    network = line_network(5)
+    parts = np.concatenate([network.simulate(2), network.simulate(4)])
+
+    assert_that(parts.tobytes(), equal_to(whole.tobytes()))
+
+
+def test_frames_are_heard_only_by_nodes_in_range():
+    network = line_network(6)
+    history = network.simulate(5)
+
+    assert_that(len(history), greater_than(0))
+    distance = np.hypot(history["source_x"] - history["target_x"], history["source_y"] - history["target_y"])
+    assert_that(bool((distance < network.range).all()), equal_to(True))
+    for record in history:
+        assert_that(abs(int(record["reporter"]) - int(record["source_addr"])), equal_to(1))
+
+
+def test_flood_reaches_end_of_line():
+    history = line_network(6).simulate(5)
+    accepted = history[history["accepted"]]
+
+    assert_that(sorted(set(accepted["reporter"][accepted["seq"] == accepted["seq"].min()].tolist())),
+                contains_exactly(1, 2, 3, 4, 5))
+
+
+def test_frame_with_zero_ttl_is_received_but_not_relayed():
+    network = line_network(3)
+    network.get_node(0).INIT_TTL = 0
+    history = network.simulate(5)
+
+    assert_that(history["reporter"].tolist(), only_contains(1))
+    assert_that(history["ttl"].tolist(), only_contains(0))
+
+
+def test_topology_neighbors():
+    positions = [Position(0, 0), Position(1, 0), Position(2.5, 0), Position(0, 0.5)]
+    topology = Topology([10, 11, 12, 13], positions, 1.2)
+
+    assert_that(topology.neighbors(10).tolist(), contains_exactly(11, 13))
+    assert_that(topology.neighbors(12).tolist(), has_length(0))
+    assert_that(topology.is_reachable(11, 10), equal_to(True))
+    assert_that(topology.is_reachable(10, 12), equal_to(False))
+
+
+def test_sparse_topology_matches_dense():
+    rng = np.random.default_rng(3)
+    coords = rng.uniform(0, 40, size=(300, 2))
+    positions = [Position(x, y) for x, y in coords.tolist()]
+    dense = Topology(range(300), positions, 4)
+    sparse_limit, Topology.DENSE_LIMIT = Topology.DENSE_LIMIT, 10
+    try:
+        sparse = Topology(range(300), positions, 4)
+    finally:
+        Topology.DENSE_LIMIT = sparse_limit
+
+    assert_that(sparse.reachable, equal_to(None))
+    for addr in range(300):
+        assert_that(sparse.neighbors(addr).tolist(), equal_to(dense.neighbors(addr).tolist()))
@@ -0,0 +1,91 @@
+import multiprocessing
+import pickle
+
+import numpy as np
+from hamcrest import assert_that, equal_to, has_length
+
+from mesh.history import HISTORY_DTYPE, HistoryRecorder, SharedHistoryRing, ChunkedHistoryBuffer
+from mesh.network import RunMode
+from test.common import line_network
+
+
+def record(timestamp: float, reporter: int = 0) -> tuple:
+    entry = np.zeros(1, dtype=HISTORY_DTYPE)
+    entry["timestamp"] = timestamp
+    entry["reporter"] = reporter
+    return tuple(entry[0].tolist())
+
+
+def test_ring_keeps_newest_records():
+    ring = SharedHistoryRing(4)
+    try:
+        for i in range(6):
+            ring.append(record(i))
+
+        assert_that(ring.dropped, equal_to(2))
+        assert_that(ring.to_array()["timestamp"].tolist(), equal_to([2, 3, 4, 5]))
+        records, count = ring.read(1)
+        # Records 1 and 2 were overwritten, reading starts from the oldest one still kept
+        assert_that(records["timestamp"].tolist(), equal_to([2, 3, 4, 5]))
+        assert_that(count, equal_to(6))
+    finally:
+        ring.close()
+
+
+def test_unpickled_ring_shares_memory():
+    ring = SharedHistoryRing(8)
+    try:
+        copy = pickle.loads(pickle.dumps(ring))
+        copy.append(record(1.5))
+
+        assert_that(ring.to_array()["timestamp"].tolist(), equal_to([1.5]))
+        copy.shm.close()
+    finally:
+        ring.close()
+
+
+def test_poll_returns_only_new_records():
+    recorder = HistoryRecorder(capacity=16)
+    buffers = recorder.open([0, 1], shared=True)
+    buffers[1].append(record(2, reporter=1))
+    buffers[0].append(record(1))
+
+    assert_that(recorder.poll()["timestamp"].tolist(), equal_to([1, 2]))
+    buffers[0].append(record(3))
+    assert_that(recorder.poll()["timestamp"].tolist(), equal_to([3]))
+    assert_that(recorder.poll(), has_length(0))
+    assert_that(recorder.collect()["timestamp"].tolist(), equal_to([1, 2, 3]))
+
+
+def test_flush_passes_every_record_to_sink_once():
+    written = []
+    recorder = HistoryRecorder(capacity=16, sink=lambda records: written.append(records["timestamp"].tolist()))
+    buffers = recorder.open([0, 1], shared=True)
+    buffers[0].append(record(1))
+    buffers[1].append(record(2, reporter=1))
+    recorder.flush()
+    buffers[0].append(record(3))
+    recorder.flush()
+    recorder.flush()
+    buffers[1].append(record(4, reporter=1))
+
+    assert_that(recorder.collect()["timestamp"].tolist(), equal_to([1, 2, 3, 4]))
+    assert_that(written, equal_to([[1], [2], [3], [4]]))
+
+
+def test_chunked_buffer_flushes_filled_chunks_by_itself():
+    written = []
+    recorder = HistoryRecorder(sink=lambda records: written.append(len(records)))
+    buffer = recorder.open([0])[0]
+    for i in range(ChunkedHistoryBuffer.FIRST_CHUNK_SIZE + 6):
+        buffer.append(record(i))
+    recorder.flush()
+
+    assert_that(written, equal_to([ChunkedHistoryBuffer.FIRST_CHUNK_SIZE, 6]))
+
+
+def test_realtime_history_with_spawned_processes():
+    network = line_network(3, send_times=(1,), mode=RunMode.REALTIME, context=multiprocessing.get_context("spawn"))
+    network.run_for(3)
+
+    assert_that(sorted(network.history["reporter"].tolist()), equal_to([0, 1, 1, 2]))
@@ -0,0 +1,93 @@
+import logging
+
+from hamcrest import assert_that, equal_to
+
+from utils.log import Loggable, Sampler, set_sample_rates, start_background_logging, stop_background_logging
+
+
+class Traced(Loggable):
+    @property
+    def logger_name(self) -> str:
+        return "mesh.test.traced"
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+class CountedStr:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "counted"
+
+
+def traced(level: int = logging.DEBUG):
+    loggable = Traced()
+    handler = ListHandler()
+    loggable.logger.addHandler(handler)
+    loggable.logger.setLevel(level)
+    loggable.logger.propagate = False
+    return loggable, handler
+
+
+def test_sampler_keeps_given_fraction_evenly():
+    sampler = Sampler({"frame_received": 0.25, "frame_sent": 0}, default=1)
+    kept = [sampler("frame_received") for _ in range(100)]
+
+    assert_that(kept[:8], equal_to([True, False, False, True, False, False, False, True]))
+    # First event of each type is always emitted, then every 4th
+    assert_that(sum(kept), equal_to(26))
+    assert_that(any(sampler("frame_sent") for _ in range(10)), equal_to(False))
+    assert_that(all(sampler("other") for _ in range(10)), equal_to(True))
+
+
+def test_trace_is_sampled_per_event():
+    loggable, handler = traced()
+    set_sample_rates({"frame_received": 0.5}, default=0)
+    try:
+        for _ in range(10):
+            loggable.trace("frame_received", "received %s", 1)
+            loggable.trace("frame_sent", "sent %s", 1)
+    finally:
+        set_sample_rates({})
+        loggable.logger.removeHandler(handler)
+
+    assert_that([record.event for record in handler.records], equal_to(["frame_received"] * 6))
+    assert_that(handler.records[0].getMessage(), equal_to("received 1"))
+
+
+def test_trace_below_level_is_not_formatted():
+    loggable, handler = traced(logging.INFO)
+    argument = CountedStr()
+    try:
+        loggable.trace("frame_received", "received %s", argument)
+        assert_that(argument.formatted, equal_to(0))
+        loggable.trace("frame_received", "received %s", argument, level=logging.INFO)
+    finally:
+        loggable.logger.removeHandler(handler)
+
+    assert_that(len(handler.records), equal_to(1))
+    assert_that(handler.records[0].getMessage(), equal_to("received counted"))
+
+
+def test_background_logging_writes_out_records_on_stop():
+    root = logging.getLogger()
+    handler = ListHandler()
+    root.addHandler(handler)
+    try:
+        start_background_logging()
+        root.warning("from queue")
+        stop_background_logging()
+    finally:
+        root.removeHandler(handler)
+
+    assert_that([record.getMessage() for record in handler.records], equal_to(["from queue"]))
+    assert_that(handler in root.handlers, equal_to(False))
@@ -0,0 +1,83 @@
+import pickle
+
+import pytest
+from hamcrest import assert_that, equal_to, has_length
+
+from mesh.message import NetworkPDU
+
+
+def full_pdu() -> NetworkPDU:
+    pdu = NetworkPDU()
+    pdu.ivi = 1
+    pdu.nid = 0x5A
+    pdu.ttl = 0x41
+    pdu.seq = 0x123456
+    pdu.src = 0xABCD
+    pdu.dest = 0xC001
+    pdu.transport_pdu = b"\x01\x02\x03"
+    pdu.net_mic = b"\xde\xad\xbe\xef"
+    return pdu
+
+
+def test_fields_are_packed_into_wire_layout():
+    pdu = full_pdu()
+
+    assert_that(pdu.to_bytes(), equal_to(bytes.fromhex("DA41123456ABCDC001" "010203" "DEADBEEF")))
+    assert_that(pdu, has_length(9 + 3 + 4))
+
+
+def test_fields_are_read_back():
+    pdu = NetworkPDU(full_pdu().to_bytes())
+
+    assert_that((pdu.ivi, pdu.nid, pdu.ctl, pdu.ttl), equal_to((1, 0x5A, 0, 0x41)))
+    assert_that((pdu.seq, pdu.src, pdu.dest), equal_to((0x123456, 0xABCD, 0xC001)))
+    assert_that(pdu.transport_pdu, equal_to(b"\x01\x02\x03"))
+    assert_that(pdu.net_mic, equal_to(b"\xde\xad\xbe\xef"))
+
+
+def test_fields_do_not_overwrite_neighbors():
+    pdu = full_pdu()
+    pdu.ttl = 0
+    pdu.nid = 0
+
+    assert_that(pdu.ivi, equal_to(1))
+    assert_that(pdu.ctl, equal_to(0))
+    assert_that(pdu.seq, equal_to(0x123456))
+
+
+def test_ctl_resizes_net_mic():
+    pdu = full_pdu()
+    pdu.ctl = 1
+
+    assert_that(pdu, has_length(9 + 3 + 8))
+    assert_that(pdu.net_mic, equal_to(b"\x00\x00\x00\x00\xde\xad\xbe\xef"))
+    assert_that(pdu.transport_pdu, equal_to(b"\x01\x02\x03"))
+    assert_that(pdu.ttl, equal_to(0x41))
+
+    pdu.net_mic = bytes(range(8))
+    pdu.ctl = 0
+    assert_that(pdu, has_length(9 + 3 + 4))
+    assert_that(pdu.net_mic, equal_to(bytes(range(4, 8))))
+
+
+@pytest.mark.parametrize("field, value", [
+    ("ivi", 2), ("nid", 0x80), ("ctl", 2), ("ttl", 0x80), ("ttl", -1),
+    ("seq", 1 << 24), ("src", 1 << 16), ("dest", 1 << 16),
+])
+def test_values_out_of_range(field, value):
+    with pytest.raises(ValueError):
+        setattr(NetworkPDU(), field, value)
+
+
+def test_too_short_pdu():
+    with pytest.raises(ValueError):
+        NetworkPDU(bytes(NetworkPDU.HEADER_SIZE + 3))
+
+
+def test_copy_and_pickle_are_independent():
+    pdu = full_pdu()
+    copy = pdu.copy()
+    copy.ttl -= 1
+
+    assert_that(pdu.ttl, equal_to(0x41))
+    assert_that(pickle.loads(pickle.dumps(pdu)), equal_to(pdu))
@@ -0,0 +1,47 @@
+import multiprocessing
+
+from hamcrest import assert_that, equal_to
+
+from mesh.metrics import MetricsRegistry, Metric
+from mesh.network import RunMode
+from test.common import line_network
+
+
+def test_counters_of_flood():
+    network = line_network(3, metrics=True)
+    network.simulate(5)
+    metrics = network.sample_metrics()
+
+    assert_that(metrics["sent"].tolist(), equal_to([2, 2, 2]))
+    assert_that(metrics["relayed"].tolist(), equal_to([0, 2, 2]))
+    assert_that(metrics["frames_heard"].tolist(), equal_to([2, 4, 2]))
+    # Node 1 hears its own relays back from node 2
+    assert_that(metrics["rpl_dropped"].tolist(), equal_to([0, 2, 0]))
+    assert_that(metrics["relay_latency"].sum(axis=1).tolist(), equal_to([0, 2, 2]))
+
+
+def test_counters_restart_from_zero_in_every_run():
+    network = line_network(3, send_times=(1, 4), metrics=True)
+    network.simulate(2)
+    network.simulate(3)
+
+    assert_that(network.sample_metrics()["sent"].tolist(), equal_to([1, 1, 1]))
+
+
+def test_registry_totals():
+    registry = MetricsRegistry()
+    rows = registry.open([5, 3])
+    rows[5].count(Metric.SENT, 2)
+    rows[3].count(Metric.SENT)
+
+    assert_that(registry.addrs.tolist(), equal_to([3, 5]))
+    assert_that(registry.sample()["sent"].tolist(), equal_to([1, 2]))
+    assert_that(int(registry.totals()["sent"]), equal_to(3))
+
+
+def test_realtime_counters_with_spawned_processes():
+    network = line_network(3, send_times=(1,), mode=RunMode.REALTIME, metrics=True,
+                           context=multiprocessing.get_context("spawn"))
+    network.run_for(3)
+
+    assert_that(network.sample_metrics()["sent"].tolist(), equal_to([1, 1, 1]))
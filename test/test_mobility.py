@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from hamcrest import assert_that, equal_to
+
+from mesh.mobility import RandomWaypoint, TraceMobility
+from mesh.topology import Topology
+from test.common import line_network
+from utils.space import Position
+
+
+def random_topology(count: int, rng: np.random.Generator) -> Topology:
+    coords = rng.uniform(0, 30, size=(count, 2))
+    return Topology(range(count), [Position(x, y) for x, y in coords.tolist()], 3)
+
+
+def assert_same_as_rebuilt(topology: Topology):
+    rebuilt = Topology(topology.addrs.tolist(), [Position(x, y) for x, y in topology.coords.tolist()], topology.range)
+    for addr in topology.addrs.tolist():
+        assert_that(topology.neighbors(addr).tolist(), equal_to(rebuilt.neighbors(addr).tolist()))
+    if topology.reachable is not None:
+        assert_that(bool(np.array_equal(topology.reachable, rebuilt.reachable)), equal_to(True))
+
+
+@pytest.mark.parametrize("dense_limit", [Topology.DENSE_LIMIT, 10])
+def test_moved_topology_matches_rebuilt_one(dense_limit, monkeypatch):
+    monkeypatch.setattr(Topology, "DENSE_LIMIT", dense_limit)
+    rng = np.random.default_rng(5)
+    topology = random_topology(200, rng)
+
+    for _ in range(5):
+        before = {addr: topology.neighbors(addr).tolist() for addr in range(200)}
+        moved = rng.choice(200, size=30, replace=False)
+        changed = topology.move(moved.tolist(), rng.uniform(0, 30, size=(30, 2)))
+
+        assert_same_as_rebuilt(topology)
+        really_changed = [addr for addr in range(200) if topology.neighbors(addr).tolist() != before[addr]]
+        assert_that(changed.tolist(), equal_to(really_changed))
+
+
+def test_random_waypoint_stays_in_area_and_under_max_speed():
+    addrs = np.arange(20)
+    coords = np.random.default_rng(1).uniform(0, 10, size=(20, 2))
+    model = RandomWaypoint((10, 10), speed=(1, 2), pause=(0, 1), seed=1)
+    model.start(addrs, coords, 0)
+    current = coords.copy()
+
+    for step in range(1, 50):
+        moved, positions = model.move(step * 0.5)
+        distance = np.hypot(*(positions - current[moved]).T)
+        current[moved] = positions
+
+        assert_that(bool(np.all((positions >= 0) & (positions <= 10))), equal_to(True))
+        assert_that(bool(np.all(distance <= 2 * 0.5 + 1e-9)), equal_to(True))
+
+
+def test_random_waypoint_moves_only_given_nodes():
+    model = RandomWaypoint((10, 10), addrs=[3, 5], seed=1)
+    model.start(np.arange(6), np.zeros((6, 2)), 0)
+    moved, _ = model.move(1)
+
+    assert_that(sorted(moved.tolist()), equal_to([3, 5]))
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = tmp_path / "positions.txt"
+    path.write_text("# time addr x y\n2 1 5 5\n1 1 2 2\n1 2 3 3\n2 9 1 1\n3 2 4 4\n3 2 6 6\n")
+    return str(path)
+
+
+def test_trace_mobility_applies_latest_recorded_positions(trace):
+    model = TraceMobility(trace)
+    model.start(np.array([1, 2]), np.zeros((2, 2)), 0)
+
+    assert_that(model.move(0.5)[0].tolist(), equal_to([]))
+    addrs, coords = model.move(1)
+    assert_that((addrs.tolist(), coords.tolist()), equal_to(([1, 2], [[2, 2], [3, 3]])))
+    addrs, coords = model.move(10)
+    # Node 9 is not in the network, node 2 has two positions at time 3
+    assert_that((addrs.tolist(), coords.tolist()), equal_to(([1, 2], [[5, 5], [6, 6]])))
+    assert_that(model.move(20)[0].tolist(), equal_to([]))
+
+
+def test_node_moved_out_of_range_stops_hearing(tmp_path):
+    path = tmp_path / "positions.txt"
+    path.write_text("1.5 2 10 0\n")
+    network = line_network(3, send_times=(1, 2))
+    network.set_mobility(TraceMobility(str(path)), interval=0.5)
+    history = network.simulate(4)
+
+    heard_by_last = history[history["reporter"] == 2]
+    assert_that(heard_by_last["timestamp"].max() < 1.5, equal_to(True))
+    assert_that(network.get_node(2).position, equal_to(Position(10, 0)))
+    assert_same_as_rebuilt(network.topology)
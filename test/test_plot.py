@@ -0,0 +1,79 @@
+import matplotlib
+import numpy as np
+import pytest
+from hamcrest import assert_that, equal_to
+
+from mesh.history import HISTORY_DTYPE
+from test.common import line_network
+from view.plot import Plot, MessageLayer
+
+matplotlib.use("Agg")
+
+
+@pytest.fixture(scope="module")
+def history():
+    return line_network(4).simulate(5)
+
+
+def test_messages_lines_go_from_sender_to_receiver(history):
+    timestamps, segments = Plot.get_messages_lines(history)
+    _, first_segments = Plot.get_messages_lines(history, only_first=True)
+
+    assert_that(segments.shape, equal_to((len(history), 2, 2)))
+    assert_that(segments[:, 0, 0].tolist(), equal_to(history["source_x"].tolist()))
+    assert_that(segments[:, 1, 0].tolist(), equal_to(history["target_x"].tolist()))
+    assert_that(timestamps.tolist(), equal_to(history["timestamp"].tolist()))
+    assert_that(len(first_segments), equal_to(int(history["accepted"].sum())))
+
+
+def test_layer_shows_only_messages_in_time_range(history):
+    from matplotlib import pyplot
+
+    fig, ax = pyplot.subplots()
+    timestamps, segments = Plot.get_messages_lines(history)
+    layer = MessageLayer(ax, timestamps[::-1], segments[::-1], alpha=0.5)
+    layer.show_between(1.0015, 1.0035)
+    pyplot.close(fig)
+
+    assert_that(layer.timestamps.tolist(), equal_to(sorted(timestamps.tolist())))
+    visible = layer.timestamps[layer.colors[:, 3] > 0]
+    assert_that(visible.tolist(), equal_to(pytest.approx([1.002, 1.002, 1.003, 1.003])))
+    assert_that(bool(np.all(layer.colors[layer.colors[:, 3] > 0, 3] == 0.5)), equal_to(True))
+
+
+def receptions(*rows) -> np.ndarray:
+    """ :param rows: (timestamp, reporter, source_addr, seq, ttl, accepted), all messages are from node 0 """
+    records = np.zeros(len(rows), dtype=HISTORY_DTYPE)
+    for record, (timestamp, reporter, source_addr, seq, ttl, accepted) in zip(records, rows):
+        record["timestamp"], record["reporter"], record["source_addr"] = timestamp, reporter, source_addr
+        record["seq"], record["ttl"], record["accepted"] = seq, ttl, accepted
+        record["source_x"], record["target_x"] = source_addr, reporter
+    return records
+
+
+def test_links_count_frames_of_every_sender_receiver_pair(history):
+    segments, counts, first = Plot.get_links(history[::-1])
+
+    assert_that(segments[:, :, 0].tolist(), equal_to([[0, 1], [1, 0], [1, 2], [2, 1], [2, 3], [3, 2]]))
+    assert_that(counts.tolist(), equal_to([2] * 6))
+    assert_that(first.tolist(), equal_to(pytest.approx([1.001, 1.002, 1.002, 1.003, 1.003, 1.004])))
+
+
+def test_arrivals_average_first_arrival_of_every_message():
+    history = receptions(
+        (1.0, 1, 0, 1, 10, True), (1.5, 2, 1, 1, 9, True), (1.7, 2, 3, 1, 8, True), (1.9, 2, 1, 1, 9, False),
+        (5.0, 2, 0, 2, 10, True), (5.2, 1, 2, 2, 9, True), (5.4, 3, 2, 2, 9, False),
+    )
+    addrs, hops, delays = Plot.get_arrivals(history)
+
+    assert_that(addrs.tolist(), equal_to([1, 2]))
+    # Node 2 accepted message 1 twice, only the first arrival counts
+    assert_that(hops.tolist(), equal_to([1.5, 1.5]))
+    assert_that(delays.tolist(), equal_to(pytest.approx([0.1, 0.25])))
+
+
+def test_bar_received_counts_every_frame(history):
+    addrs, counts = Plot.get_bar_received(history)
+
+    assert_that(addrs.tolist(), equal_to([0, 1, 2, 3]))
+    assert_that(counts.tolist(), equal_to([2, 4, 4, 2]))
@@ -0,0 +1,27 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from hamcrest import assert_that, equal_to, is_not, same_instance
+
+from mesh.pool import submit, worker_pool, shutdown_worker_pool
+
+
+def test_shutdown_cancels_tasks_not_started():
+    futures = [submit(time.sleep, 0.3, workers=1) for _ in range(6)]
+    shutdown_worker_pool()
+
+    assert_that(all(future.done() for future in futures), equal_to(True))
+    assert_that(futures[0].cancelled(), equal_to(False))
+    assert_that(futures[-1].cancelled(), equal_to(True))
+
+
+def test_broken_pool_is_replaced():
+    broken = worker_pool(1)
+    with pytest.raises(BrokenProcessPool):
+        submit(os._exit, 1, workers=1).result()
+
+    assert_that(submit(abs, -3, workers=1).result(), equal_to(3))
+    assert_that(worker_pool(1), is_not(same_instance(broken)))
+    shutdown_worker_pool()
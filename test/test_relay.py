@@ -0,0 +1,118 @@
+import numpy as np
+from hamcrest import assert_that, equal_to, greater_than
+
+from mesh.message import GenericMessageEvent, NetworkPDU
+from mesh.metrics import bucket_bounds
+from mesh.network import Network, RunMode
+from mesh.node.relay import Flooding, Gossip, CounterBased, RandomBackoff, DistanceBased
+from mesh.node.with_cache import NodeWithPositionCache
+from utils.space import Position
+
+
+def frame(ttl: int = NodeWithPositionCache.INIT_TTL, source: Position = Position(0, 0), seq: int = 1):
+    pdu = NetworkPDU()
+    pdu.src = 7
+    pdu.seq = seq
+    pdu.ttl = ttl
+    message = GenericMessageEvent(pdu)
+    message.source_position = source
+    return message
+
+
+def node(position: Position = Position(0, 0), node_range: float = 10) -> NodeWithPositionCache:
+    network = Network(node_range, mode=RunMode.DISCRETE)
+    result = NodeWithPositionCache(position)
+    network.add_node(result)
+    return result
+
+
+class FixedBackoff(Flooding):
+    DELAY = 0.02
+
+    def backoff(self, node, message) -> float:
+        return self.DELAY
+
+
+def cluster(policy, count: int = 4) -> Network:
+    """ Node 0 sends one message, all nodes hear each other """
+    network = Network(10, mode=RunMode.DISCRETE, metrics=True)
+    network.add_node(NodeWithPositionCache(Position(0, 0), addr=0, send_schedule=[(1, count - 1)]))
+    for addr in range(1, count):
+        network.add_node(NodeWithPositionCache(Position(addr, 0), addr=addr, relay_policy=policy(seed=addr)))
+    return network
+
+
+def test_flooding_relays_everything():
+    policy = Flooding()
+
+    assert_that(policy.decide(node(), frame()), equal_to(True))
+    assert_that((policy.relayed, policy.suppressed), equal_to((1, 0)))
+
+
+def test_gossip_relays_first_hops():
+    policy = Gossip(probability=0, first_hops=2)
+    ttl = NodeWithPositionCache.INIT_TTL
+
+    assert_that(policy.decide(node(), frame(ttl - 2)), equal_to(True))
+    assert_that(policy.decide(node(), frame(ttl - 3)), equal_to(False))
+    assert_that((policy.relayed, policy.suppressed), equal_to((1, 1)))
+    assert_that(Gossip(probability=1, first_hops=0).decide(node(), frame(1)), equal_to(True))
+
+
+def test_counter_based_gives_up_after_threshold_copies():
+    policy = CounterBased(threshold=3, max_delay=0.02, seed=1)
+    receiver = node()
+    first, second = frame(seq=1), frame(seq=2)
+
+    assert_that(0 <= policy.backoff(receiver, first) <= 0.02, equal_to(True))
+    policy.backoff(receiver, second)
+    policy.duplicate(receiver, first)
+    policy.duplicate(receiver, first)
+    policy.duplicate(receiver, second)
+
+    assert_that(policy.decide(receiver, first), equal_to(False))
+    assert_that(policy.decide(receiver, second), equal_to(True))
+
+
+def test_random_backoff_gives_up_after_any_copy():
+    policy = RandomBackoff(max_delay=0.02, seed=1)
+    receiver = node()
+    message = frame()
+
+    assert_that(0 <= policy.backoff(receiver, message) <= 0.02, equal_to(True))
+    policy.duplicate(receiver, message)
+    assert_that(policy.decide(receiver, message), equal_to(False))
+
+
+def test_distance_based_relays_only_far_from_every_sender():
+    policy = DistanceBased(min_distance=0.5, seed=1)
+    receiver = node(Position(0, 0), node_range=10)
+    far, near = frame(seq=1, source=Position(8, 0)), frame(seq=2, source=Position(8, 0))
+
+    policy.backoff(receiver, far)
+    policy.backoff(receiver, near)
+    policy.duplicate(receiver, frame(seq=2, source=Position(2, 0)))
+
+    assert_that(policy.decide(receiver, far), equal_to(True))
+    assert_that(policy.decide(receiver, near), equal_to(False))
+
+
+def test_random_backoff_suppresses_relays_already_heard():
+    network = cluster(RandomBackoff)
+    network.simulate(3)
+    metrics = network.sample_metrics()
+
+    # First node to decide relays, the others hear its relay before their backoff ends
+    assert_that(int(metrics["relayed"].sum()), equal_to(1))
+    assert_that(int(metrics["suppressed"].sum()), equal_to(2))
+
+
+def test_relay_latency_includes_backoff():
+    network = cluster(FixedBackoff)
+    network.simulate(3)
+    latency = network.sample_metrics()["relay_latency"].sum(axis=0)
+
+    assert_that(int(latency.sum()), greater_than(0))
+    # No relay is in bucket below the one holding the backoff
+    backoff_bucket = int(np.searchsorted(bucket_bounds(), FixedBackoff.DELAY, side="right"))
+    assert_that(int(latency[:backoff_bucket].sum()), equal_to(0))
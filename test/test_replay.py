@@ -0,0 +1,74 @@
+import pytest
+from hamcrest import assert_that, equal_to, has_length
+
+from mesh.node.replay import ReplayProtectionList
+
+
+def test_new_and_repeated_seq():
+    rpl = ReplayProtectionList(window=8)
+
+    assert_that(rpl.check_and_update(1, 5), equal_to(True))
+    assert_that(rpl.check_and_update(1, 5), equal_to(False))
+    assert_that(rpl.check_and_update(1, 6), equal_to(True))
+    assert_that(rpl.check_and_update(2, 5), equal_to(True))
+
+
+def test_older_seq_inside_window_is_accepted_once():
+    rpl = ReplayProtectionList(window=8)
+    rpl.check_and_update(1, 10)
+
+    assert_that(rpl.check_and_update(1, 3), equal_to(True))
+    assert_that(rpl.check_and_update(1, 3), equal_to(False))
+    assert_that(rpl.check_and_update(1, 9), equal_to(True))
+
+
+def test_window_edges():
+    rpl = ReplayProtectionList(window=8)
+    rpl.check_and_update(1, 10)
+
+    # Highest SEQ is at offset 0, so offsets 1 - 7 are still in the window
+    assert_that(rpl.check_and_update(1, 2), equal_to(False))
+    assert_that(rpl.check_and_update(1, 3), equal_to(True))
+
+
+def test_window_slides_with_highest_seq():
+    rpl = ReplayProtectionList(window=8)
+    rpl.check_and_update(1, 10)
+    rpl.check_and_update(1, 8)
+    rpl.check_and_update(1, 12)
+
+    assert_that(rpl.check_and_update(1, 8), equal_to(False))
+    assert_that(rpl.check_and_update(1, 10), equal_to(False))
+    assert_that(rpl.check_and_update(1, 11), equal_to(True))
+    assert_that(rpl.check_and_update(1, 4), equal_to(False))
+
+
+def test_jump_larger_than_window_forgets_seen_seqs():
+    rpl = ReplayProtectionList(window=8)
+    rpl.check_and_update(1, 10)
+    rpl.check_and_update(1, 30)
+
+    assert_that(rpl.check_and_update(1, 10), equal_to(False))
+    assert_that(rpl.check_and_update(1, 29), equal_to(True))
+
+
+def test_least_recently_heard_source_is_forgotten():
+    rpl = ReplayProtectionList(window=8, max_sources=2)
+    rpl.check_and_update(1, 1)
+    rpl.check_and_update(2, 1)
+    # Source 1 heard again, so 2 is the least recently heard one
+    rpl.check_and_update(1, 2)
+    rpl.check_and_update(3, 1)
+
+    assert_that(rpl, has_length(2))
+    assert_that(1 in rpl, equal_to(True))
+    assert_that(2 in rpl, equal_to(False))
+    # Forgotten source starts from scratch, so its old frame is accepted again
+    assert_that(rpl.check_and_update(2, 1), equal_to(True))
+    assert_that(1 in rpl, equal_to(False))
+
+
+@pytest.mark.parametrize("window, max_sources", [(0, 1), (1, 0)])
+def test_invalid_limits(window, max_sources):
+    with pytest.raises(ValueError):
+        ReplayProtectionList(window, max_sources)
@@ -0,0 +1,88 @@
+import asyncio
+import pickle
+import time
+
+from hamcrest import assert_that, equal_to
+
+from mesh.scheduler import EventQueue, TimerScheduler
+from test.common import run_async
+
+
+def drain(queue: EventQueue) -> list:
+    events = []
+    while len(queue):
+        when, callback, args = queue.pop()
+        events.append((when, args[0]))
+    return events
+
+
+def test_events_of_same_time_keep_insertion_order():
+    queue = EventQueue()
+    for when, name in [(2, "a"), (1, "b"), (2, "c"), (1, "d")]:
+        queue.push(when, print, name)
+
+    assert_that(queue.peek_time(), equal_to(1))
+    assert_that(drain(queue), equal_to([(1, "b"), (1, "d"), (2, "a"), (2, "c")]))
+    assert_that(queue.peek_time(), equal_to(float("inf")))
+
+
+def test_remove_if_keeps_order_of_remaining_events():
+    queue = EventQueue()
+    for when, name in [(3, "a"), (1, "drop"), (2, "b"), (1, "c"), (2, "drop")]:
+        queue.push(when, print, name)
+
+    assert_that(queue.remove_if(lambda callback, args: args[0] == "drop"), equal_to(2))
+    assert_that(queue.remove_if(lambda callback, args: False), equal_to(0))
+    assert_that(drain(queue), equal_to([(1, "c"), (2, "b"), (3, "a")]))
+
+
+def test_pickled_queue_continues_insertion_order():
+    queue = EventQueue()
+    queue.push(1, print, "a")
+    copy = pickle.loads(pickle.dumps(queue))
+    copy.push(1, print, "b")
+    copy.push(0, print, "c")
+
+    assert_that(drain(copy), equal_to([(0, "c"), (1, "a"), (1, "b")]))
+
+
+def test_timers_fire_in_order_until_stopped():
+    fired = []
+
+    async def run():
+        scheduler = TimerScheduler(time.monotonic)
+        start = time.monotonic()
+
+        async def fire(name):
+            fired.append(name)
+
+        async def chain():
+            scheduler.call_at(start + 0.04, fire, "chained")
+
+        scheduler.call_at(start + 0.05, fire, "late")
+        scheduler.call_at(start + 0.02, fire, "early")
+        scheduler.call_at(start + 0.03, chain)
+        scheduler.call_at(start + 10, fire, "after stop")
+        await scheduler.run_until(asyncio.sleep(0.1))
+        return time.monotonic() - start
+
+    elapsed = run_async(run())
+    assert_that(fired, equal_to(["early", "chained", "late"]))
+    assert_that(elapsed < 1, equal_to(True))
+
+
+def test_idle_scheduler_wakes_up_for_new_timer():
+    fired = []
+
+    async def run():
+        scheduler = TimerScheduler(time.monotonic)
+
+        async def fire(name):
+            fired.append(name)
+
+        scheduler.call_at(time.monotonic() + 10, fire, "far")
+        asyncio.get_event_loop().call_later(0.01, lambda: scheduler.call_at(time.monotonic(), fire, "new"))
+        await scheduler.run_until(asyncio.sleep(0.1))
+
+    run_async(run())
+    assert_that(fired, equal_to(["new"]))
@@ -0,0 +1,50 @@
+from hamcrest import assert_that, equal_to
+
+from mesh.message import GenericMessageEvent, NetworkPDU
+from mesh.network import RunMode
+from mesh.shard import Shard
+from test.common import line_network
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.calls = []
+
+    def call_at(self, when, callback, *args):
+        self.calls.append((callback.__self__.addr, args[0].source_addr))
+
+
+def frame(source_addr: int) -> GenericMessageEvent:
+    message = GenericMessageEvent(NetworkPDU())
+    message.source_addr = source_addr
+    return message
+
+
+def receptions(history) -> list:
+    return sorted(zip(history["reporter"].tolist(), history["source_addr"].tolist(), history["accepted"].tolist()))
+
+
+def test_partition_keeps_neighbors_together():
+    network = line_network(6)
+
+    assert_that(network.build_topology().partition(3), equal_to({0: 0, 1: 0, 2: 1, 3: 1, 4: 2, 5: 2}))
+
+
+def test_frame_is_passed_on_only_when_sender_has_neighbors_in_other_shards():
+    network = line_network(4)
+    network.build_topology()
+    shard = Shard(0, [network.get_node(0), network.get_node(1)], network)
+    shard.scheduler = RecordingScheduler()
+
+    assert_that(shard._deliver_locally(frame(0)), equal_to(False))
+    assert_that(shard._deliver_locally(frame(1)), equal_to(True))
+    assert_that(shard._deliver_locally(frame(2)), equal_to(True))
+    assert_that(shard.scheduler.calls, equal_to([(1, 0), (0, 1), (1, 2)]))
+
+
+def test_sharded_run_hears_the_same_across_shards():
+    expected = receptions(line_network(6, send_times=(1,)).simulate(5))
+    network = line_network(6, send_times=(1,), mode=RunMode.SHARDED, shards=3)
+    network.run_for(3)
+
+    assert_that(receptions(network.history), equal_to(expected))
@@ -0,0 +1,52 @@
+import numpy as np
+from hamcrest import assert_that, equal_to, has_length, greater_than
+
+from mesh.network import RunMode
+from test.common import line_network
+
+
+def test_stream_yields_same_records_as_simulate():
+    whole = line_network(5, send_times=(1, 3)).simulate(6)
+    network = line_network(5, send_times=(1, 3))
+    parts = list(network.stream(6, interval=0.5))
+
+    assert_that(len(parts), greater_than(1))
+    for part in parts:
+        assert_that(bool(np.all(np.diff(part["timestamp"]) >= 0)), equal_to(True))
+    assert_that(np.concatenate(parts).tobytes(), equal_to(whole.tobytes()))
+    assert_that(network.history.tobytes(), equal_to(whole.tobytes()))
+
+
+def test_stream_stopped_early_and_continued():
+    whole = line_network(5, send_times=(1, 3)).simulate(6)
+    network = line_network(5, send_times=(1, 3))
+    for records in network.stream(6, interval=0.5):
+        break
+    first = len(network.history)
+    rest = network.simulate(6 - network.engine.now)
+
+    assert_that(first, greater_than(0))
+    assert_that(first + len(rest), equal_to(len(whole)))
+    assert_that(network.history.tobytes(), equal_to(whole.tobytes()))
+
+
+def test_stream_without_keeping_history():
+    network = line_network(5)
+    records = sum(len(part) for part in network.stream(4, keep_history=False))
+
+    assert_that(records, greater_than(0))
+    assert_that(network.history, has_length(0))
+    assert_that(network.keep_history, equal_to(True))
+
+
+def test_consecutive_realtime_runs():
+    network = line_network(3, send_times=(1,), mode=RunMode.REALTIME)
+    network.run_for(2)
+    first = len(network.history)
+    for records in network.stream(2, interval=0.5):
+        if len(records):
+            break
+    network.run_for(2)
+
+    assert_that(first, equal_to(4))
+    assert_that(network.history, has_length(greater_than(2 * first)))
@@ -0,0 +1,56 @@
+from hamcrest import assert_that, equal_to, has_length
+
+from mesh.pool import shutdown_worker_pool
+from mesh.sweep import Sweep, parameter_grid, config_key, run_configuration
+
+
+def configs(seeds=(1, 2), **kwargs):
+    return parameter_grid(range=[10], node_count=[5], seed=list(seeds), duration=[5], send_times=[[1]], **kwargs)
+
+
+def test_parameter_grid():
+    grid = parameter_grid(seed=[1, 2], range=[10, 15])
+
+    assert_that(grid, equal_to([
+        {"range": 10, "seed": 1}, {"range": 10, "seed": 2}, {"range": 15, "seed": 1}, {"range": 15, "seed": 2}
+    ]))
+
+
+def test_resumed_sweep_runs_only_unfinished_configurations(tmp_path):
+    progress = str(tmp_path / "progress.jsonl")
+    try:
+        first = Sweep(configs(seeds=[1]), progress, workers=1).run()
+        sweep = Sweep(configs(), progress, workers=1)
+        assert_that(sweep.pending(), equal_to(configs(seeds=[2])))
+        results = sweep.run()
+    finally:
+        shutdown_worker_pool()
+
+    assert_that(first, has_length(1))
+    assert_that(results["seed"].tolist(), equal_to([1, 2]))
+    assert_that(results["key"].tolist(), equal_to([config_key(config) for config in configs()]))
+    assert_that(sweep.pending(), equal_to([]))
+    with open(progress) as file:
+        assert_that(file.readlines(), has_length(2))
+
+
+def test_failed_configuration_is_not_recorded(tmp_path):
+    progress = str(tmp_path / "progress.jsonl")
+    broken = configs(seeds=[1], node_class=["mesh.node.with_cache:Missing"])
+    try:
+        results = Sweep(configs(seeds=[1]) + broken, progress, workers=1).run()
+    finally:
+        shutdown_worker_pool()
+
+    assert_that(results, has_length(1))
+    assert_that(Sweep(broken, progress).pending(), equal_to(broken))
+
+
+def test_run_configuration_summary():
+    config, = configs(seeds=[1])
+    result = run_configuration(config)
+
+    assert_that(result["receptions"] > 0, equal_to(True))
+    assert_that(result["messages"], equal_to(1))
+    assert_that(result["delivery_ratio"], equal_to(1.0))
+    assert_that(result["events"] > 0, equal_to(True))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from hamcrest import assert_that, equal_to, has_length
+
+from mesh.history import HISTORY_DTYPE
+from mesh.trace import TraceWriter, TraceReader, ALIGNMENT
+from test.common import line_network
+
+
+def records(count: int, start: int = 0) -> np.ndarray:
+    data = np.zeros(count, dtype=HISTORY_DTYPE)
+    data["timestamp"] = np.arange(start, start + count) / 10
+    data["reporter"] = np.arange(start, start + count) % 7
+    data["seq"] = np.arange(start, start + count)
+    data["accepted"] = data["seq"] % 2 == 0
+    return data
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run.trace")
+    with TraceWriter(path, chunk_size=64) as writer:
+        for start in range(0, 100, 30):
+            writer.write(records(30, start))
+        # Full chunks are written while records are still coming
+        assert_that(writer.written, equal_to(90))
+
+    reader = TraceReader(path)
+    assert_that(reader, has_length(120))
+    assert_that(reader.offset % ALIGNMENT, equal_to(0))
+    assert_that(reader.history.tobytes(), equal_to(records(120).tobytes()))
+    assert_that(reader.column("seq").tolist(), equal_to(list(range(120))))
+    assert_that([len(chunk) for chunk in reader.chunks(50)], equal_to([50, 50, 20]))
+
+
+def test_empty_trace(tmp_path):
+    path = str(tmp_path / "empty.trace")
+    TraceWriter(path).close()
+
+    reader = TraceReader(path)
+    assert_that(reader, has_length(0))
+    assert_that(reader.history.dtype, equal_to(HISTORY_DTYPE))
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a trace at all")
+
+    with pytest.raises(ValueError):
+        TraceReader(str(path))
+
+
+def test_wrong_dtype_is_rejected(tmp_path):
+    with TraceWriter(str(tmp_path / "run.trace")) as writer:
+        with pytest.raises(TypeError):
+            writer.write(np.zeros(3, dtype=[("timestamp", np.float64)]))
+
+
+def test_simulation_trace_matches_history(tmp_path):
+    path = str(tmp_path / "simulation.trace")
+    network = line_network(5)
+    network.trace_to(path, chunk_size=8)
+    network.simulate(5)
+
+    # Trace gets chunks of node buffers as they fill up, history is sorted by time
+    assert_that(np.sort(TraceReader(path).history).tobytes(), equal_to(np.sort(network.history).tobytes()))
@@ -0,0 +1,71 @@
+import pickle
+
+import pytest
+from hamcrest import assert_that, equal_to, has_length
+
+from mesh.traffic import Bursty, Merge, Periodic, Replay, Send
+
+
+def test_merge_orders_sends_by_time_then_by_source():
+    merged = Merge([Periodic(1, 2.0, start=1, count=3, src=10), Periodic(2, 1.0, start=1, count=3, src=20)])
+    merged.add([(0.5, 3, 30)])
+
+    assert_that([(send[0], send[2]) for send in merged],
+                equal_to([(0.5, 30), (1, 10), (1, 20), (2, 20), (3, 10), (3, 20), (5, 10)]))
+    assert_that(merged.peek_time(), equal_to(float("inf")))
+
+
+def test_bursty_sends_bursts_of_given_size():
+    sends = list(Bursty(1, size=3, idle=5, spacing=0.1, start=2, bursts=2, seed=1))
+    times = [send.time for send in sends]
+
+    assert_that(sends, has_length(6))
+    assert_that(times[:3], equal_to(pytest.approx([2, 2.1, 2.2])))
+    assert_that(times[3] > times[2] + 0.1, equal_to(True))
+    assert_that(times[4:], equal_to(pytest.approx([times[3] + 0.1, times[3] + 0.2])))
+
+
+def test_bursty_rejects_empty_bursts():
+    with pytest.raises(ValueError):
+        Bursty(1, size=0, idle=5)
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = tmp_path / "traffic.txt"
+    path.write_text("# time src dest\n1.0 0 5\n2.0 1 5\n\n3.0 0 6\n")
+    return str(path)
+
+
+def test_replay_of_single_node(trace):
+    assert_that(list(Replay(trace, src=0)), equal_to([Send(1.0, 5), Send(3.0, 6)]))
+
+
+def test_replay_pickled_in_middle_of_file(trace):
+    replay = Replay(trace)
+    first = next(replay)
+    copy = pickle.loads(pickle.dumps(replay))
+
+    assert_that(first, equal_to(Send(1.0, 5, 0)))
+    assert_that(list(copy), equal_to([Send(2.0, 5, 1), Send(3.0, 6, 0)]))
+    assert_that(list(replay), equal_to([Send(2.0, 5, 1), Send(3.0, 6, 0)]))
+
+
+def test_replay_stays_exhausted(trace):
+    replay = Replay(trace)
+    list(replay)
+
+    for _ in range(2):
+        with pytest.raises(StopIteration):
+            next(replay)
+    assert_that(list(pickle.loads(pickle.dumps(replay))), equal_to([]))
+
+
+def test_replay_rejects_unsorted_file(tmp_path):
+    path = tmp_path / "traffic.txt"
+    path.write_text("2.0 0 5\n1.0 0 5\n")
+    replay = Replay(str(path))
+    next(replay)
+
+    with pytest.raises(ValueError):
+        next(replay)
@@ -1,30 +1,140 @@
+"""
+    Logging of the simulation
+
+    Root logger is configured once per process. Every `Loggable` gets its own named logger (e.g. `mesh.node.17`),
+    so verbosity can be changed for single node or for whole group (`mesh.node`).
+
+    Per-frame messages are emitted with `Loggable.trace` at DEBUG level, so with default INFO level they cost
+    single level check. Once enabled, they are formatted lazily and can be sampled per event type, see
+    `set_sample_rates`. With `start_background_logging` records are passed through a queue to a thread
+    writing them out, so nodes do not wait for stderr.
+"""
 import logging
-from typing import Callable
+import queue
+from functools import cached_property
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.util import Finalize, register_after_fork
+from typing import Dict, Optional
+
+FORMAT = '%(name)-12s: %(levelname)-8s %(message)s'
+
+logging.basicConfig(format=FORMAT, level=logging.INFO)
+
+
+class Sampler:
+    """
+    Decides which traced events are emitted, `rate` of events of given type is kept (1 - all, 0 - none)
+    Sampling is deterministic: with rate 0.1 exactly every 10th event is emitted.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default: float = 1.0):
+        self.rates = dict(rates or {})
+        self.default = default
+        self._credit: Dict[str, float] = {}
+
+    def __call__(self, event: str) -> bool:
+        rate = self.rates.get(event, self.default)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        credit = self._credit.get(event, 1.0) + rate
+        if credit >= 1:
+            self._credit[event] = credit - 1
+            return True
+        self._credit[event] = credit
+        return False
+
+
+_sampler = Sampler()
+
+
+def set_sample_rates(rates: Dict[str, float], default: float = 1.0) -> None:
+    """
+    :param rates: fraction of emitted events per event type, e.g. `{"frame_received": 0.01}`
+    :param default: fraction of emitted events of types missing in `rates`
+    """
+    global _sampler
+    _sampler = Sampler(rates, default)
 
-logging.basicConfig()
 
+class _DeferredQueueHandler(QueueHandler):
+    """ Passes record to the queue as it is, formatting is left for the listener thread """
 
-def named(_self, func: Callable):
-    # BROKEN
-    def name_it(msg: str):
-        return f"[{_self}] {msg}"
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
-    def _named(*args, **kwargs):
-        if msg := kwargs.get("msg", None):
-            kwargs["msg"] = name_it(msg)
-        else:
-            args = list(args)
-            args[1] = name_it(args[1])
-        return func(*args, **kwargs)
-    return _named
+
+_listener: Optional[QueueListener] = None
+
+
+def start_background_logging() -> None:
+    """
+    Move handlers of root logger to background thread, root logger only puts records into queue
+    Processes forked afterwards start their own thread, so nodes running in separate processes are covered as well.
+    """
+    if _listener is not None:
+        return
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(records))
+    _start_listener(records, handlers)
+
+
+def _start_listener(records: queue.SimpleQueue, handlers) -> None:
+    global _listener
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Unlike atexit, finalizers are called also when process started by `multiprocessing` exits
+    Finalize(_listener, stop_background_logging, exitpriority=0)
+    register_after_fork(_listener, _restart_listener_in_child)
+
+
+def stop_background_logging() -> None:
+    """ Write out queued records and give handlers back to root logger """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, _DeferredQueueHandler):
+            root.removeHandler(handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = None
+
+
+def _restart_listener_in_child(listener: QueueListener):
+    """ Thread of the listener is not copied by fork, new one is started with empty queue """
+    records = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _DeferredQueueHandler):
+            handler.queue = records
+    _start_listener(records, listener.handlers)
 
 
 class Loggable:
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logging.basicConfig(format='%(name)-12s: %(levelname)-8s %(message)s')
-        self.logger = logging.getLogger()
-        self.logger.setLevel("INFO")
-        # self.logger._log = named(self, self.logger._log)
 
+    @property
+    def logger_name(self) -> str:
+        return f"mesh.{self.__class__.__name__}"
+
+    @cached_property
+    def logger(self) -> logging.Logger:
+        return logging.getLogger(self.logger_name)
+
+    def trace(self, event: str, msg: str, *args, level: int = logging.DEBUG) -> None:
+        """
+        Log per-frame event, `msg` is formatted with `args` only if record is really emitted
+
+        :param event: type of the event, used for sampling, see `set_sample_rates`
+        """
+        if self.logger.isEnabledFor(level) and _sampler(event):
+            self.logger.log(level, msg, *args, extra={"event": event})
@@ -21,6 +21,4 @@ class Position:
             return False
 
     def __sub__(self, other):
-        x = self.x - other.x
-        y = self.y - other.y
-        return math.sqrt(math.pow(x, 2) + math.pow(y, 2))
+        return math.hypot(self.x - other.x, self.y - other.y)
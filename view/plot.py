@@ -1,51 +1,109 @@
+"""
+    Plots of network history
+
+    Matplotlib is imported only when the first plot is drawn, so headless runs can use aggregations from this module
+    (e.g. `Plot.get_links`) without paying for it.
+"""
 import enum
 import logging
-from collections import defaultdict
-from typing import List, Tuple, Dict
-from matplotlib import pyplot as plt
+from typing import List, Tuple, TYPE_CHECKING
 import numpy as np
-from matplotlib.axes import Axes
-from matplotlib.lines import Line2D
-from matplotlib.widgets import Slider
 
-from mesh.message import GenericMessageReceivedReport
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.widgets import Slider
+
+
+def add_arrows(ax: "Axes", segments: np.ndarray, **kwargs):
+    """ Single quiver with arrow in the middle of every segment, pointing from its source to its target """
+    start, end = segments[:, 0], segments[:, 1]
+    direction = end - start
+    length = np.hypot(direction[:, 0], direction[:, 1])[:, None]
+    direction = np.divide(direction, length, out=np.zeros_like(direction), where=length > 0)
+    middle = (start + end) / 2
+    return ax.quiver(
+        middle[:, 0], middle[:, 1], direction[:, 0], direction[:, 1],
+        angles="xy", pivot="mid", scale_units="inches", width=0.003, **kwargs
+    )
+
+
+class MessageLayer:
+    """
+    Messages drawn on single axis, all of them as one `LineCollection` with arrows as one quiver
+    Messages are kept sorted by timestamp, so visible time range is found with `searchsorted`.
+    """
+
+    def __init__(self, ax: "Axes", timestamps: np.ndarray, segments: np.ndarray, alpha: float, color='black'):
+        """
+        :param timestamps: time of every message
+        :param segments: array of shape (n, 2, 2) with source and target point of every message
+        :param alpha: transparency of visible messages
+        """
+        from matplotlib.collections import LineCollection
+        from matplotlib.colors import to_rgba
+
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = timestamps[order]
+        segments = segments[order]
+        self.alpha = np.full(len(order), alpha)
+        self.colors = np.tile(to_rgba(color), (len(order), 1))
+        self.colors[:, 3] = self.alpha
 
+        self.lines = LineCollection(segments, colors=self.colors)
+        ax.add_collection(self.lines)
+        ax.autoscale_view()
 
-class Line:
-    def __init__(self, timestamp, x, y):
-        self.timestamp = timestamp
-        self.alpha = 0.02
-        self.color = 'black'
-        self.x = x
-        self.y = y
+        self.arrows = add_arrows(ax, segments, color=self.colors, scale=6)
+
+    def show_between(self, min_timestamp: float, max_timestamp: float):
+        """ Hide messages outside of <min_timestamp; max_timestamp> """
+        first = np.searchsorted(self.timestamps, min_timestamp, side="left")
+        last = np.searchsorted(self.timestamps, max_timestamp, side="right")
+        self.colors[:, 3] = 0
+        self.colors[first:last, 3] = self.alpha[first:last]
+        self.lines.set_color(self.colors)
+        self.arrows.set_color(self.colors)
 
 
 class MeshPlotMode(enum.Enum):
     ALL_MESSAGES = 1
     ONLY_FIRST = 2
     BAR_RECEIVED = 3
+    LINKS = 4
+    """ One edge per link, width by number of frames passed through it, color by time of first frame """
+    HOP_HEATMAP = 5
+    """ Nodes colored by average number of hops in which messages reached them """
+    ARRIVAL_HEATMAP = 6
+    """ Nodes colored by average time in which messages reached them """
 
 
 class Plot:
     MAX = 100
-    slider_min: Slider = None
-    slider_max: Slider = None
-    timestamp_min: float = float("inf")
-    timestamp_max: float = 0.0
-    line_cache = []
+    MAX_LABELS = 200
+    """ Nodes are not labeled with their addresses in larger networks """
+    slider_min: "Slider" = None
+    slider_max: "Slider" = None
 
     def __init__(self, nrows=1, ncols=1, sharex=False, sharey=False):
+        from matplotlib import pyplot as plt
+
         self.fig, self.ax = plt.subplots(**{
             "nrows": nrows,
             "ncols": ncols,
             "sharex": sharex,
             "sharey": sharey
         })
+        self.timestamp_min: float = float("inf")
+        self.timestamp_max: float = 0.0
+        self.layers: List[MessageLayer] = []
 
         self.add_slider()
         plt.show(block=False)
 
     def add_slider(self):
+        from matplotlib import pyplot as plt
+        from matplotlib.widgets import Slider
+
         plt.subplots_adjust(bottom=0.2)
         self.slider_min = Slider(plt.axes([0.15, 0.1, 0.65, 0.03]), 'MIN', 0, 100, valinit=0, valstep=1)
         self.slider_min.on_changed(self.update_lines)
@@ -53,108 +111,152 @@ class Plot:
         self.slider_max.on_changed(self.update_lines)
 
     def draw(self, plot: Tuple, mode: MeshPlotMode, network):
-        ax: Axes = self.ax[plot]
+        ax: "Axes" = self.ax[plot]
         if mode is MeshPlotMode.ALL_MESSAGES:
             self.plot_points(ax, *network.get_nodes_map())
-            self.plot_lines(ax, self.get_messages_lines(network.network_history))
+            self.plot_lines(ax, *self.get_messages_lines(network.history))
         elif mode is MeshPlotMode.ONLY_FIRST:
             self.plot_points(ax, *network.get_nodes_map())
-            self.plot_lines(ax, self.get_messages_lines(network.network_history, only_first=True), alpha=0.3)
+            self.plot_lines(ax, *self.get_messages_lines(network.history, only_first=True), alpha=0.3)
         elif mode is MeshPlotMode.BAR_RECEIVED:
-            self.plot_bars(ax, *self.get_bar_received(network.network_history))
+            self.plot_bars(ax, *self.get_bar_received(network.history))
+        elif mode is MeshPlotMode.LINKS:
+            self.plot_points(ax, *network.get_nodes_map())
+            self.plot_links(ax, *self.get_links(network.history))
+        elif mode is MeshPlotMode.HOP_HEATMAP:
+            addrs, hops, _ = self.get_arrivals(network.history)
+            self.plot_heatmap(ax, network.get_nodes_map(), addrs, hops, "hops")
+        elif mode is MeshPlotMode.ARRIVAL_HEATMAP:
+            addrs, _, delays = self.get_arrivals(network.history)
+            self.plot_heatmap(ax, network.get_nodes_map(), addrs, delays, "arrival time [s]")
         else:
-            raise ValueError(f"Only `ALL_MESSAGES` or `ONLY_FIRST` are supported modes")
+            raise ValueError(f"Unsupported plot mode: {mode}")
 
     @staticmethod
     def plot_bars(ax, addressees, heights):
-        ax.bar(addressees, heights, tick_label=[f"_{v}" for v in addressees])
+        if len(addressees) <= Plot.MAX_LABELS:
+            ax.bar(addressees, heights, tick_label=[f"_{v}" for v in addressees])
+        else:
+            # Every bar would be separate patch, single collection of lines is drawn instead
+            ax.vlines(addressees, 0, heights)
 
     @staticmethod
-    def plot_points(ax: Axes, x, y, names, **kwargs):
-        ax.scatter(x, y, cmap='Greens')
-        for i, txt in enumerate(names):
-            ax.annotate(txt, (x[i], y[i]))
+    def plot_points(ax: "Axes", x, y, names, **kwargs):
+        from matplotlib import pyplot as plt
+
+        ax.scatter(x, y, **kwargs)
+        if len(names) <= Plot.MAX_LABELS:
+            for i, txt in enumerate(names):
+                ax.annotate(txt, (x[i], y[i]))
         plt.show(block=False)
 
-    def plot_lines(self, ax: Axes, lines: List[Line], alpha=None):
-        for line in lines:
-            line_key = (tuple(line.x), tuple(line.y))
-            drawn_line, = ax.plot(line.x, line.y, line.color, alpha=alpha if alpha else line.alpha)
-            self.add_arrow(drawn_line)
-            self.line_cache.append((line.timestamp, drawn_line, drawn_line.get_alpha()))
-            self.timestamp_min = line.timestamp if line.timestamp < self.timestamp_min else self.timestamp_min
-            self.timestamp_max = line.timestamp if line.timestamp > self.timestamp_max else self.timestamp_max
-        # self.fig.canvas.draw_idle()
+    @staticmethod
+    def plot_links(ax: "Axes", segments: np.ndarray, counts: np.ndarray, first_arrivals: np.ndarray):
+        """ Single `LineCollection` of links, with arrows showing their direction as single quiver """
+        from matplotlib.collections import LineCollection
+
+        widths = 0.5 + 2.5 * counts / counts.max() if len(counts) else counts
+        links = LineCollection(segments, linewidths=widths, cmap="viridis", alpha=0.6)
+        links.set_array(first_arrivals)
+        ax.add_collection(links)
+        ax.autoscale_view()
+        ax.figure.colorbar(links, ax=ax, label="first frame [s]")
+        add_arrows(ax, segments, alpha=0.6, scale=8)
+
+    @staticmethod
+    def plot_heatmap(ax: "Axes", nodes_map: Tuple[np.ndarray, np.ndarray, np.ndarray], addrs: np.ndarray,
+                     values: np.ndarray, label: str):
+        """ Nodes colored by `values`, nodes without value (e.g. never reached) are left grey """
+        x, y, names = nodes_map
+        value_of = np.full(len(names), np.nan)
+        value_of[np.searchsorted(names, addrs)] = values
+        known = ~np.isnan(value_of)
+        ax.scatter(x[~known], y[~known], color="lightgrey")
+        points = ax.scatter(x[known], y[known], c=value_of[known], cmap="viridis_r")
+        ax.figure.colorbar(points, ax=ax, label=label)
+        if len(names) <= Plot.MAX_LABELS:
+            for i, txt in enumerate(names):
+                ax.annotate(txt, (x[i], y[i]))
+
+    def plot_lines(self, ax: "Axes", timestamps: np.ndarray, segments: np.ndarray, alpha=0.02):
+        self.layers.append(MessageLayer(ax, timestamps, segments, alpha))
+        if len(timestamps):
+            self.timestamp_min = min(self.timestamp_min, timestamps.min())
+            self.timestamp_max = max(self.timestamp_max, timestamps.max())
 
     def update_lines(self, _):
         timestamp_step = (self.timestamp_max - self.timestamp_min) / 100
-        logging.info(f"{timestamp_step}")
-        logging.info(f"{self.timestamp_min} + {self.slider_min.val * timestamp_step}")
-        logging.info(f"{self.timestamp_min} + {self.slider_max.val * timestamp_step}")
         min_timestamp = self.timestamp_min + self.slider_min.val * timestamp_step
         max_timestamp = self.timestamp_min + self.slider_max.val * timestamp_step
-        logging.info(f"Calculated min:[{min_timestamp}] and max:[{max_timestamp}] ")
-        all_time = []
-        for timestamp, line, alpha in self.line_cache:
-            line: Line2D
-            all_time.append(timestamp)
-
-            if timestamp > max_timestamp or timestamp < min_timestamp:
-                line.set_alpha(0)
-            else:
-                line.set_alpha(alpha)
-
-            # logging.info(f"timestamp:{all_time}")
+        logging.debug("Calculated min:[%s] and max:[%s]", min_timestamp, max_timestamp)
+        for layer in self.layers:
+            layer.show_between(min_timestamp, max_timestamp)
         self.fig.canvas.draw_idle()
 
     @staticmethod
-    def get_bar_received(history: List[GenericMessageReceivedReport]):
-        count = defaultdict(int)
+    def get_bar_received(history: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ :return: addresses of nodes and number of frames received by each of them """
+        return np.unique(history["reporter"], return_counts=True)
 
-        for entry in history:
-            count[entry.reporter] += 1
+    @staticmethod
+    def get_links(history: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Receptions aggregated by link (physical sender - receiver)
 
-        return zip(*count.items())
+        :return: segments (source and target point) of links, number of frames heard through every link
+            and timestamp of the first one
+        """
+        history = history[np.argsort(history["timestamp"], kind="stable")]
+        _, first, counts = np.unique(history[["source_addr", "reporter"]], return_index=True, return_counts=True)
+        _, segments = Plot.get_messages_lines(history[first])
+        return segments, counts, history["timestamp"][first]
 
     @staticmethod
-    def add_arrow(line: Line2D, position=None, size=15, color=None):
+    def get_arrivals(history: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        add an arrow to a line.
+        For every node that accepted any message: average number of hops and time in which messages reached it
 
-        line:       Line2D object
-        position:   x-position of the arrow. If None, mean of xdata is taken
-        size:       size of the arrow in fontsize points
-        color:      if None, line color is taken.
+        Hops are counted from TTL, first hop being the highest TTL message was heard with.
+        Time is counted from the first reception of the message anywhere in the network.
+
+        :return: addresses of nodes, average hops and average arrival time
         """
-        if color is None:
-            color = line.get_color()
-
-        alpha = line.get_alpha()
-        x_data = line.get_xdata()
-        y_data = line.get_ydata()
-
-        if position is None:
-            position = x_data.mean()
-        # find closest index
-        start_ind = np.argmin(np.absolute(x_data - position))
-        end_ind = start_ind + 1
-
-        line.axes.annotate('',
-                           xytext=(x_data[start_ind], y_data[start_ind]),
-                           xy=(x_data[end_ind], y_data[end_ind]),
-                           arrowprops=dict(arrowstyle="-|>", color=color, alpha=alpha),
-                           size=size
-                           )
+        accepted = history[history["accepted"]]
+        messages, message_of = np.unique(accepted[["src", "seq"]], return_inverse=True)
+        message_of = message_of.reshape(-1)
+        first_ttl = np.full(len(messages), np.iinfo(np.int16).min, dtype=np.int64)
+        np.maximum.at(first_ttl, message_of, accepted["ttl"])
+        started = np.full(len(messages), np.inf)
+        np.minimum.at(started, message_of, accepted["timestamp"])
+        hops = (first_ttl[message_of] - accepted["ttl"] + 1).astype(np.float64)
+        delays = accepted["timestamp"] - started[message_of]
+
+        # Only the first arrival of a message counts, when node accepted it more than once
+        pairs, pair_of = np.unique(np.stack((accepted["reporter"], message_of)), axis=1, return_inverse=True)
+        pair_of = pair_of.reshape(-1)
+        pair_hops = np.full(pairs.shape[1], np.inf)
+        np.minimum.at(pair_hops, pair_of, hops)
+        pair_delays = np.full(pairs.shape[1], np.inf)
+        np.minimum.at(pair_delays, pair_of, delays)
+
+        addrs, node_of = np.unique(pairs[0], return_inverse=True)
+        received = np.bincount(node_of, minlength=len(addrs))
+        return (
+            addrs,
+            np.bincount(node_of, weights=pair_hops, minlength=len(addrs)) / received,
+            np.bincount(node_of, weights=pair_delays, minlength=len(addrs)) / received,
+        )
 
     @staticmethod
-    def get_messages_lines(history: List[GenericMessageReceivedReport], only_first=False):
-        out = list()
-        for entry in history:
-            if only_first and not entry.accepted:
-                continue
-            out.append(Line(
-                entry.timestamp,
-                [entry.source_position.x, entry.target_position.x],
-                [entry.source_position.y, entry.target_position.y]
-            ))
-        return out
+    def get_messages_lines(history: np.ndarray, only_first=False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param history: records of `Network.history`
+        :return: timestamps and segments (source and target point) of messages, see `MessageLayer`
+        """
+        if only_first:
+            history = history[history["accepted"]]
+        segments = np.stack((
+            np.stack((history["source_x"], history["source_y"]), axis=-1),
+            np.stack((history["target_x"], history["target_y"]), axis=-1),
+        ), axis=1)
+        return history["timestamp"], segments